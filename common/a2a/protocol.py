@@ -52,6 +52,10 @@ class Artifact(BaseModel):
     description: str | None = None
     parts: List[Part]
     metadata: dict[str, Any] | None = None
+    # Streaming: chunks with append=True extend the artifact at the same index
+    index: int = 0
+    append: bool | None = None
+    lastChunk: bool | None = None
 
 
 class Task(BaseModel):
@@ -124,6 +128,24 @@ class SendTaskResponse(JSONRPCResponse):
     result: Task | None = None
 
 
+class GetTaskRequest(JSONRPCRequest):
+    method: Literal["tasks/get"] = "tasks/get"
+    params: TaskQueryParams
+
+
+class GetTaskResponse(JSONRPCResponse):
+    result: Task | None = None
+
+
+class CancelTaskRequest(JSONRPCRequest):
+    method: Literal["tasks/cancel"] = "tasks/cancel"
+    params: TaskIdParams
+
+
+class CancelTaskResponse(JSONRPCResponse):
+    result: Task | None = None
+
+
 # Streaming classes
 class SendTaskStreamingRequest(JSONRPCRequest):
     method: Literal["tasks/send/stream"] = "tasks/send/stream"
@@ -134,6 +156,11 @@ class SendTaskStreamingResponse(JSONRPCResponse):
     result: TaskStatusUpdateEvent | TaskArtifactUpdateEvent | None = None
 
 
+class TaskResubscriptionRequest(JSONRPCRequest):
+    method: Literal["tasks/resubscribe"] = "tasks/resubscribe"
+    params: TaskQueryParams
+
+
 # Error types
 class JSONParseError(JSONRPCError):
     code: int = -32700
@@ -165,6 +192,24 @@ class InternalError(JSONRPCError):
     data: Any | None = None
 
 
+class TaskNotFoundError(JSONRPCError):
+    code: int = -32001
+    message: str = "Task not found"
+    data: None = None
+
+
+class TaskNotCancelableError(JSONRPCError):
+    code: int = -32002
+    message: str = "Task cannot be canceled"
+    data: None = None
+
+
+class ServerBusyError(JSONRPCError):
+    code: int = -32000
+    message: str = "Server is busy, retry later"
+    data: Any | None = None
+
+
 class AgentSkill(BaseModel):
     id: str
     name: str
@@ -185,12 +230,21 @@ class A2AClientError(Exception):
 
 
 class A2AClientHTTPError(A2AClientError):
-    def __init__(self, status_code: int, message: str):
+    def __init__(self, status_code: int, message: str, retry_after: float | None = None):
         self.status_code = status_code
         self.message = message
+        # Seconds from the server's Retry-After header, if any
+        self.retry_after = retry_after
         super().__init__(f"HTTP Error {status_code}: {message}")
 
 
+class A2AClientCircuitOpenError(A2AClientError):
+    def __init__(self, url: str, retry_after: float):
+        self.url = url
+        self.retry_after = retry_after
+        super().__init__(f"Circuit open for {url}, retry after {retry_after:.1f}s")
+
+
 class A2AClientJSONError(A2AClientError):
     def __init__(self, message: str):
         self.message = message
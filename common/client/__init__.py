@@ -1 +1 @@
-from common.client.client import A2AClient 
\ No newline at end of file
+from common.client.client import A2AClient, TaskResult
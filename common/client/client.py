@@ -1,82 +1,639 @@
 import httpx
-from httpx_sse import connect_sse
-from typing import Any, Dict, AsyncIterable
+from httpx_sse import aconnect_sse
+from pydantic import ValidationError
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
 from common.a2a.protocol import (
     AgentCard,
     SendTaskRequest,
     SendTaskResponse,
     JSONRPCRequest,
+    JSONRPCResponse,
+    A2AClientError,
     A2AClientHTTPError,
     A2AClientJSONError,
+    A2AClientCircuitOpenError,
     Message,
     TextPart,
     DataPart,
     SendTaskStreamingRequest,
     SendTaskStreamingResponse,
+    GetTaskRequest,
+    GetTaskResponse,
+    CancelTaskRequest,
+    CancelTaskResponse,
+    TaskResubscriptionRequest,
+    TaskArtifactUpdateEvent,
+    TaskStatusUpdateEvent,
 )
+from common.client.resilience import RetryPolicy, parse_retry_after
+from common.client.routing import Endpoint, EndpointRouter, LatencyTracker
+from common.client.transport import CountingTransport
+import asyncio
+import itertools
 import json
+import time
 from uuid import uuid4
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Marks the end of a bulk worker on the result queue
+_WORKER_DONE = object()
+
+
+class TaskResult(NamedTuple):
+    """Outcome of one message of a bulk submission, tagged with its input position"""
+    index: int
+    response: Optional[JSONRPCResponse] = None
+    error: Optional[Exception] = None
+
+
 class A2AClient:
-    def __init__(self, agent_card: AgentCard = None, url: str = None):
-        # print("--------------------------------")
-        # print("--------------------------------")
-        # print("a2a client init")
-        # print(agent_card)
-        # print(url)
-        # print("--------------------------------")
-        # print("--------------------------------")
-        if agent_card:
-            self.url = agent_card.url
+    """Client for an A2A agent server.
+
+    All requests, including SSE streams, share one pooled httpx.AsyncClient
+    with keep-alive connections. Use it as an async context manager, or call
+    aclose() when done:
+
+        async with A2AClient(url="http://localhost:8000") as client:
+            response = await client.send_task("What is 5 + 3?")
+
+    Given several ``agent_cards``, new tasks go to the replica with the
+    fewest outstanding requests, and follow-up calls for a task go to the
+    replica that created it. ``sticky_sessions`` keeps a sessionId on one
+    replica. With ``hedge`` enabled, a new task that has no response (or,
+    when streaming, no output) after the recent ``hedge_quantile`` latency
+    is sent to a second replica as well; the slower copy is cancelled.
+    Session-pinned requests are not hedged.
+
+    Failed requests are retried according to ``retry_policy`` (see
+    RetryPolicy for which failures qualify), and each replica has a circuit
+    breaker that takes it out of rotation after ``breaker_threshold``
+    consecutive failures for ``breaker_reset_timeout`` seconds.
+    """
+
+    def __init__(
+        self,
+        agent_card: AgentCard = None,
+        url: str = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        timeout: float = 30,
+        agent_cards: List[AgentCard] = None,
+        sticky_sessions: bool = False,
+        hedge: bool = False,
+        hedge_quantile: float = 0.95,
+        hedge_min_delay: float = 0.05,
+        retry_policy: RetryPolicy = None,
+        breaker_threshold: int = 5,
+        breaker_reset_timeout: float = 30.0,
+    ):
+        if agent_cards:
+            urls = [card.url for card in agent_cards]
+        elif agent_card:
+            urls = [agent_card.url]
         elif url:
-            self.url = url
+            urls = [url]
         else:
-            raise ValueError("Must provide either agent_card or url")
-
-    async def send_task(self, message: str or Dict[str, Any], id: str = None) -> SendTaskResponse:
-        # print("--------------------------------")
-        # print("--------------------------------")
-        # print(message)
-        # print(type(message))
-        # print("--------------------------------")
-        # print("--------------------------------")
-        """Send a task to the agent"""
-        # Create message object
-        if isinstance(message, str):
-            # String message
-            msg = Message(
-                role="user",
-                parts=[TextPart(text=message)]
-            )
-        elif isinstance(message, dict):
-            # Data message
-            msg = Message(
-                role="user",
-                parts=[DataPart(data=message)]
-            )
+            raise ValueError("Must provide either agent_card, agent_cards or url")
+
+        self.url = urls[0]
+        self.router = EndpointRouter(
+            urls,
+            sticky_sessions=sticky_sessions,
+            failure_threshold=breaker_threshold,
+            reset_timeout=breaker_reset_timeout,
+        )
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_counters = {"attempts": 0, "retries": 0, "gave_up": 0}
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_delay = hedge_min_delay
+        # Time to a tasks/send response and to the first event of a stream
+        self._latency = {"send": LatencyTracker(), "stream": LatencyTracker()}
+        self.hedge_counters = {"hedged": 0, "hedge_wins": 0}
+        self._background: Set[asyncio.Task] = set()
+
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        # HTTP/2 needs the optional h2 package (pip install httpx[http2])
+        self.http2 = http2
+        self._transport: CountingTransport = None
+        self._client: httpx.AsyncClient = None
+
+    async def __aenter__(self) -> "A2AClient":
+        self._get_client()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close the pooled connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Connection reuse, hedging and per-endpoint statistics"""
+        if self._transport is None:
+            connections = {"requests": 0, "connections_opened": 0, "tls_handshakes": 0, "reused": 0}
         else:
-            raise ValueError(f"Unsupported message type: {type(message)}")
-        
-        # Create task payload
-        task_id = str(uuid4())
-        
-        payload = {
-            "id": task_id,
-            "sessionId": str(uuid4()),
-            "message": msg.model_dump()
+            connections = self._transport.stats()
+        return {
+            **connections,
+            **self.hedge_counters,
+            "retries": dict(self.retry_counters),
+            "endpoints": self.router.stats(),
         }
-        
-        # Create request
-        request = SendTaskRequest(params=payload, id=id or str(uuid4()))
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared client, creating it on first use"""
+        if self._client is None or self._client.is_closed:
+            if self._transport is None:
+                self._transport = CountingTransport(limits=self.limits, http2=self.http2)
+            else:
+                # Keep the counters across a reopen
+                counters = self._transport.counters
+                self._transport = CountingTransport(limits=self.limits, http2=self.http2)
+                self._transport.counters = counters
+            self._client = httpx.AsyncClient(transport=self._transport, timeout=self.timeout)
+        return self._client
+
+    async def send_task(self, message: str or Dict[str, Any], id: str = None, session_id: str = None) -> SendTaskResponse:
+        """Send a task to the agent"""
+        request = SendTaskRequest(params=self._build_task_params(message, session_id), id=id or str(uuid4()))
         logger.info(f"A2AClient send_task request:{request}")
         return SendTaskResponse(**await self._send_request(request))
     
-    async def send_task_streaming(self, message: str or Dict[str, Any], id: str = None) -> AsyncIterable[SendTaskStreamingResponse]:
+    async def send_task_streaming(self, message: str or Dict[str, Any], id: str = None, session_id: str = None) -> AsyncIterable[SendTaskStreamingResponse]:
         """Send a task to the agent and receive streaming responses"""
-        # Create message object
+        request_id = id or str(uuid4())
+        request = SendTaskStreamingRequest(params=self._build_task_params(message, session_id), id=request_id)
+        logger.info(f"Sending streaming request with ID {request_id}")
+        
+        async for response in self._stream_request(request):
+            yield response
+
+    async def send_tasks_many(
+        self,
+        messages: Iterable[str or Dict[str, Any]],
+        concurrency: int = 10,
+        timeout: float = None,
+        batch_size: int = 20,
+    ) -> AsyncIterable[TaskResult]:
+        """Send many tasks, yielding a TaskResult per message as each completes.
+
+        Messages are grouped into JSON-RPC batches of ``batch_size``; if the
+        server does not answer a batch with an array, the client falls back
+        to one request per message for the rest of its lifetime. At most
+        ``concurrency`` HTTP requests are in flight either way, and
+        ``timeout`` bounds each task (a batch shares one request, so it
+        bounds the batch). Failures are reported in TaskResult.error
+        instead of being raised.
+        """
+        chunks = _chunked(enumerate(messages), max(batch_size, 1))
+        limit = asyncio.Semaphore(max(concurrency, 1))
+        async for result in self._run_bulk(chunks, concurrency, lambda chunk: self._send_chunk(chunk, timeout, limit)):
+            yield result
+
+    async def stream_tasks_many(
+        self,
+        messages: Iterable[str or Dict[str, Any]],
+        concurrency: int = 10,
+        timeout: float = None,
+    ) -> AsyncIterable[TaskResult]:
+        """Stream many tasks at once, yielding a TaskResult per event as it arrives.
+
+        Events of different tasks interleave; TaskResult.index tells which
+        message an event belongs to. At most ``concurrency`` streams are
+        open, and ``timeout`` bounds each stream from start to end.
+        """
+        async for result in self._run_bulk(enumerate(messages), concurrency, lambda job: self._stream_one(*job, timeout)):
+            yield result
+
+    async def resubscribe(self, task_id: str, last_event_id: int = None, id: str = None) -> AsyncIterable[SendTaskStreamingResponse]:
+        """Reattach to a streaming task, replaying events after last_event_id"""
+        request = TaskResubscriptionRequest(params={"id": task_id}, id=id or str(uuid4()))
+        headers = {"Last-Event-ID": str(last_event_id)} if last_event_id is not None else None
+        async for response in self._stream_request(request, headers=headers):
+            yield response
+
+    async def _stream_request(self, request: JSONRPCRequest, headers: Dict[str, str] = None) -> AsyncIterable[SendTaskStreamingResponse]:
+        """Send a request and yield its SSE responses without blocking the event loop.
+
+        Leaving the iteration early (break, aclose or task cancellation)
+        closes the HTTP stream.
+        """
+        attempt = 1
+        while True:
+            self.retry_counters["attempts"] += 1
+            received = False
+            try:
+                hedge_delay = self._hedge_delay("stream") if self._should_hedge(request) else None
+                endpoint = self._route(request)
+                if hedge_delay is None:
+                    stream = self._open_stream(request, headers, endpoint)
+                else:
+                    stream = self._hedged_stream(request, headers, endpoint, hedge_delay)
+                try:
+                    async for response in stream:
+                        received = True
+                        yield response
+                finally:
+                    await stream.aclose()
+                return
+            except A2AClientError as e:
+                # Once events were delivered the stream is not replayed
+                if received:
+                    raise
+                delay = self._retry_delay(request.method, e, attempt)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _open_stream(self, request: JSONRPCRequest, headers: Dict[str, str], endpoint: Endpoint) -> AsyncIterable[SendTaskStreamingResponse]:
+        client = self._get_client()
+        started = time.monotonic()
+        first = True
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+        try:
+            logger.info(f"Connecting to SSE stream at {endpoint.url}")
+            async with aconnect_sse(
+                client, "POST", endpoint.url, json=request.model_dump(), headers=headers or {}, timeout=None
+            ) as event_source:
+                response = event_source.response
+                if response.status_code >= 500:
+                    endpoint.breaker.record_failure()
+                else:
+                    endpoint.breaker.record_success()
+                if response.is_error:
+                    await response.aread()
+                    raise A2AClientHTTPError(
+                        response.status_code,
+                        response.text,
+                        retry_after=parse_retry_after(response.headers.get("Retry-After")),
+                    )
+                async for sse in event_source.aiter_sse():
+                    logger.debug(f"Received SSE event: {sse.data[:100]}...")
+                    try:
+                        response = SendTaskStreamingResponse.model_validate_json(sse.data)
+                    except ValidationError as e:
+                        logger.error(f"JSON decode error: {e}, data: {sse.data[:100]}...")
+                        raise A2AClientJSONError(str(e)) from e
+                    if first and _is_progress(response):
+                        self._latency["stream"].record(time.monotonic() - started)
+                        first = False
+                    yield response
+        except httpx.RequestError as e:
+            logger.error(f"HTTP request error: {e}")
+            endpoint.breaker.record_failure()
+            raise A2AClientHTTPError(400, str(e)) from e
+        finally:
+            endpoint.outstanding -= 1
+
+    async def _hedged_stream(
+        self, request: JSONRPCRequest, headers: Dict[str, str], primary: Endpoint, delay: float
+    ) -> AsyncIterable[SendTaskStreamingResponse]:
+        """Open a second stream on another replica if progress is late.
+
+        The faster stream is kept. The race is decided by the first artifact
+        or final event, since every replica acknowledges a task with a
+        status event right away.
+        """
+        streams = {}
+        stream = self._open_stream(request, headers, primary)
+        streams[asyncio.create_task(_read_until_progress(stream))] = (primary, stream)
+        winner_stream = None
+        try:
+            done, _ = await asyncio.wait(streams, timeout=delay)
+            secondary = self._hedge_endpoint(primary) if not done else None
+            if secondary is not None:
+                stream = self._open_stream(request, headers, secondary)
+                streams[asyncio.create_task(_read_until_progress(stream))] = (secondary, stream)
+                self.hedge_counters["hedged"] += 1
+            head, (winner, winner_stream) = await self._first_success(streams)
+        finally:
+            for attempt, (_, stream) in streams.items():
+                if stream is not winner_stream:
+                    attempt.cancel()
+                    await asyncio.gather(attempt, return_exceptions=True)
+                    await stream.aclose()
+
+        self._settle_hedge(request.params.id, winner, primary, [endpoint for endpoint, _ in streams.values()])
+        try:
+            for response in head:
+                yield response
+            async for response in winner_stream:
+                yield response
+        finally:
+            await winner_stream.aclose()
+
+    async def get_task(self, task_id: str, history_length: int = None, id: str = None) -> GetTaskResponse:
+        """Fetch the current state and artifacts of a task"""
+        params = {"id": task_id}
+        if history_length is not None:
+            params["historyLength"] = history_length
+        request = GetTaskRequest(params=params, id=id or str(uuid4()))
+        return GetTaskResponse(**await self._send_request(request))
+
+    async def cancel_task(self, task_id: str, id: str = None) -> CancelTaskResponse:
+        """Cancel a running task"""
+        request = CancelTaskRequest(params={"id": task_id}, id=id or str(uuid4()))
+        return CancelTaskResponse(**await self._send_request(request))
+
+    async def _send_request(self, request: JSONRPCRequest) -> dict[str, Any]:
+        """Send a request to the agent, retrying per the retry policy"""
+        return await self._with_retries(request.method, lambda: self._send_once(request))
+
+    async def _send_once(self, request: JSONRPCRequest) -> dict[str, Any]:
+        hedge_delay = self._hedge_delay("send") if self._should_hedge(request) else None
+        endpoint = self._route(request)
+        if hedge_delay is None:
+            return await self._post(request.model_dump(), endpoint, latency="send")
+        return await self._hedged_post(request, endpoint, hedge_delay)
+
+    async def _hedged_post(self, request: JSONRPCRequest, primary: Endpoint, delay: float) -> dict[str, Any]:
+        """Send to a second replica if the first is slower than delay; return the faster answer"""
+        body = request.model_dump()
+        attempts = {asyncio.create_task(self._post(body, primary, latency="send")): primary}
+        try:
+            done, _ = await asyncio.wait(attempts, timeout=delay)
+            secondary = self._hedge_endpoint(primary) if not done else None
+            if secondary is not None:
+                attempts[asyncio.create_task(self._post(body, secondary, latency="send"))] = secondary
+                self.hedge_counters["hedged"] += 1
+            result, winner = await self._first_success(attempts)
+        finally:
+            for attempt in attempts:
+                attempt.cancel()
+        self._settle_hedge(request.params.id, winner, primary, list(attempts.values()))
+        return result
+
+    async def _first_success(self, attempts: Dict[asyncio.Task, Any]) -> Tuple[Any, Any]:
+        """Wait for the first attempt that succeeds; raise the last error if all fail"""
+        pending = set(attempts)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for attempt in done:
+                if attempt.exception() is None:
+                    return attempt.result(), attempts[attempt]
+                error = attempt.exception()
+        raise error
+
+    def _hedge_endpoint(self, primary: Endpoint) -> Optional[Endpoint]:
+        """Another healthy replica for a hedge, if there is one"""
+        try:
+            return self.router.pick(exclude=primary)
+        except A2AClientCircuitOpenError:
+            return None
+
+    def _settle_hedge(self, task_id: str, winner: Endpoint, primary: Endpoint, endpoints: List[Endpoint]) -> None:
+        """Record the replica that won a hedged task and cancel the task on the others"""
+        if len(endpoints) < 2:
+            return
+        if winner is not primary:
+            self.hedge_counters["hedge_wins"] += 1
+        self.router.assign_task(task_id, winner)
+        for endpoint in endpoints:
+            if endpoint is not winner:
+                job = asyncio.create_task(self._cancel_on(task_id, endpoint))
+                self._background.add(job)
+                job.add_done_callback(self._background.discard)
+
+    async def _cancel_on(self, task_id: str, endpoint: Endpoint) -> None:
+        try:
+            request = CancelTaskRequest(params={"id": task_id}, id=str(uuid4()))
+            await self._post(request.model_dump(), endpoint)
+        except Exception as e:
+            logger.debug(f"Cancelling hedged task {task_id} on {endpoint.url} failed: {e}")
+
+    def _should_hedge(self, request: JSONRPCRequest) -> bool:
+        if not self.hedge or len(self.router.endpoints) < 2:
+            return False
+        if not isinstance(request, (SendTaskRequest, SendTaskStreamingRequest)):
+            return False
+        return not (self.router.sticky_sessions and request.params.sessionId)
+
+    def _hedge_delay(self, kind: str) -> Optional[float]:
+        """Delay before hedging, or None while there are too few latency samples"""
+        latency = self._latency[kind].percentile(self.hedge_quantile)
+        if latency is None:
+            return None
+        return max(latency, self.hedge_min_delay)
+
+    def _route(self, request: JSONRPCRequest) -> Endpoint:
+        """Pick the replica for a request and remember it for the task it creates"""
+        params = request.params
+        if isinstance(request, (GetTaskRequest, CancelTaskRequest, TaskResubscriptionRequest)):
+            endpoint = self.router.task_endpoint(params.id)
+            if endpoint is None:
+                return self.router.pick()
+            # Only the owning replica knows the task, so fail fast instead of rerouting
+            if not endpoint.breaker.allow():
+                raise A2AClientCircuitOpenError(endpoint.url, endpoint.breaker.retry_after())
+            return endpoint
+        endpoint = self.router.pick(getattr(params, "sessionId", None))
+        if isinstance(request, (SendTaskRequest, SendTaskStreamingRequest)):
+            self.router.assign_task(params.id, endpoint)
+        return endpoint
+
+    async def _send_batch(self, requests: List[JSONRPCRequest]) -> Optional[List[dict]]:
+        """Send requests as one JSON-RPC batch; None if the server does not support batches"""
+        body = await self._with_retries("tasks/send", lambda: self._post_batch(requests))
+        if body is None:
+            return None
+        by_id = {response.get("id"): response for response in body if isinstance(response, dict)}
+        missing = [request.id for request in requests if request.id not in by_id]
+        if missing:
+            raise A2AClientJSONError(f"Batch response is missing ids {missing}")
+        return [by_id[request.id] for request in requests]
+
+    async def _post_batch(self, requests: List[JSONRPCRequest]) -> Optional[List[dict]]:
+        """Post a batch to one replica; None if that replica does not accept batches"""
+        endpoint = self.router.pick()
+        if not endpoint.batching:
+            return None
+        try:
+            body = await self._post([request.model_dump() for request in requests], endpoint)
+        except A2AClientHTTPError as e:
+            # Only a plain 4xx answer means the batch itself was rejected
+            if e.status_code >= 500 or e.status_code == 429 or not isinstance(e.__cause__, httpx.HTTPStatusError):
+                raise
+            body = None
+        if not isinstance(body, list):
+            logger.info(f"Server at {endpoint.url} does not accept batch requests; sending tasks individually")
+            endpoint.batching = False
+            return None
+        for request in requests:
+            self.router.assign_task(request.params.id, endpoint)
+        return body
+
+    async def _post(self, body: Any, endpoint: Endpoint, latency: str = None) -> Any:
+        client = self._get_client()
+        started = time.monotonic()
+        endpoint.outstanding += 1
+        endpoint.requests += 1
+        try:
+            response = await client.post(endpoint.url, json=body)
+            if response.status_code >= 500:
+                endpoint.breaker.record_failure()
+            else:
+                endpoint.breaker.record_success()
+            response.raise_for_status()
+            result = response.json()
+        except httpx.HTTPStatusError as e:
+            raise A2AClientHTTPError(
+                e.response.status_code,
+                str(e),
+                retry_after=parse_retry_after(e.response.headers.get("Retry-After")),
+            ) from e
+        except httpx.RequestError as e:
+            endpoint.breaker.record_failure()
+            raise A2AClientHTTPError(400, str(e)) from e
+        except json.JSONDecodeError as e:
+            raise A2AClientJSONError(str(e)) from e
+        finally:
+            endpoint.outstanding -= 1
+        if latency is not None:
+            self._latency[latency].record(time.monotonic() - started)
+        return result
+
+    async def _with_retries(self, method: str, send: Callable[[], Awaitable[Any]]) -> Any:
+        """Await send(), calling it again after retryable failures"""
+        attempt = 1
+        while True:
+            self.retry_counters["attempts"] += 1
+            try:
+                return await send()
+            except A2AClientError as e:
+                delay = self._retry_delay(method, e, attempt)
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _retry_delay(self, method: str, error: A2AClientError, attempt: int) -> float:
+        """Backoff before the next attempt; re-raises error if it should not be retried"""
+        if not self.retry_policy.should_retry(method, error, attempt):
+            if attempt > 1:
+                self.retry_counters["gave_up"] += 1
+            raise error
+        delay = self.retry_policy.delay(attempt, error)
+        self.retry_counters["retries"] += 1
+        logger.info(f"Retrying {method} in {delay:.2f}s after attempt {attempt} failed: {error}")
+        return delay
+
+    async def _send_chunk(
+        self, chunk: List[Tuple[int, Any]], timeout: Optional[float], limit: asyncio.Semaphore
+    ) -> AsyncIterable[TaskResult]:
+        """Send a chunk of messages as one batch, or one request per message under the shared limit"""
+        try:
+            requests = [
+                SendTaskRequest(params=self._build_task_params(message), id=str(uuid4()))
+                for _, message in chunk
+            ]
+            responses = None
+            if len(requests) > 1:
+                async with limit:
+                    async with asyncio.timeout(timeout):
+                        responses = await self._send_batch(requests)
+        except Exception as e:
+            for index, _ in chunk:
+                yield TaskResult(index, error=e)
+            return
+        if responses is not None:
+            for (index, _), response in zip(chunk, responses):
+                yield TaskResult(index, response=SendTaskResponse(**response))
+            return
+
+        async def send_one(index: int, request: SendTaskRequest) -> TaskResult:
+            try:
+                async with limit:
+                    async with asyncio.timeout(timeout):
+                        return TaskResult(index, response=SendTaskResponse(**await self._send_request(request)))
+            except Exception as e:
+                return TaskResult(index, error=e)
+
+        sends = [asyncio.create_task(send_one(index, request)) for (index, _), request in zip(chunk, requests)]
+        try:
+            for next_done in asyncio.as_completed(sends):
+                yield await next_done
+        finally:
+            for send in sends:
+                send.cancel()
+
+    async def _stream_one(self, index: int, message: Any, timeout: Optional[float]) -> AsyncIterable[TaskResult]:
+        # The deadline only covers waiting for the next event, never a yield:
+        # expiring while the consumer is paused would cancel the worker instead
+        deadline = asyncio.get_running_loop().time() + timeout if timeout is not None else None
+        stream = self.send_task_streaming(message)
+        try:
+            while True:
+                try:
+                    async with asyncio.timeout_at(deadline):
+                        response = await anext(stream)
+                except StopAsyncIteration:
+                    return
+                yield TaskResult(index, response=response)
+        except Exception as e:
+            yield TaskResult(index, error=e)
+        finally:
+            await stream.aclose()
+
+    async def _run_bulk(
+        self,
+        jobs: Iterator[Any],
+        concurrency: int,
+        run: Callable[[Any], AsyncIterable[TaskResult]],
+    ) -> AsyncIterable[TaskResult]:
+        """Run jobs on ``concurrency`` workers and yield their results as they arrive.
+
+        Workers pull from the shared jobs iterator, so large or lazy inputs
+        are never materialized; the result queue is bounded so a slow
+        consumer pauses the workers.
+        """
+        jobs = iter(jobs)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(concurrency, 1))
+        closed = False
+
+        async def worker():
+            error = None
+            try:
+                for job in jobs:
+                    async for result in run(job):
+                        await queue.put(result)
+            except Exception as e:
+                error = e
+            finally:
+                # However the worker ended, or the consumer waits for it forever;
+                # unless the consumer itself is gone and cancelled it
+                if not closed:
+                    await queue.put((_WORKER_DONE, error))
+
+        workers = [asyncio.create_task(worker()) for _ in range(max(concurrency, 1))]
+        try:
+            remaining = len(workers)
+            while remaining:
+                item = await queue.get()
+                if isinstance(item, tuple) and item[0] is _WORKER_DONE:
+                    remaining -= 1
+                    if item[1] is not None:
+                        raise item[1]
+                    continue
+                yield item
+        finally:
+            closed = True
+            for task in workers:
+                task.cancel()
+
+    def _build_task_params(self, message: str or Dict[str, Any], session_id: str = None) -> Dict[str, Any]:
+        """Build tasks/send params for a text or data message"""
         if isinstance(message, str):
             # String message
             msg = Message(
@@ -91,48 +648,35 @@ class A2AClient:
             )
         else:
             raise ValueError(f"Unsupported message type: {type(message)}")
-        
-        # Create task payload
-        task_id = str(uuid4())
-        request_id = id or str(uuid4())
-        payload = {
-            "id": task_id,
-            "sessionId": str(uuid4()),
+
+        return {
+            "id": str(uuid4()),
+            "sessionId": session_id or str(uuid4()),
             "message": msg.model_dump()
         }
-        
-        # Create streaming request
-        request = SendTaskStreamingRequest(params=payload, id=request_id)
-        logger.info(f"Sending streaming request with ID {request_id}")
-        
-        with httpx.Client(timeout=None) as client:
-            try:
-                logger.info(f"Connecting to SSE stream at {self.url}")
-                with connect_sse(
-                    client, "POST", self.url, json=request.model_dump()
-                ) as event_source:
-                    try:
-                        for sse in event_source.iter_sse():
-                            logger.info(f"Received SSE event: {sse.data[:100]}...")
-                            response_data = json.loads(sse.data)
-                            yield SendTaskStreamingResponse(**response_data)
-                    except json.JSONDecodeError as e:
-                        logger.error(f"JSON decode error: {e}, data: {sse.data[:100]}...")
-                        raise A2AClientJSONError(str(e)) from e
-            except httpx.RequestError as e:
-                logger.error(f"HTTP request error: {e}")
-                raise A2AClientHTTPError(400, str(e)) from e
 
-    async def _send_request(self, request: JSONRPCRequest) -> dict[str, Any]:
-        """Send a request to the agent"""
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.post(
-                    self.url, json=request.model_dump(), timeout=30
-                )
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                raise A2AClientHTTPError(e.response.status_code, str(e)) from e
-            except json.JSONDecodeError as e:
-                raise A2AClientJSONError(str(e)) from e 
\ No newline at end of file
+
+def _is_progress(response: SendTaskStreamingResponse) -> bool:
+    """Whether a streamed event carries output rather than an acknowledgement"""
+    result = response.result
+    return (
+        response.error is not None
+        or isinstance(result, TaskArtifactUpdateEvent)
+        or (isinstance(result, TaskStatusUpdateEvent) and result.final)
+    )
+
+
+async def _read_until_progress(stream: AsyncIterable[SendTaskStreamingResponse]) -> List[SendTaskStreamingResponse]:
+    """Read events up to and including the first progress event (or the end of the stream)"""
+    head = []
+    async for response in stream:
+        head.append(response)
+        if _is_progress(response):
+            break
+    return head
+
+
+def _chunked(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
@@ -0,0 +1,145 @@
+from typing import Any, Dict, Optional
+from email.utils import parsedate_to_datetime
+from common.a2a.protocol import A2AClientCircuitOpenError, A2AClientHTTPError
+import datetime
+import httpx
+import logging
+import random
+import time
+
+logger = logging.getLogger(__name__)
+
+# Methods that can be repeated without side effects
+IDEMPOTENT_METHODS = {"tasks/get", "tasks/cancel", "tasks/resubscribe"}
+
+# Failures after which the server has certainly not acted on the request
+_UNPROCESSED_STATUS = {429, 503}
+_UNPROCESSED_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+# Failures after which the server may or may not have acted on it
+_UNCERTAIN_STATUS = {500, 502, 504}
+
+
+class RetryPolicy:
+    """Exponential backoff with full jitter for failed A2A requests.
+
+    A request is retried when the server cannot have acted on it (connection
+    refused, 429 or 503 busy, an open circuit breaker). Idempotent methods
+    (tasks/get, tasks/cancel, tasks/resubscribe) are also retried after
+    errors that leave the outcome unknown, such as a dropped connection or a
+    502/504. A Retry-After hint from the server replaces the computed delay.
+    """
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.2, max_delay: float = 10.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def should_retry(self, method: str, error: Exception, attempt: int) -> bool:
+        """Whether a request that failed on attempt (1-based) should be sent again"""
+        if attempt >= self.max_attempts:
+            return False
+        if isinstance(error, A2AClientCircuitOpenError):
+            return True
+        if not isinstance(error, A2AClientHTTPError):
+            return False
+        cause = error.__cause__
+        if isinstance(cause, _UNPROCESSED_ERRORS) or error.status_code in _UNPROCESSED_STATUS:
+            return True
+        if method in IDEMPOTENT_METHODS:
+            return isinstance(cause, httpx.TransportError) or error.status_code in _UNCERTAIN_STATUS
+        return False
+
+    def delay(self, attempt: int, error: Exception = None) -> float:
+        """Seconds to wait before the next attempt"""
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """Per-endpoint breaker: closed -> open after repeated failures -> half-open probe.
+
+    After ``failure_threshold`` consecutive failures the endpoint is skipped
+    for ``reset_timeout`` seconds. Then one probe request is let through; its
+    success closes the breaker, its failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_started: Optional[float] = None
+        self.transitions: Dict[str, int] = {}
+
+    def available(self) -> bool:
+        """Whether allow() would let a request through, without claiming the probe"""
+        if self.state == self.CLOSED:
+            return True
+        now = time.monotonic()
+        if self.state == self.OPEN:
+            return now - self.opened_at >= self.reset_timeout
+        # A probe that never reported back (e.g. cancelled) expires
+        return self._probe_started is None or now - self._probe_started >= self.reset_timeout
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; in half-open state, claims the probe"""
+        if not self.available():
+            return False
+        if self.state == self.OPEN:
+            self._transition(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            self._probe_started = time.monotonic()
+        return True
+
+    def retry_after(self) -> float:
+        """Seconds until the breaker lets a request through again"""
+        if self.state == self.CLOSED:
+            return 0.0
+        return max(self.opened_at + self.reset_timeout - time.monotonic(), 0.0)
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._probe_started = None
+        if self.state != self.CLOSED:
+            self._transition(self.CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_started = None
+        if self.state == self.HALF_OPEN or (
+            self.state == self.CLOSED and self.failures >= self.failure_threshold
+        ):
+            self.opened_at = time.monotonic()
+            self._transition(self.OPEN)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "failures": self.failures, "transitions": dict(self.transitions)}
+
+    def _transition(self, state: str) -> None:
+        key = f"{self.state}->{state}"
+        self.transitions[key] = self.transitions.get(key, 0) + 1
+        logger.info(f"Circuit breaker for {self.name}: {key}")
+        self.state = state
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((when - datetime.datetime.now(datetime.timezone.utc)).total_seconds(), 0.0)
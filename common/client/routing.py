@@ -0,0 +1,109 @@
+from typing import Any, Deque, Dict, List, Optional
+from collections import OrderedDict, deque
+from common.a2a.protocol import A2AClientCircuitOpenError
+from common.client.resilience import CircuitBreaker
+import itertools
+import logging
+import math
+
+logger = logging.getLogger(__name__)
+
+
+class Endpoint:
+    """One agent replica, its in-flight request count and circuit breaker"""
+
+    def __init__(self, url: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.url = url
+        self.breaker = CircuitBreaker(url, failure_threshold, reset_timeout)
+        self.outstanding = 0
+        self.requests = 0
+        # Cleared once the replica rejects a JSON-RPC batch
+        self.batching = True
+
+    def stats(self) -> Dict[str, Any]:
+        return {"outstanding": self.outstanding, "requests": self.requests, "breaker": self.breaker.stats()}
+
+
+class LatencyTracker:
+    """Sliding window of recent latencies for picking a hedge delay"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.min_samples = min_samples
+
+    def record(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Latency at quantile q, or None until enough samples were seen"""
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(math.ceil(q * len(ordered)) - 1, len(ordered) - 1)]
+
+
+class EndpointRouter:
+    """Pick a replica per request by least outstanding requests.
+
+    Ties are broken round-robin, and replicas whose circuit breaker is open
+    are skipped. With ``sticky_sessions`` a session stays on the replica
+    that served its first request while that replica is healthy. Tasks are remembered on the
+    replica that created them, so follow-up calls (get, cancel, resubscribe)
+    reach the replica that knows the task. Both maps are bounded LRUs.
+    """
+
+    def __init__(
+        self,
+        urls: List[str],
+        sticky_sessions: bool = False,
+        max_routes: int = 10000,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+    ):
+        if not urls:
+            raise ValueError("At least one endpoint is required")
+        self.endpoints = [Endpoint(url, failure_threshold, reset_timeout) for url in urls]
+        self.sticky_sessions = sticky_sessions
+        self.max_routes = max_routes
+        self._sessions: "OrderedDict[str, Endpoint]" = OrderedDict()
+        self._tasks: "OrderedDict[str, Endpoint]" = OrderedDict()
+        self._turn = itertools.count()
+
+    def pick(self, session_id: str = None, exclude: Endpoint = None) -> Endpoint:
+        """Choose the endpoint for a new request"""
+        if self.sticky_sessions and session_id and exclude is None:
+            endpoint = self._sessions.get(session_id)
+            if endpoint is not None and endpoint.breaker.allow():
+                self._sessions.move_to_end(session_id)
+                return endpoint
+
+        candidates = [
+            endpoint for endpoint in self.endpoints
+            if endpoint is not exclude and endpoint.breaker.available()
+        ]
+        if not candidates:
+            soonest = min(self.endpoints, key=lambda endpoint: endpoint.breaker.retry_after())
+            raise A2AClientCircuitOpenError(soonest.url, soonest.breaker.retry_after())
+        start = next(self._turn) % len(candidates)
+        rotated = candidates[start:] + candidates[:start]
+        endpoint = min(rotated, key=lambda candidate: candidate.outstanding)
+        endpoint.breaker.allow()
+
+        if self.sticky_sessions and session_id and exclude is None:
+            self._remember(self._sessions, session_id, endpoint)
+        return endpoint
+
+    def assign_task(self, task_id: str, endpoint: Endpoint) -> None:
+        self._remember(self._tasks, task_id, endpoint)
+
+    def task_endpoint(self, task_id: str) -> Optional[Endpoint]:
+        return self._tasks.get(task_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {endpoint.url: endpoint.stats() for endpoint in self.endpoints}
+
+    def _remember(self, routes: "OrderedDict[str, Endpoint]", key: str, endpoint: Endpoint) -> None:
+        routes[key] = endpoint
+        routes.move_to_end(key)
+        while len(routes) > self.max_routes:
+            routes.popitem(last=False)
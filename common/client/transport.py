@@ -0,0 +1,35 @@
+from typing import Any, Dict
+import httpx
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class CountingTransport(httpx.AsyncHTTPTransport):
+    """Connection-pooling transport that counts requests and new connections.
+
+    Uses the httpcore ``trace`` extension to see when a TCP connection or TLS
+    handshake actually happens, so ``reused`` shows how many requests rode on
+    an existing keep-alive connection.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.counters = {"requests": 0, "connections_opened": 0, "tls_handshakes": 0}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.counters["requests"] += 1
+        request.extensions["trace"] = self._trace
+        return await super().handle_async_request(request)
+
+    async def _trace(self, event_name: str, info: Dict[str, Any]) -> None:
+        if event_name == "connection.connect_tcp.complete":
+            self.counters["connections_opened"] += 1
+        elif event_name == "connection.start_tls.complete":
+            self.counters["tls_handshakes"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            **self.counters,
+            "reused": self.counters["requests"] - self.counters["connections_opened"],
+        }
@@ -53,6 +53,9 @@ export type Artifact = {
   description?: string | null;
   parts: Part[];
   metadata?: Record<string, unknown> | null;
+  index?: number;
+  append?: boolean | null;
+  lastChunk?: boolean | null;
 };
 
 export type Task = {
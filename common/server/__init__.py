@@ -1,2 +1,4 @@
 from common.server.server import A2AServer
-from common.server.task_manager import TaskManager 
\ No newline at end of file
+from common.server.task_manager import TaskManager, current_task_params
+from common.server.task_store import TaskStore, InMemoryTaskStore, SqliteTaskStore
+from common.server.worker_pool import WorkerPool, QueueFullError
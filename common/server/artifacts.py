@@ -0,0 +1,50 @@
+from common.a2a.protocol import Artifact, Part, TextPart, DataPart
+
+
+def merge_part(artifact: Artifact, part: Part) -> None:
+    """Merge a streamed part into the last part of an artifact.
+
+    Text is concatenated. For data, string values are concatenated per key
+    and other values replaced by the latest chunk.
+    """
+    last = artifact.parts[-1] if artifact.parts else None
+    if isinstance(part, TextPart) and isinstance(last, TextPart):
+        last.text += part.text
+    elif isinstance(part, DataPart) and isinstance(last, DataPart):
+        for key, value in part.data.items():
+            previous = last.data.get(key)
+            if isinstance(value, str) and isinstance(previous, str):
+                last.data[key] = previous + value
+            else:
+                last.data[key] = value
+    else:
+        artifact.parts.append(part.model_copy(deep=True))
+
+
+def can_merge_losslessly(artifact: Artifact, part: Part) -> bool:
+    """Whether merging part into artifact loses nothing a client would see.
+
+    Text always merges. Data merges only when the chunk's non-string values
+    match the ones already there, so the merged part reads the same as the
+    chunks read one after another.
+    """
+    last = artifact.parts[-1] if artifact.parts else None
+    if isinstance(part, TextPart):
+        return isinstance(last, TextPart) or last is None
+    if isinstance(part, DataPart) and isinstance(last, DataPart):
+        for key, value in part.data.items():
+            previous = last.data.get(key)
+            if isinstance(value, str):
+                if previous is not None and not isinstance(previous, str):
+                    return False
+            elif key not in last.data or previous != value:
+                return False
+        return True
+    return False
+
+
+def part_size(part: Part) -> int:
+    """Approximate payload size of a part, counting only its string content"""
+    if isinstance(part, TextPart):
+        return len(part.text)
+    return sum(len(value) for value in part.data.values() if isinstance(value, str))
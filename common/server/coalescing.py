@@ -0,0 +1,163 @@
+from typing import Any, AsyncIterable, Dict
+from common.a2a.protocol import SendTaskStreamingResponse, TaskArtifactUpdateEvent
+from common.server.artifacts import merge_part, can_merge_losslessly, part_size
+from common.server.task_events import StreamEvent
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the source stream on the coalescing queue
+_END = object()
+
+
+class StreamMetrics:
+    """Counters for SSE streaming, shared by all responses of a server"""
+
+    def __init__(self):
+        self.events_in = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+
+    def record_frame(self, events: int, size: int) -> None:
+        self.events_in += events
+        self.frames_sent += 1
+        self.bytes_sent += size
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "events_in": self.events_in,
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "coalescing_ratio": self.events_in / self.frames_sent if self.frames_sent else 0.0,
+        }
+
+
+class EventCoalescer:
+    """Merge consecutive text deltas of a stream into fewer, larger frames.
+
+    A reader task pulls events from the source into a bounded queue; when
+    the client is slow the queue fills up and the reader stops pulling, so
+    nothing is buffered beyond ``queue_size`` events. Consecutive append
+    chunks of the same artifact are merged until ``window`` seconds have
+    passed since the first of them or ``max_chars`` characters have
+    accumulated. Any other event flushes the pending frame first.
+    """
+
+    def __init__(self, window: float = 0.05, max_chars: int = 2048, queue_size: int = 256):
+        self.window = window
+        self.max_chars = max_chars
+        self.queue_size = queue_size
+
+    async def coalesce(self, source: AsyncIterable[Any]) -> AsyncIterable[tuple]:
+        """Yield (item, merged_event_count) pairs from source"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+
+        async def read():
+            try:
+                async for item in source:
+                    await queue.put(item)
+            except Exception as e:
+                await queue.put((_END, e))
+                return
+            finally:
+                # Stop the source too when the client goes away
+                if hasattr(source, "aclose"):
+                    await source.aclose()
+            await queue.put((_END, None))
+
+        reader = asyncio.create_task(read())
+        loop = asyncio.get_running_loop()
+        pending = None
+        pending_count = 0
+        pending_size = 0
+        deadline = 0.0
+        try:
+            while True:
+                if pending is None:
+                    item = await queue.get()
+                else:
+                    try:
+                        item = await asyncio.wait_for(queue.get(), max(deadline - loop.time(), 0))
+                    except asyncio.TimeoutError:
+                        yield pending, pending_count
+                        pending = None
+                        continue
+
+                if isinstance(item, tuple) and len(item) == 2 and item[0] is _END:
+                    if pending is not None:
+                        yield pending, pending_count
+                    if item[1] is not None:
+                        raise item[1]
+                    return
+
+                if pending is not None and self._can_merge(pending, item):
+                    artifact = _artifact_of(item)
+                    for part in artifact.parts:
+                        merge_part(_artifact_of(pending), part)
+                        pending_size += part_size(part)
+                    pending = _with_event_id(pending, item)
+                    pending_count += 1
+                    if pending_size >= self.max_chars:
+                        yield pending, pending_count
+                        pending = None
+                    continue
+
+                if pending is not None:
+                    yield pending, pending_count
+                    pending = None
+
+                if _is_mergeable(item):
+                    # Copy: the event may be shared with other subscribers
+                    pending = _copy_item(item)
+                    pending_count = 1
+                    pending_size = sum(part_size(part) for part in _artifact_of(item).parts)
+                    deadline = loop.time() + self.window
+                else:
+                    yield item, 1
+        finally:
+            reader.cancel()
+
+    def _can_merge(self, pending: Any, item: Any) -> bool:
+        if not _is_mergeable(item):
+            return False
+        current, artifact = _artifact_of(pending), _artifact_of(item)
+        if artifact.index != current.index or not artifact.append:
+            return False
+        if _response_of(pending).id != _response_of(item).id:
+            return False
+        return all(can_merge_losslessly(current, part) for part in artifact.parts)
+
+
+def _response_of(item: Any) -> SendTaskStreamingResponse:
+    return item.response if isinstance(item, StreamEvent) else item
+
+
+def _artifact_of(item: Any):
+    return _response_of(item).result.artifact
+
+
+def _is_mergeable(item: Any) -> bool:
+    response = _response_of(item)
+    if not isinstance(response, SendTaskStreamingResponse) or response.error is not None:
+        return False
+    result = response.result
+    return (
+        isinstance(result, TaskArtifactUpdateEvent)
+        and not result.artifact.lastChunk
+        and bool(result.artifact.parts)
+    )
+
+
+def _copy_item(item: Any) -> Any:
+    if isinstance(item, StreamEvent):
+        return StreamEvent(item.id, item.response.model_copy(deep=True))
+    return item.model_copy(deep=True)
+
+
+def _with_event_id(pending: Any, item: Any) -> Any:
+    # A merged frame carries the id of the last event in it, so a client
+    # resuming from it does not see those events again
+    if isinstance(pending, StreamEvent) and isinstance(item, StreamEvent):
+        return StreamEvent(item.id, pending.response)
+    return pending
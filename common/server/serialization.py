@@ -0,0 +1,32 @@
+from typing import Any
+from pydantic import BaseModel
+from starlette.responses import JSONResponse
+
+
+def dump_model_json(model: BaseModel) -> str:
+    """Serialize a Pydantic model to a JSON string in a single pass.
+
+    Pydantic's Rust serializer handles datetime and nested models natively,
+    so there is no need for the dict -> json -> dict round trip.
+    """
+    return model.model_dump_json(exclude_none=True)
+
+
+def dump_model_bytes(model: BaseModel) -> bytes:
+    """Serialize a Pydantic model straight to UTF-8 JSON bytes"""
+    return model.__pydantic_serializer__.to_json(model, exclude_none=True)
+
+
+class ModelJSONResponse(JSONResponse):
+    """JSONResponse that renders Pydantic models directly to bytes.
+
+    Lists of models (JSON-RPC batch responses) are rendered element by element.
+    Anything else falls back to the default Starlette encoder.
+    """
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return dump_model_bytes(content)
+        if isinstance(content, list) and all(isinstance(item, BaseModel) for item in content):
+            return b"[" + b",".join(dump_model_bytes(item) for item in content) + b"]"
+        return super().render(content)
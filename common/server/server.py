@@ -6,42 +6,33 @@ from sse_starlette.sse import EventSourceResponse
 from common.a2a.protocol import (
     SendTaskRequest,
     SendTaskStreamingRequest,
+    GetTaskRequest,
+    CancelTaskRequest,
+    TaskResubscriptionRequest,
     JSONRPCResponse,
     InvalidRequestError,
+    MethodNotFoundError,
     JSONParseError,
     InternalError,
+    ServerBusyError,
     AgentCard,
 )
 from pydantic import ValidationError
 import json
 import uuid
-from typing import Any, AsyncIterable
+from typing import Any, AsyncIterable, Callable
 from common.server.task_manager import TaskManager
+from common.server.serialization import ModelJSONResponse, dump_model_json
+from common.server.worker_pool import QueueFullError
+from common.server.task_events import StreamEvent
+from common.server.coalescing import EventCoalescer, StreamMetrics
 import uvicorn
 import asyncio
-from datetime import datetime
 
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Custom JSON encoder to handle datetime objects
-class DateTimeEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return super().default(obj)
-
-# Helper function to safely serialize Pydantic models with datetime objects
-def serialize_model(model):
-    """Safely serialize Pydantic models with datetime objects"""
-    # First convert to dict with model_dump
-    model_dict = model.model_dump(exclude_none=True)
-    # Then use custom JSON encoder for datetime
-    json_str = json.dumps(model_dict, cls=DateTimeEncoder)
-    # Convert back to dict
-    return json.loads(json_str)
-
 
 class A2AServer:
     def __init__(
@@ -55,12 +46,24 @@ class A2AServer:
         allow_methods: list[str] = ["GET", "POST", "OPTIONS"],
         allow_headers: list[str] = ["*"],
         allow_credentials: bool = False,
+        stream_coalesce_window: float | None = 0.05,
+        stream_coalesce_max_chars: int = 2048,
+        stream_queue_size: int = 256,
     ):
         self.host = host
         self.port = port
         self.endpoint = endpoint
         self.task_manager = task_manager
         self.agent_card = agent_card
+        # Merge streamed text deltas into fewer SSE frames (None disables)
+        self.coalescer = (
+            EventCoalescer(stream_coalesce_window, stream_coalesce_max_chars, stream_queue_size)
+            if stream_coalesce_window is not None
+            else None
+        )
+        self.stream_metrics = StreamMetrics()
+        # Extra sections for /stats, e.g. from the agent behind the handlers
+        self.stats_providers: dict[str, Callable[[], dict]] = {}
         self.app = Starlette()
         
         # Add CORS middleware
@@ -76,6 +79,7 @@ class A2AServer:
         self.app.add_route(
             "/.well-known/agent.json", self._get_agent_card, methods=["GET"]
         )
+        self.app.add_route("/stats", self._get_stats, methods=["GET"])
         self.server = None
 
     def start(self):
@@ -103,11 +107,26 @@ class A2AServer:
         await self.server.serve()
 
     def _get_agent_card(self, request: Request) -> JSONResponse:
-        return JSONResponse(serialize_model(self.agent_card))
+        return ModelJSONResponse(self.agent_card)
+
+    def register_stats(self, name: str, provider: Callable[[], dict]) -> None:
+        """Add provider() to the /stats response under name"""
+        self.stats_providers[name] = provider
+
+    def _get_stats(self, request: Request) -> JSONResponse:
+        stats = self.task_manager.stats()
+        stats["streaming"] = self.stream_metrics.stats()
+        for name, provider in self.stats_providers.items():
+            stats[name] = provider()
+        return JSONResponse(stats)
 
     async def _process_request(self, request: Request):
         try:
             body = await request.json()
+
+            # JSON-RPC 2.0 batch: an array of request objects
+            if isinstance(body, list):
+                return await self._process_batch(body)
             
             # Basic validation
             if not isinstance(body, dict) or "method" not in body:
@@ -122,11 +141,21 @@ class A2AServer:
             if body.get("method") == "tasks/send":
                 json_rpc_request = SendTaskRequest(**body)
                 result = await self.task_manager.on_send_task(json_rpc_request)
-                # Use our serialize_model helper to safely handle datetime objects
-                return JSONResponse(serialize_model(result))
+                # Serialize the response model straight to bytes
+                return ModelJSONResponse(result)
+            elif body.get("method") == "tasks/get":
+                json_rpc_request = GetTaskRequest(**body)
+                result = await self.task_manager.on_get_task(json_rpc_request)
+                return ModelJSONResponse(result)
+            elif body.get("method") == "tasks/cancel":
+                json_rpc_request = CancelTaskRequest(**body)
+                result = await self.task_manager.on_cancel_task(json_rpc_request)
+                return ModelJSONResponse(result)
             elif body.get("method") == "tasks/send/stream":
                 logger.info(f"Received streaming request: {body}")
                 json_rpc_request = SendTaskStreamingRequest(**body)
+                # Reject before opening the stream if no worker slot can be queued
+                self.task_manager.worker_pool.ensure_capacity()
                 # 不对异步生成器使用await，直接传递给_create_streaming_response
                 result = self.task_manager.on_send_task_streaming(json_rpc_request)
                 
@@ -136,36 +165,130 @@ class A2AServer:
                 
                 # Create streaming response
                 return self._create_streaming_response(result)
+            elif body.get("method") == "tasks/resubscribe":
+                json_rpc_request = TaskResubscriptionRequest(**body)
+                # Replay events the client has not seen yet
+                last_event_id = request.headers.get("last-event-id")
+                try:
+                    last_event_id = int(last_event_id) if last_event_id else None
+                except ValueError:
+                    logger.warning(f"Ignoring invalid Last-Event-ID: {last_event_id}")
+                    last_event_id = None
+                result = self.task_manager.on_resubscribe_to_task(json_rpc_request, last_event_id)
+                return self._create_streaming_response(result)
             else:
                 return self._handle_exception(
                     ValueError(f"Unsupported method: {body.get('method')}"),
                     request_id=body.get("id", str(uuid.uuid4()))  # 获取请求中的id或生成一个
                 )
 
+        except QueueFullError as e:
+            logger.warning(f"Rejecting request: {e}")
+            request_id = body.get("id") if isinstance(body, dict) else None
+            return self._busy_response(e, request_id=request_id or str(uuid.uuid4()))
         except Exception as e:
             logger.error(f"Error processing request: {e}")
             # 无法从请求中获取id时生成一个新的唯一id
             request_id = str(uuid.uuid4())
             return self._handle_exception(e, request_id=request_id)
 
+    async def _process_batch(self, batch: list) -> JSONResponse:
+        """Dispatch a JSON-RPC batch concurrently and return one array response"""
+        if not batch:
+            response = JSONRPCResponse(
+                id=str(uuid.uuid4()),
+                error=InvalidRequestError(message="Empty batch request"),
+            )
+            return ModelJSONResponse(response, status_code=400)
+
+        logger.info(f"Received batch request with {len(batch)} entries")
+        responses = await asyncio.gather(
+            *(self._process_batch_entry(entry) for entry in batch)
+        )
+        return ModelJSONResponse(list(responses))
+
+    async def _process_batch_entry(self, entry: Any) -> JSONRPCResponse:
+        """Process a single batch entry, isolating its errors from the rest"""
+        if not isinstance(entry, dict) or "method" not in entry:
+            return JSONRPCResponse(
+                id=str(uuid.uuid4()),
+                error=InvalidRequestError(data="Invalid request format"),
+            )
+
+        request_id = entry.get("id") or str(uuid.uuid4())
+        method = entry.get("method")
+        try:
+            if method == "tasks/send":
+                json_rpc_request = SendTaskRequest(**entry)
+                return await self.task_manager.on_send_task(json_rpc_request)
+            elif method == "tasks/get":
+                json_rpc_request = GetTaskRequest(**entry)
+                return await self.task_manager.on_get_task(json_rpc_request)
+            elif method == "tasks/cancel":
+                json_rpc_request = CancelTaskRequest(**entry)
+                return await self.task_manager.on_cancel_task(json_rpc_request)
+            elif method in ("tasks/send/stream", "tasks/resubscribe"):
+                return JSONRPCResponse(
+                    id=request_id,
+                    error=InvalidRequestError(
+                        message="Streaming methods are not supported in batch requests",
+                        data=method,
+                    ),
+                )
+            else:
+                return JSONRPCResponse(
+                    id=request_id,
+                    error=MethodNotFoundError(message=f"Unsupported method: {method}"),
+                )
+        except QueueFullError as e:
+            return JSONRPCResponse(id=request_id, error=ServerBusyError(data={"retryAfter": e.retry_after}))
+        except Exception as e:
+            logger.error(f"Error processing batch entry {request_id}: {e}")
+            return self._build_error_response(e, request_id)
+
     def _create_streaming_response(self, result: AsyncIterable) -> EventSourceResponse:
         """Create a streaming Server-Sent Events response"""
+        async def passthrough(result) -> AsyncIterable[tuple]:
+            async for item in result:
+                yield item, 1
+
         async def event_generator(result) -> AsyncIterable[dict[str, str]]:
+            items = self.coalescer.coalesce(result) if self.coalescer else passthrough(result)
             try:
-                async for item in result:
-                    # Log the item 
-                    logger.info(f"Streaming item: {item}")
-                    
-                    # Serialize the item to JSON
-                    serialized = json.dumps(serialize_model(item))
-                    yield {"data": serialized}
+                async for item, event_count in items:
+                    logger.debug(f"Streaming item: {item}")
+
+                    # Serialize the item to JSON once; SSE frames are text.
+                    # Task events carry an id clients can resume from
+                    if isinstance(item, StreamEvent):
+                        frame = {"id": str(item.id), "data": dump_model_json(item.response)}
+                    else:
+                        frame = {"data": dump_model_json(item)}
+                    self.stream_metrics.record_frame(event_count, len(frame["data"].encode()))
+                    yield frame
             except Exception as e:
                 logger.error(f"Error in streaming generator: {e}")
                 raise
 
         return EventSourceResponse(event_generator(result))
 
+    def _busy_response(self, e: QueueFullError, request_id: str) -> JSONResponse:
+        """429 response telling the client when to retry"""
+        response = JSONRPCResponse(
+            id=request_id,
+            error=ServerBusyError(data={"retryAfter": e.retry_after}),
+        )
+        return ModelJSONResponse(
+            response,
+            status_code=429,
+            headers={"Retry-After": str(max(1, round(e.retry_after)))},
+        )
+
     def _handle_exception(self, e: Exception, request_id: str = "") -> JSONResponse:
+        response = self._build_error_response(e, request_id)
+        return ModelJSONResponse(response, status_code=400)
+
+    def _build_error_response(self, e: Exception, request_id: str = "") -> JSONRPCResponse:
         # 确保request_id始终是一个非空字符串
         if not request_id:
             request_id = str(uuid.uuid4())
@@ -178,5 +301,4 @@ class A2AServer:
             logger.error(f"Unhandled exception: {e}")
             json_rpc_error = InternalError(message=str(e))
 
-        response = JSONRPCResponse(id=request_id, error=json_rpc_error)
-        return JSONResponse(serialize_model(response), status_code=400) 
\ No newline at end of file
+        return JSONRPCResponse(id=request_id, error=json_rpc_error) 
\ No newline at end of file
@@ -0,0 +1,115 @@
+from typing import AsyncIterable, Deque, Dict, List, NamedTuple, Optional
+from collections import deque
+from common.a2a.protocol import Artifact, SendTaskStreamingResponse, TaskArtifactUpdateEvent, TaskStatusUpdateEvent
+from common.server.artifacts import merge_part
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class StreamEvent(NamedTuple):
+    """A streaming response tagged with its per-task event id"""
+    id: int
+    response: SendTaskStreamingResponse
+
+
+class TaskEventStream:
+    """Ring buffer of a task's streaming events with live fan-out.
+
+    The task's processing publishes every event once; any number of
+    subscribers replay the buffered events after a given event id and then
+    follow the live stream. Event ids increase by one per event, starting
+    at 1. The stream also keeps each artifact compacted and the latest
+    status, so a subscriber that falls more than ``buffer_size`` events
+    behind is resynced: it gets every artifact in full (``append=False``)
+    and the current status, then continues with live events.
+    """
+
+    def __init__(self, task_id: str, buffer_size: int = 1000):
+        self.task_id = task_id
+        self.events: Deque[StreamEvent] = deque(maxlen=buffer_size)
+        self.last_id = 0
+        self.closed = False
+        self._changed = asyncio.Event()
+        # index -> artifact with every chunk published so far merged in
+        self._artifacts: Dict[int, Artifact] = {}
+        self._status: Optional[SendTaskStreamingResponse] = None
+
+    def publish(self, response: SendTaskStreamingResponse) -> StreamEvent:
+        self.last_id += 1
+        event = StreamEvent(self.last_id, response)
+        self.events.append(event)
+        self._compact(response)
+        self._notify()
+        return event
+
+    def close(self) -> None:
+        """Mark the stream finished; subscribers end after the last event"""
+        self.closed = True
+        self._notify()
+
+    async def subscribe(self, last_event_id: Optional[int] = None) -> AsyncIterable[StreamEvent]:
+        """Yield events after last_event_id (all buffered events if None), then live events"""
+        cursor = last_event_id or 0
+        while True:
+            changed = self._changed
+            for event in self._events_after(cursor):
+                yield event
+                cursor = event.id
+            if self.closed and cursor >= self.last_id:
+                return
+            if cursor >= self.last_id:
+                await changed.wait()
+
+    def _events_after(self, cursor: int) -> list:
+        if not self.events or cursor >= self.last_id:
+            return []
+        first_id = self.events[0].id
+        if cursor < first_id - 1:
+            logger.warning(f"Subscriber to task {self.task_id} missed events {cursor + 1}-{first_id - 1}, resyncing")
+            return self._snapshot(cursor)
+        start = cursor - first_id + 1
+        return [self.events[i] for i in range(start, len(self.events))]
+
+    def _compact(self, response: SendTaskStreamingResponse) -> None:
+        result = response.result
+        if isinstance(result, TaskStatusUpdateEvent):
+            self._status = response
+        elif isinstance(result, TaskArtifactUpdateEvent):
+            artifact = result.artifact
+            stored = self._artifacts.get(artifact.index)
+            if stored is None or not artifact.append:
+                self._artifacts[artifact.index] = artifact.model_copy(deep=True, update={"append": False})
+                return
+            for part in artifact.parts:
+                merge_part(stored, part.model_copy(deep=True))
+            if artifact.lastChunk:
+                stored.lastChunk = True
+
+    def _snapshot(self, cursor: int) -> List[StreamEvent]:
+        """Full artifacts and the current status as of the latest event.
+
+        Only the last of them carries that event's id; the others keep the
+        subscriber's cursor, so resuming part-way through resyncs again.
+        """
+        latest = self.events[-1].response
+        responses = [
+            latest.model_copy(update={
+                "result": TaskArtifactUpdateEvent(id=self.task_id, artifact=artifact.model_copy(deep=True)),
+            })
+            for _, artifact in sorted(self._artifacts.items())
+        ]
+        if self._status is not None:
+            responses.append(self._status)
+        if not responses:
+            return list(self.events)
+        return [
+            StreamEvent(self.last_id if i == len(responses) - 1 else cursor, response)
+            for i, response in enumerate(responses)
+        ]
+
+    def _notify(self) -> None:
+        # Wake everyone waiting on the current event, then start a fresh one
+        self._changed.set()
+        self._changed = asyncio.Event()
@@ -1,4 +1,5 @@
-from typing import AsyncIterable, Any, Dict, Callable, Awaitable, Optional, Union
+from typing import AsyncIterable, Any, Dict, Callable, Awaitable, Optional, Union, List, Tuple, Set
+from contextvars import ContextVar
 import asyncio
 from common.a2a.protocol import (
     Task,
@@ -14,15 +15,58 @@ from common.a2a.protocol import (
     JSONRPCError,
     SendTaskStreamingRequest,
     SendTaskStreamingResponse,
+    GetTaskRequest,
+    GetTaskResponse,
+    CancelTaskRequest,
+    CancelTaskResponse,
+    TaskNotFoundError,
+    TaskNotCancelableError,
+    TaskResubscriptionRequest,
+    TaskSendParams,
 )
+from common.server.task_store import TaskStore, InMemoryTaskStore, TERMINAL_STATES
+from common.server.worker_pool import WorkerPool, QueueFullError
+from common.server.task_events import TaskEventStream, StreamEvent
+from common.server.artifacts import merge_part
 import logging
 from uuid import uuid4
 
 logger = logging.getLogger(__name__)
 
+# Chunks buffered between concurrently running handlers and the consumer
+HANDLER_QUEUE_SIZE = 64
+# Sentinel a handler task puts on the queue when it has finished
+_HANDLER_DONE = object()
+
+# Params (sessionId, metadata, ...) of the task whose handlers are running;
+# handlers only receive the message and can read the rest from here
+current_task_params: ContextVar[Optional[TaskSendParams]] = ContextVar("current_task_params", default=None)
+
 class TaskManager:
-    def __init__(self):
-        self.tasks: Dict[str, Task] = {}
+    def __init__(
+        self,
+        task_store: Optional[TaskStore] = None,
+        worker_pool: Optional[WorkerPool] = None,
+        concurrent_handlers: bool = False,
+        handler_timeout: Optional[float] = None,
+        event_buffer_size: int = 1000,
+        event_retention_seconds: float = 300,
+    ):
+        # Pluggable task storage; defaults to an unbounded in-memory store
+        self.tasks: TaskStore = task_store if task_store is not None else InMemoryTaskStore()
+        # Bounded worker pool with admission control for task processing
+        self.worker_pool = worker_pool if worker_pool is not None else WorkerPool()
+        # Run registered handlers concurrently instead of one after another
+        self.concurrent_handlers = concurrent_handlers
+        # Per-handler timeout in seconds (None means no limit)
+        self.handler_timeout = handler_timeout
+        # asyncio tasks doing the work for each running A2A task, for cancellation
+        self._running_jobs: Dict[str, Set[asyncio.Task]] = {}
+        # Replayable event streams of streaming tasks, kept for
+        # event_retention_seconds after the task finishes
+        self._event_streams: Dict[str, TaskEventStream] = {}
+        self.event_buffer_size = event_buffer_size
+        self.event_retention_seconds = event_retention_seconds
         self.handlers: Dict[str, Callable[[Message], Awaitable[Union[str, Dict[str, Any]]]]] = {}
         # For streaming handlers
         self.streaming_handlers: Dict[str, Callable[[Message], AsyncIterable[Union[str, Dict[str, Any]]]]] = {}
@@ -41,6 +85,23 @@ class TaskManager:
         logger.info(f"Registered streaming handler with ID: {handler_id}")
         return handler_id
 
+    def stats(self) -> Dict[str, Any]:
+        """Return task store and worker pool statistics"""
+        return {
+            "task_store": self.tasks.stats(),
+            "worker_pool": self.worker_pool.stats(),
+            "event_streams": len(self._event_streams),
+        }
+
+    def _get_priority(self, task_params) -> int:
+        """Read the scheduling priority from task metadata (lower runs first)"""
+        if task_params.metadata and "priority" in task_params.metadata:
+            try:
+                return int(task_params.metadata["priority"])
+            except (TypeError, ValueError):
+                logger.warning(f"Ignoring invalid task priority: {task_params.metadata['priority']}")
+        return 0
+
     async def on_send_task(self, request: SendTaskRequest) -> JSONRPCResponse:
         """Handle a new task request"""
         try:
@@ -59,14 +120,24 @@ class TaskManager:
                 ),
                 history=[task_params.message] if task_params.message else [],
             )
-            self.tasks[task_id] = task
+            self.tasks.save(task)
 
-            # Process the task asynchronously
-            asyncio.create_task(self._process_task(task_id, task_params.message))
+            # Queue the task on the worker pool; rejected tasks are not kept
+            try:
+                job = self.worker_pool.submit(
+                    lambda: self._process_task(task_id, task_params.message, task_params),
+                    priority=self._get_priority(task_params),
+                )
+                self._track_job(task_id, job)
+            except QueueFullError:
+                self.tasks.delete(task_id)
+                raise
             
             # Return the initial task
             return SendTaskResponse(id=request.id, result=task)
             
+        except QueueFullError:
+            raise
         except Exception as e:
             logger.error(f"Error processing task: {e}")
             return SendTaskResponse(
@@ -77,8 +148,44 @@ class TaskManager:
                 )
             )
             
-    async def on_send_task_streaming(self, request: SendTaskStreamingRequest) -> AsyncIterable[SendTaskStreamingResponse]:
-        """Handle a new streaming task request"""
+    async def on_get_task(self, request: GetTaskRequest) -> GetTaskResponse:
+        """Return the current state of a task, trimming history to historyLength"""
+        query = request.params
+        task = self.tasks.get(query.id)
+        if task is None:
+            return GetTaskResponse(id=request.id, error=TaskNotFoundError())
+
+        if query.historyLength is not None and task.history:
+            history = task.history[-query.historyLength:] if query.historyLength > 0 else []
+            task = task.model_copy(update={"history": history})
+        return GetTaskResponse(id=request.id, result=task)
+
+    async def on_cancel_task(self, request: CancelTaskRequest) -> CancelTaskResponse:
+        """Cancel a task, stopping the coroutines (and LLM/tool calls) running it"""
+        task_id = request.params.id
+        task = self.tasks.get(task_id)
+        if task is None:
+            return CancelTaskResponse(id=request.id, error=TaskNotFoundError())
+        if task.status.state in TERMINAL_STATES:
+            return CancelTaskResponse(id=request.id, error=TaskNotCancelableError())
+
+        # Mark the task canceled first so the workers can tell a user cancel
+        # from a client disconnect
+        task.status = TaskStatus(state=TaskState.CANCELED)
+        self.tasks.save(task)
+        jobs = self._running_jobs.pop(task_id, set())
+        for job in jobs:
+            job.cancel()
+        logger.info(f"Canceled task {task_id} ({len(jobs)} running jobs)")
+        return CancelTaskResponse(id=request.id, result=task)
+
+    async def on_send_task_streaming(self, request: SendTaskStreamingRequest) -> AsyncIterable[Union[StreamEvent, SendTaskStreamingResponse]]:
+        """Handle a new streaming task request.
+
+        The task runs in the background and publishes its events to a
+        replayable event stream; this generator only follows that stream, so
+        a dropped connection does not stop the task.
+        """
         try:
             # Extract task parameters
             task_params = request.params
@@ -89,6 +196,14 @@ class TaskManager:
 
             logger.info(f"Task params: {task_params}")
 
+            # Share a task that is already streaming instead of starting it again
+            stream = self._event_streams.get(task_id)
+            if stream is not None and not stream.closed:
+                logger.info(f"Attaching to running stream for task: {task_id}")
+                async for event in self._follow_event_stream(stream, request.id):
+                    yield event
+                return
+
             # Create initial task
             task = Task(
                 id=task_id,
@@ -98,7 +213,9 @@ class TaskManager:
                 ),
                 history=[task_params.message] if task_params.message else [],
             )
-            self.tasks[task_id] = task
+            self.tasks.save(task)
+            stream = TaskEventStream(task_id, buffer_size=self.event_buffer_size)
+            self._event_streams[task_id] = stream
             
             # First response: task submitted
             status_update = TaskStatusUpdateEvent(
@@ -106,14 +223,25 @@ class TaskManager:
                 status=TaskStatus(state=TaskState.SUBMITTED),
                 final=False
             )
-            logger.info(f"Yielding initial status update for task: {task_id}")
-            yield SendTaskStreamingResponse(id=request.id, result=status_update)
+            logger.info(f"Publishing initial status update for task: {task_id}")
+            stream.publish(SendTaskStreamingResponse(id=request.id, result=status_update))
             
-            # Stream task processing
+            # Stream task processing on the worker pool
             logger.info(f"Starting to stream task processing for: {task_id}")
-            async for response in self._stream_task_processing(task_id, task_params.message, request.id):
-                logger.info(f"Yielding streaming response for task: {task_id}")
-                yield response
+            try:
+                job = self.worker_pool.submit(
+                    lambda: self._publish_task_processing(stream, task_id, task_params.message, request.id, task_params),
+                    priority=self._get_priority(task_params),
+                )
+                self._track_job(task_id, job)
+                job.add_done_callback(lambda job: self._finish_event_stream(stream, task_id, request.id, job))
+            except QueueFullError:
+                self._event_streams.pop(task_id, None)
+                self.tasks.delete(task_id)
+                raise
+
+            async for event in self._follow_event_stream(stream, request.id):
+                yield event
             
         except Exception as e:
             logger.error(f"Error processing streaming task: {e}")
@@ -126,43 +254,124 @@ class TaskManager:
                 )
             )
 
-    async def _process_task(self, task_id: str, message: Message):
+    async def on_resubscribe_to_task(
+        self,
+        request: TaskResubscriptionRequest,
+        last_event_id: Optional[int] = None,
+    ) -> AsyncIterable[Union[StreamEvent, SendTaskStreamingResponse]]:
+        """Replay a task's events after last_event_id, then follow the live stream"""
+        task_id = request.params.id
+        stream = self._event_streams.get(task_id)
+        if stream is not None:
+            logger.info(f"Resubscribing to task {task_id} after event {last_event_id}")
+            async for event in self._follow_event_stream(stream, request.id, last_event_id):
+                yield event
+            return
+
+        task = self.tasks.get(task_id)
+        if task is None:
+            yield SendTaskStreamingResponse(id=request.id, error=TaskNotFoundError())
+            return
+
+        # The event stream has been retired; send the task's current state
+        for artifact in task.artifacts or []:
+            yield SendTaskStreamingResponse(
+                id=request.id,
+                result=TaskArtifactUpdateEvent(id=task_id, artifact=artifact),
+            )
+        yield SendTaskStreamingResponse(
+            id=request.id,
+            result=TaskStatusUpdateEvent(
+                id=task_id,
+                status=task.status,
+                final=task.status.state in TERMINAL_STATES,
+            ),
+        )
+
+    async def _follow_event_stream(
+        self,
+        stream: TaskEventStream,
+        request_id: str,
+        last_event_id: Optional[int] = None,
+    ) -> AsyncIterable[StreamEvent]:
+        """Follow a task's event stream, answering under this request's id"""
+        async for event in stream.subscribe(last_event_id):
+            if event.response.id != request_id:
+                event = StreamEvent(event.id, event.response.model_copy(update={"id": request_id}))
+            yield event
+
+    async def _publish_task_processing(
+        self,
+        stream: TaskEventStream,
+        task_id: str,
+        message: Message,
+        request_id: str,
+        params: Optional[TaskSendParams] = None,
+    ):
+        """Run a streaming task, publishing each response to its event stream"""
+        # Runs in its own worker task, so this doesn't leak into other tasks
+        current_task_params.set(params)
+        async for response in self._stream_task_processing(task_id, message, request_id):
+            stream.publish(response)
+
+    def _finish_event_stream(self, stream: TaskEventStream, task_id: str, request_id: str, job: asyncio.Task) -> None:
+        """Close a streaming task's event stream once the job running it is done.
+
+        A done callback rather than a finally in the job: a job canceled
+        while still queued for a worker slot never runs its body.
+        """
+        task = self.tasks.get(task_id)
+        if job.cancelled() and task is not None and task.status.state == TaskState.CANCELED:
+            last = stream.events[-1].response.result if stream.events else None
+            if not (isinstance(last, TaskStatusUpdateEvent) and last.final):
+                stream.publish(SendTaskStreamingResponse(
+                    id=request_id,
+                    result=TaskStatusUpdateEvent(id=task_id, status=task.status, final=True),
+                ))
+        stream.close()
+        # Keep the finished stream around for late resubscribers
+        asyncio.get_running_loop().call_later(
+            self.event_retention_seconds, self._retire_event_stream, task_id, stream
+        )
+
+    def _retire_event_stream(self, task_id: str, stream: TaskEventStream) -> None:
+        if self._event_streams.get(task_id) is stream:
+            del self._event_streams[task_id]
+
+    async def _process_task(self, task_id: str, message: Message, params: Optional[TaskSendParams] = None):
         """Process a task with registered handlers"""
+        current_task_params.set(params)
         task = self.tasks.get(task_id)
-        if not task:
+        if not task or task.status.state == TaskState.CANCELED:
             return
         
         # Update task status to working
         task.status.state = TaskState.WORKING
+        self.tasks.save(task)
         
         try:
-            # Process the message with all handlers
-            for handler_id, handler in self.handlers.items():
-                result = await handler(message)
-                
-                # Create artifact from result
-                if isinstance(result, str):
-                    # Text response
-                    artifact = self._create_text_artifact(result)
-                elif isinstance(result, dict):
-                    # Data response
-                    artifact = self._create_data_artifact(result)
-                else:
-                    # Unsupported response
-                    logger.warning(f"Unsupported result type: {type(result)}")
-                    continue
-                    
-                # Add artifact to task
-                if not task.artifacts:
-                    task.artifacts = []
-                task.artifacts.append(artifact)
+            if self.concurrent_handlers:
+                # Run all handlers at once; total latency is the slowest handler
+                for handler_id, result in await self._run_handlers_concurrently(message):
+                    self._add_result_artifact(task, handler_id, result)
+            else:
+                # Process the message with all handlers, one after another
+                for handler_id, handler in self.handlers.items():
+                    try:
+                        result = await self._with_timeout(handler(message))
+                    except asyncio.TimeoutError:
+                        logger.warning(f"Handler {handler_id} timed out after {self.handler_timeout}s")
+                        continue
+                    self._add_result_artifact(task, handler_id, result)
             
             # Update task status to completed
             task.status.state = TaskState.COMPLETED
+            self.tasks.save(task)
             
         except Exception as e:
             logger.error(f"Error during task processing: {e}")
             task.status.state = TaskState.FAILED
+            self.tasks.save(task)
             
     async def _stream_task_processing(self, task_id: str, message: Message, request_id: str) -> AsyncIterable[SendTaskStreamingResponse]:
         """Stream task processing with registered streaming handlers"""
@@ -170,9 +379,18 @@ class TaskManager:
         if not task:
             logger.error(f"Task not found: {task_id}")
             return
+
+        # Canceled while waiting for a worker slot
+        if task.status.state == TaskState.CANCELED:
+            yield SendTaskStreamingResponse(
+                id=request_id,
+                result=TaskStatusUpdateEvent(id=task_id, status=task.status, final=True),
+            )
+            return
         
         # Update and stream task status to working
         task.status.state = TaskState.WORKING
+        self.tasks.save(task)
         status_update = TaskStatusUpdateEvent(
             id=task_id,
             status=TaskStatus(state=TaskState.WORKING),
@@ -183,81 +401,74 @@ class TaskManager:
         
         try:
             # Check if we have streaming handlers
-            if not self.streaming_handlers:
+            streaming = bool(self.streaming_handlers)
+            if streaming:
+                handlers = self.streaming_handlers
+                logger.info(f"Using {len(handlers)} streaming handlers")
+            else:
                 logger.warning("No streaming handlers registered, falling back to regular handlers")
-                # Fall back to regular handlers
-                for handler_id, handler in self.handlers.items():
-                    logger.info(f"Using regular handler {handler_id} for streaming")
-                    result = await handler(message)
-                    
-                    # Create and stream artifact from result
-                    if isinstance(result, str):
-                        # Text response
-                        logger.info(f"Creating text artifact from string: {result[:50]}...")
-                        artifact = self._create_text_artifact(result)
-                    elif isinstance(result, dict):
-                        # Data response
-                        logger.info(f"Creating data artifact from dict with keys: {list(result.keys())}")
-                        artifact = self._create_data_artifact(result)
-                    else:
-                        # Unsupported response
-                        logger.warning(f"Unsupported result type: {type(result)}")
+                handlers = self.handlers
+
+            # Concurrent mode interleaves all handlers' output as it arrives;
+            # otherwise handlers run one after another
+            if self.concurrent_handlers:
+                handler_groups = [handlers]
+            else:
+                handler_groups = [{handler_id: handler} for handler_id, handler in handlers.items()]
+
+            for group in handler_groups:
+                # One artifact per handler, built up incrementally from its chunks
+                buffers: Dict[str, Artifact] = {}
+                chunk_counter = 0
+                async for handler_id, chunk in self._merge_handler_outputs(task_id, group, message, streaming):
+                    chunk_counter += 1
+                    logger.debug(f"Got chunk {chunk_counter} from handler {handler_id}: {chunk}")
+
+                    artifact = self._append_chunk(task, buffers, handler_id, chunk)
+                    if artifact is None:
                         continue
-                        
-                    # Add artifact to task and stream it
-                    if not task.artifacts:
-                        task.artifacts = []
-                    task.artifacts.append(artifact)
-                    
+
                     artifact_update = TaskArtifactUpdateEvent(
                         id=task_id,
                         artifact=artifact
                     )
-                    logger.info(f"Streaming artifact update from regular handler")
+                    logger.debug(f"Yielding artifact update from handler {handler_id} chunk {chunk_counter}")
                     yield SendTaskStreamingResponse(id=request_id, result=artifact_update)
-            else:
-                # Use streaming handlers
-                logger.info(f"Using {len(self.streaming_handlers)} streaming handlers")
-                for handler_id, streaming_handler in self.streaming_handlers.items():
-                    logger.info(f"Invoking streaming handler {handler_id}")
-                    try:
-                        chunk_counter = 0
-                        async for chunk in streaming_handler(message):
-                            chunk_counter += 1
-                            logger.info(f"Got chunk {chunk_counter} from streaming handler: {chunk}")
-                            
-                            # Process each chunk
-                            if isinstance(chunk, str):
-                                # Text chunk
-                                logger.info(f"Creating text artifact from chunk: {chunk[:50]}...")
-                                artifact = self._create_text_artifact(chunk)
-                            elif isinstance(chunk, dict):
-                                # Data chunk
-                                logger.info(f"Creating data artifact from chunk with keys: {list(chunk.keys())}")
-                                artifact = self._create_data_artifact(chunk)
-                            else:
-                                # Unsupported chunk
-                                logger.warning(f"Unsupported chunk type: {type(chunk)}")
-                                continue
-                                
-                            # Add artifact to task and stream it
-                            if not task.artifacts:
-                                task.artifacts = []
-                            task.artifacts.append(artifact)
-                            
-                            artifact_update = TaskArtifactUpdateEvent(
-                                id=task_id,
-                                artifact=artifact
-                            )
-                            logger.info(f"Yielding artifact update from streaming handler chunk {chunk_counter}")
-                            yield SendTaskStreamingResponse(id=request_id, result=artifact_update)
-                        
-                        logger.info(f"Streaming handler {handler_id} completed with {chunk_counter} chunks")
-                    except Exception as e:
-                        logger.error(f"Error in streaming handler {handler_id}: {e}")
+
+                # Tell clients each artifact is complete
+                for stored in buffers.values():
+                    stored.lastChunk = True
+                    artifact_update = TaskArtifactUpdateEvent(
+                        id=task_id,
+                        artifact=Artifact(
+                            name=stored.name,
+                            parts=[],
+                            metadata=stored.metadata,
+                            index=stored.index,
+                            append=True,
+                            lastChunk=True,
+                        )
+                    )
+                    yield SendTaskStreamingResponse(id=request_id, result=artifact_update)
+                self.tasks.save(task)
+
+                logger.info(f"Handlers {list(group)} completed with {chunk_counter} chunks")
+                if self._is_canceled(task_id):
+                    break
+
+            if self._is_canceled(task_id):
+                status_update = TaskStatusUpdateEvent(
+                    id=task_id,
+                    status=task.status,
+                    final=True
+                )
+                logger.info(f"Task {task_id} was canceled")
+                yield SendTaskStreamingResponse(id=request_id, result=status_update)
+                return
             
             # Update task status to completed
             task.status.state = TaskState.COMPLETED
+            self.tasks.save(task)
             status_update = TaskStatusUpdateEvent(
                 id=task_id,
                 status=TaskStatus(state=TaskState.COMPLETED),
@@ -269,6 +480,7 @@ class TaskManager:
         except Exception as e:
             logger.error(f"Error during streaming task processing: {e}")
             task.status.state = TaskState.FAILED
+            self.tasks.save(task)
             status_update = TaskStatusUpdateEvent(
                 id=task_id,
                 status=TaskStatus(state=TaskState.FAILED),
@@ -276,6 +488,157 @@ class TaskManager:
             )
             logger.info(f"Task {task_id} status set to FAILED due to: {e}")
             yield SendTaskStreamingResponse(id=request_id, result=status_update)
+
+    def _track_job(self, task_id: str, job: asyncio.Task) -> None:
+        """Remember an asyncio task working on task_id until it finishes"""
+        jobs = self._running_jobs.setdefault(task_id, set())
+        jobs.add(job)
+
+        def untrack(finished: asyncio.Task):
+            jobs.discard(finished)
+            if not jobs and self._running_jobs.get(task_id) is jobs:
+                del self._running_jobs[task_id]
+
+        job.add_done_callback(untrack)
+
+    def _is_canceled(self, task_id: str) -> bool:
+        task = self.tasks.get(task_id)
+        return task is not None and task.status.state == TaskState.CANCELED
+
+    async def _with_timeout(self, awaitable: Awaitable[Any]) -> Any:
+        """Await with the per-handler timeout, if one is configured"""
+        if self.handler_timeout is None:
+            return await awaitable
+        return await asyncio.wait_for(awaitable, self.handler_timeout)
+
+    async def _run_handlers_concurrently(self, message: Message) -> List[Tuple[str, Any]]:
+        """Run all regular handlers under a TaskGroup, isolating failures and timeouts"""
+        async def run(handler_id: str, handler) -> Any:
+            try:
+                return await self._with_timeout(handler(message))
+            except asyncio.TimeoutError:
+                logger.warning(f"Handler {handler_id} timed out after {self.handler_timeout}s")
+            except Exception as e:
+                logger.error(f"Error in handler {handler_id}: {e}")
+            return None
+
+        async with asyncio.TaskGroup() as group:
+            jobs = {
+                handler_id: group.create_task(run(handler_id, handler))
+                for handler_id, handler in self.handlers.items()
+            }
+        # Results keep handler registration order
+        return [(handler_id, job.result()) for handler_id, job in jobs.items() if job.result() is not None]
+
+    async def _merge_handler_outputs(
+        self,
+        task_id: str,
+        handlers: Dict[str, Callable],
+        message: Message,
+        streaming: bool,
+    ) -> AsyncIterable[Tuple[str, Any]]:
+        """Yield (handler_id, chunk) from all handlers as the chunks arrive.
+
+        Each handler runs in its own task under the per-handler timeout; a
+        handler that fails or times out ends its own output only. Canceling
+        the A2A task cancels every handler task and ends the output.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=HANDLER_QUEUE_SIZE)
+
+        async def pump(handler_id: str, handler):
+            if streaming:
+                async for chunk in handler(message):
+                    await queue.put((handler_id, chunk))
+            else:
+                await queue.put((handler_id, await handler(message)))
+
+        async def run(handler_id: str, handler):
+            try:
+                await self._with_timeout(pump(handler_id, handler))
+            except asyncio.TimeoutError:
+                logger.warning(f"Handler {handler_id} timed out after {self.handler_timeout}s")
+            except asyncio.CancelledError:
+                # A canceled A2A task still has to end the consumer's loop;
+                # any other cancellation means the consumer is gone
+                if not self._is_canceled(task_id):
+                    raise
+                logger.info(f"Handler {handler_id} canceled with task {task_id}")
+            except Exception as e:
+                logger.error(f"Error in handler {handler_id}: {e}")
+            await queue.put((handler_id, _HANDLER_DONE))
+
+        jobs = [asyncio.create_task(run(handler_id, handler)) for handler_id, handler in handlers.items()]
+        for job in jobs:
+            self._track_job(task_id, job)
+        remaining = len(jobs)
+        try:
+            while remaining:
+                handler_id, chunk = await queue.get()
+                if chunk is _HANDLER_DONE:
+                    remaining -= 1
+                    continue
+                yield handler_id, chunk
+        finally:
+            # The consumer may stop early; don't leave handlers running
+            for job in jobs:
+                job.cancel()
+
+    def _append_chunk(self, task: Task, buffers: Dict[str, Artifact], handler_id: str, chunk: Any) -> Optional[Artifact]:
+        """Append a streamed chunk to its handler's artifact.
+
+        Returns the chunk as an artifact update for the wire (carrying the
+        artifact index and append flag); the task itself keeps a single
+        compacted artifact per handler.
+        """
+        artifact = self._create_artifact(chunk, handler_id)
+        if artifact is None:
+            return None
+
+        stored = buffers.get(handler_id)
+        if stored is None:
+            if not task.artifacts:
+                task.artifacts = []
+            artifact.index = len(task.artifacts)
+            stored = artifact.model_copy(deep=True)
+            task.artifacts.append(stored)
+            buffers[handler_id] = stored
+        else:
+            artifact.index = stored.index
+            artifact.append = True
+            for part in artifact.parts:
+                merge_part(stored, part)
+        # Saved once the artifact is complete, not per chunk: persisting
+        # re-serializes the whole task
+        return artifact
+
+    def _add_result_artifact(self, task: Task, handler_id: str, result: Any) -> None:
+        """Convert a handler result to an artifact and store it on the task"""
+        artifact = self._create_artifact(result, handler_id)
+        if artifact is None:
+            return
+        if not task.artifacts:
+            task.artifacts = []
+        artifact.index = len(task.artifacts)
+        task.artifacts.append(artifact)
+        self.tasks.save(task)
+
+    def _create_artifact(self, result: Any, handler_id: str) -> Optional[Artifact]:
+        """Create an artifact from a handler result, or None if unsupported"""
+        if isinstance(result, str):
+            # Text response
+            artifact = self._create_text_artifact(result)
+        elif isinstance(result, dict):
+            # Data response
+            artifact = self._create_data_artifact(result)
+        else:
+            # Unsupported response
+            logger.warning(f"Unsupported result type: {type(result)}")
+            return None
+
+        # Interleaved output needs to say which handler it came from
+        if self.concurrent_handlers:
+            artifact.metadata = {"handler_id": handler_id}
+        return artifact
     
     def _create_text_artifact(self, text: str) -> Artifact:
         """Create a text artifact from a string"""
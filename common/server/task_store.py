@@ -0,0 +1,429 @@
+from typing import Any, Callable, Dict, Optional, Iterator
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from common.a2a.protocol import Message, Task, TaskState, TaskStatus, TextPart
+import asyncio
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Task states after which a task no longer changes
+TERMINAL_STATES = {TaskState.COMPLETED, TaskState.CANCELED, TaskState.FAILED}
+
+# Rows of tasks that were still queued or running when last written
+_RUNNING = f"state IN ('{TaskState.SUBMITTED.value}', '{TaskState.WORKING.value}')"
+
+
+class TaskStore:
+    """Interface for task storage backends used by TaskManager.
+
+    Tasks are mutated in place while they run; call save() after a
+    meaningful change (status transition, final artifacts) so the backend
+    can update its bookkeeping or persist the new state.
+    """
+
+    def get(self, task_id: str) -> Optional[Task]:
+        raise NotImplementedError
+
+    def save(self, task: Task) -> None:
+        raise NotImplementedError
+
+    def delete(self, task_id: str) -> bool:
+        raise NotImplementedError
+
+    def stats(self) -> Dict[str, int]:
+        return {}
+
+    def __contains__(self, task_id: str) -> bool:
+        return self.get(task_id) is not None
+
+    def __getitem__(self, task_id: str) -> Task:
+        task = self.get(task_id)
+        if task is None:
+            raise KeyError(task_id)
+        return task
+
+    def __setitem__(self, task_id: str, task: Task) -> None:
+        self.save(task)
+
+
+def estimate_task_size(task: Task) -> int:
+    """Approximate the resident size of a task by its serialized length"""
+    return len(task.__pydantic_serializer__.to_json(task, exclude_none=True))
+
+
+class InMemoryTaskStore(TaskStore):
+    """In-memory task store with TTL expiry and an LRU cap.
+
+    Lookups are O(1). Tasks in a terminal state expire ``ttl_seconds`` after
+    they finished. When the store holds more than ``max_tasks`` tasks or more
+    than ``max_bytes`` (approximate serialized size), the least recently used
+    terminal tasks are evicted. Running tasks are never evicted.
+    """
+
+    def __init__(
+        self,
+        max_tasks: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+    ):
+        self.max_tasks = max_tasks
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        # task_id -> Task, ordered from least to most recently used
+        self._tasks: "OrderedDict[str, Task]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        # task_id -> expiry time, ordered by expiry (TTL is constant)
+        self._expiry: "OrderedDict[str, float]" = OrderedDict()
+        self.total_bytes = 0
+        self.evictions = {"ttl": 0, "count": 0, "bytes": 0}
+
+    def get(self, task_id: str) -> Optional[Task]:
+        self._expire()
+        task = self._tasks.get(task_id)
+        if task is not None:
+            self._tasks.move_to_end(task_id)
+        return task
+
+    def save(self, task: Task) -> None:
+        self._expire()
+        task_id = task.id
+        self._tasks[task_id] = task
+        self._tasks.move_to_end(task_id)
+
+        # Running tasks are never evicted, so their size is only re-estimated
+        # once they finish rather than on every streamed chunk
+        if self.max_bytes is not None and (
+            task.status.state in TERMINAL_STATES or task_id not in self._sizes
+        ):
+            size = estimate_task_size(task)
+            self.total_bytes += size - self._sizes.get(task_id, 0)
+            self._sizes[task_id] = size
+
+        if task.status.state in TERMINAL_STATES:
+            if self.ttl_seconds is not None and task_id not in self._expiry:
+                self._expiry[task_id] = time.monotonic() + self.ttl_seconds
+        else:
+            self._expiry.pop(task_id, None)
+
+        self._enforce_limits()
+
+    def delete(self, task_id: str) -> bool:
+        if task_id not in self._tasks:
+            return False
+        self._remove(task_id)
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "tasks": len(self._tasks),
+            "bytes": self.total_bytes,
+            "evicted_ttl": self.evictions["ttl"],
+            "evicted_count": self.evictions["count"],
+            "evicted_bytes": self.evictions["bytes"],
+        }
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._tasks))
+
+    def _remove(self, task_id: str) -> None:
+        self._tasks.pop(task_id, None)
+        self._expiry.pop(task_id, None)
+        self.total_bytes -= self._sizes.pop(task_id, 0)
+
+    def _expire(self) -> None:
+        """Drop terminal tasks whose TTL has elapsed"""
+        if not self._expiry:
+            return
+        now = time.monotonic()
+        while self._expiry:
+            task_id, expires_at = next(iter(self._expiry.items()))
+            if expires_at > now:
+                break
+            self._remove(task_id)
+            self.evictions["ttl"] += 1
+
+    def _over_limit(self, count: int, total_bytes: int) -> Optional[str]:
+        if self.max_tasks is not None and count > self.max_tasks:
+            return "count"
+        if self.max_bytes is not None and total_bytes > self.max_bytes:
+            return "bytes"
+        return None
+
+    def _enforce_limits(self) -> None:
+        """Evict least recently used terminal tasks until within limits"""
+        count, total_bytes = len(self._tasks), self.total_bytes
+        reason = self._over_limit(count, total_bytes)
+        if reason is None:
+            return
+
+        victims = []
+        for task_id, task in self._tasks.items():
+            if task.status.state not in TERMINAL_STATES:
+                continue
+            victims.append((task_id, reason))
+            count -= 1
+            total_bytes -= self._sizes.get(task_id, 0)
+            reason = self._over_limit(count, total_bytes)
+            if reason is None:
+                break
+
+        for task_id, victim_reason in victims:
+            self._remove(task_id)
+            self.evictions[victim_reason] += 1
+
+        if reason is not None:
+            logger.warning(f"Task store over {reason} limit but only running tasks remain")
+
+
+class SqliteTaskStore(TaskStore):
+    """Durable task store backed by SQLite in WAL mode.
+
+    Writes are batched: save() only marks a task dirty and schedules a single
+    flush ``flush_interval`` seconds later, so a burst of updates becomes one
+    transaction. The flush serializes the dirty tasks on the event loop and
+    commits them on a dedicated writer thread, so the loop never waits on
+    SQLite; tasks stay cached until their write has landed. Tasks are loaded lazily
+    by id on lookup and kept in a bounded LRU cache, so opening a database
+    with millions of historical tasks costs nothing up front.
+
+    Tasks left submitted or working by a previous process are marked failed
+    on open, as nothing is left to finish them.
+    """
+
+    def __init__(
+        self,
+        db_file: str = "tmp/tasks.db",
+        table_name: str = "a2a_tasks",
+        max_cached: int = 1000,
+        flush_interval: float = 0.05,
+    ):
+        self.db_file = db_file
+        self.table_name = table_name
+        self.max_cached = max_cached
+        self.flush_interval = flush_interval
+
+        db_dir = os.path.dirname(db_file)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table_name} ("
+            "id TEXT PRIMARY KEY, "
+            "session_id TEXT, "
+            "state TEXT NOT NULL, "
+            "data TEXT NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+        # Small partial index so finding interrupted tasks does not scan history
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_running ON {table_name} (id) WHERE {_RUNNING}")
+        self._conn.commit()
+
+        # Lookups use _conn on the event loop; writes use their own connection
+        # on the writer thread, which WAL lets run alongside the readers
+        self._write_conn = sqlite3.connect(db_file, check_same_thread=False)
+        self._write_conn.execute("PRAGMA synchronous=NORMAL")
+        self._write_lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="task-store")
+
+        self._cache: "OrderedDict[str, Task]" = OrderedDict()
+        self._dirty: Dict[str, Task] = {}
+        # task_id -> writes (saves or deletes) handed to the writer but not yet committed
+        self._in_flight: Dict[str, int] = {}
+        self._deleting: Dict[str, int] = {}
+        self._flush_handle: Optional[asyncio.Handle] = None
+        self.counters = {"flushes": 0, "rows_written": 0, "cache_hits": 0, "cache_misses": 0, "interrupted": 0}
+        self._fail_interrupted()
+
+    def get(self, task_id: str) -> Optional[Task]:
+        task = self._cache.get(task_id)
+        if task is not None:
+            self._cache.move_to_end(task_id)
+            self.counters["cache_hits"] += 1
+            return task
+        if task_id in self._deleting:
+            return None
+
+        self.counters["cache_misses"] += 1
+        row = self._conn.execute(
+            f"SELECT data FROM {self.table_name} WHERE id = ?", (task_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        task = Task.model_validate_json(row[0])
+        self._cache_put(task)
+        return task
+
+    def save(self, task: Task) -> None:
+        # Mark dirty first so the cache cannot evict the task being saved
+        self._dirty[task.id] = task
+        self._cache_put(task)
+        self._schedule_flush()
+
+    def delete(self, task_id: str) -> bool:
+        existed = self.get(task_id) is not None
+        self._cache.pop(task_id, None)
+        self._dirty.pop(task_id, None)
+        # Queued behind any in-flight write of the task, so it cannot come back
+        _acquire(self._deleting, task_id)
+        self._write(self._delete_row, task_id, lambda error: self._deleted(task_id, error))
+        return existed
+
+    def flush(self) -> None:
+        """Serialize all dirty tasks and write them in a single transaction"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, {}
+        now = time.time()
+        rows = [
+            (
+                task.id,
+                task.sessionId,
+                task.status.state.value,
+                task.__pydantic_serializer__.to_json(task, exclude_none=True).decode(),
+                now,
+            )
+            for task in dirty.values()
+        ]
+        for task_id in dirty:
+            _acquire(self._in_flight, task_id)
+        self._write(self._write_rows, rows, lambda error: self._flushed(dirty, error))
+
+    def close(self) -> None:
+        """Write pending tasks, wait for the writer and close the database connections"""
+        self.flush()
+        self._writer.shutdown(wait=True)
+        self._write_conn.close()
+        self._conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "cached_tasks": len(self._cache),
+            "pending_writes": len(self._dirty),
+            "writes_in_flight": len(self._in_flight) + len(self._deleting),
+            **self.counters,
+        }
+
+    def _write(self, fn: Callable[[Any], None], arg: Any, done: Callable[[Optional[Exception]], None]) -> None:
+        """Run fn(arg) on the writer thread, then done(error) back on the event loop"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (e.g. scripts): write through immediately
+            done(self._run_write(fn, arg))
+            return
+
+        def on_written(future: Future) -> None:
+            try:
+                loop.call_soon_threadsafe(done, future.result())
+            except RuntimeError:
+                # Event loop already closed during shutdown
+                pass
+
+        self._writer.submit(self._run_write, fn, arg).add_done_callback(on_written)
+
+    def _run_write(self, fn: Callable[[Any], None], arg: Any) -> Optional[Exception]:
+        try:
+            with self._write_lock, self._write_conn:
+                fn(arg)
+        except Exception as e:
+            return e
+        return None
+
+    def _write_rows(self, rows: list) -> None:
+        self._write_conn.executemany(
+            f"INSERT OR REPLACE INTO {self.table_name} "
+            "(id, session_id, state, data, updated_at) VALUES (?, ?, ?, ?, ?)",
+            rows,
+        )
+
+    def _delete_row(self, task_id: str) -> None:
+        self._write_conn.execute(f"DELETE FROM {self.table_name} WHERE id = ?", (task_id,))
+
+    def _flushed(self, dirty: Dict[str, Task], error: Optional[Exception]) -> None:
+        for task_id in dirty:
+            _release(self._in_flight, task_id)
+        if error is not None:
+            logger.error(f"Error flushing {len(dirty)} tasks to {self.db_file}: {error}")
+            # Keep the tasks dirty so the next flush retries them
+            for task_id, task in dirty.items():
+                if task_id not in self._deleting:
+                    self._dirty.setdefault(task_id, task)
+            return
+        self.counters["flushes"] += 1
+        self.counters["rows_written"] += len(dirty)
+
+    def _deleted(self, task_id: str, error: Optional[Exception]) -> None:
+        _release(self._deleting, task_id)
+        if error is not None:
+            logger.error(f"Error deleting task {task_id} from {self.db_file}: {error}")
+
+    def _fail_interrupted(self) -> None:
+        """Mark tasks a previous process left submitted or working as failed"""
+        rows = self._conn.execute(f"SELECT data FROM {self.table_name} WHERE {_RUNNING}").fetchall()
+        if not rows:
+            return
+        now = time.time()
+        updates = []
+        for (data,) in rows:
+            task = Task.model_validate_json(data)
+            task.status = TaskStatus(
+                state=TaskState.FAILED,
+                message=Message(role="agent", parts=[TextPart(text="Task was interrupted by a server restart")]),
+            )
+            updates.append(
+                (task.status.state.value, task.__pydantic_serializer__.to_json(task, exclude_none=True).decode(), now, task.id)
+            )
+        with self._conn:
+            self._conn.executemany(
+                f"UPDATE {self.table_name} SET state = ?, data = ?, updated_at = ? WHERE id = ?", updates
+            )
+        self.counters["interrupted"] = len(updates)
+        logger.warning(f"Marked {len(updates)} tasks interrupted by a restart as failed")
+
+    def _cache_put(self, task: Task) -> None:
+        self._cache[task.id] = task
+        self._cache.move_to_end(task.id)
+        while len(self._cache) > self.max_cached:
+            # Dirty tasks stay cached until they have been written
+            for task_id in self._cache:
+                if task_id not in self._dirty and task_id not in self._in_flight:
+                    del self._cache[task_id]
+                    break
+            else:
+                break
+
+    def _schedule_flush(self) -> None:
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # No event loop (e.g. scripts): write through immediately
+            self.flush()
+            return
+        self._flush_handle = loop.call_later(self.flush_interval, self.flush)
+
+
+def _acquire(counts: Dict[str, int], key: str) -> None:
+    counts[key] = counts.get(key, 0) + 1
+
+
+def _release(counts: Dict[str, int], key: str) -> None:
+    if counts.get(key, 0) <= 1:
+        counts.pop(key, None)
+    else:
+        counts[key] -= 1
@@ -0,0 +1,138 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the worker pool cannot accept more work"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(f"Task queue is full, retry after {retry_after}s")
+
+
+class WorkerPool:
+    """Bounded pool of worker slots with a priority admission queue.
+
+    At most ``max_workers`` jobs run at once. Further jobs wait in a priority
+    queue (lower number runs first, FIFO within a priority) of at most
+    ``max_queue_size`` entries; beyond that, submissions are rejected with
+    QueueFullError so the server can answer 429.
+
+    Jobs are started with submit(), which keeps a reference to the asyncio
+    task until it finishes.
+    """
+
+    def __init__(self, max_workers: int = 8, max_queue_size: int = 100, retry_after: float = 5):
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self.retry_after = retry_after
+        self._running = 0
+        # Heap of (priority, sequence, future, enqueued_at); cancelled waiters
+        # are dropped lazily when they reach the top
+        self._waiters: List[Tuple[int, int, asyncio.Future, float]] = []
+        self._queue_depth = 0
+        self._sequence = itertools.count()
+        self._tasks: Set[asyncio.Task] = set()
+        self.counters = {"submitted": 0, "rejected": 0, "completed": 0, "failed": 0}
+        self._wait_total = 0.0
+        self._wait_count = 0
+        self._wait_max = 0.0
+
+    @property
+    def running(self) -> int:
+        return self._running
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue_depth
+
+    def is_full(self) -> bool:
+        return self._running >= self.max_workers and self._queue_depth >= self.max_queue_size
+
+    def ensure_capacity(self) -> None:
+        """Raise QueueFullError if a new job would be rejected"""
+        if self.is_full():
+            self.counters["rejected"] += 1
+            raise QueueFullError(self.retry_after)
+
+    def submit(self, job: Callable[[], Awaitable[Any]], priority: int = 0) -> asyncio.Task:
+        """Queue a background job and return the asyncio task running it"""
+        self.ensure_capacity()
+        waiter = self._enqueue(priority)
+        self.counters["submitted"] += 1
+        task = asyncio.create_task(self._run(job, waiter))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue_size": self.max_queue_size,
+            "running": self._running,
+            "queue_depth": self._queue_depth,
+            "avg_wait_seconds": self._wait_total / self._wait_count if self._wait_count else 0.0,
+            "max_wait_seconds": self._wait_max,
+            **self.counters,
+        }
+
+    async def _run(self, job: Callable[[], Awaitable[Any]], waiter: Optional[asyncio.Future]):
+        await self._wait(waiter)
+        try:
+            await job()
+            self.counters["completed"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.counters["failed"] += 1
+            logger.error(f"Worker job failed: {e}")
+        finally:
+            self._release()
+
+    def _enqueue(self, priority: int) -> Optional[asyncio.Future]:
+        """Take a free slot now, or return a future resolved when one frees up"""
+        if self._running < self.max_workers and self._queue_depth == 0:
+            self._running += 1
+            self._record_wait(0.0)
+            return None
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future, time.monotonic()))
+        self._queue_depth += 1
+        return future
+
+    async def _wait(self, waiter: Optional[asyncio.Future]) -> None:
+        if waiter is None:
+            return
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just as we were cancelled; hand it on
+                self._release()
+            else:
+                waiter.cancel()
+                self._queue_depth -= 1
+            raise
+
+    def _release(self) -> None:
+        self._running -= 1
+        while self._waiters:
+            _, _, future, enqueued_at = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._queue_depth -= 1
+            self._running += 1
+            self._record_wait(time.monotonic() - enqueued_at)
+            future.set_result(None)
+            break
+
+    def _record_wait(self, wait: float) -> None:
+        self._wait_total += wait
+        self._wait_count += 1
+        self._wait_max = max(self._wait_max, wait)
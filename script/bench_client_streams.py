@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Concurrency check for A2AClient.send_task_streaming.
+Starts a local A2A server whose streaming handler sleeps between chunks, then
+consumes N streams at once from one event loop. With a non-blocking client
+the total time is close to the slowest single stream, not the sum.
+
+Usage:
+    python script/bench_client_streams.py [--streams 10] [--chunks 10] [--delay 0.1]
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import socket
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import uvicorn
+from common.a2a.protocol import AgentCard
+from common.client import A2AClient
+from common.server import A2AServer, TaskManager, WorkerPool
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def consume(client, query):
+    chunks = 0
+    async for _ in client.send_task_streaming(query):
+        chunks += 1
+    return chunks
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Run concurrent A2A client streams")
+    parser.add_argument("--streams", type=int, default=10, help="Number of concurrent streams")
+    parser.add_argument("--chunks", type=int, default=10, help="Chunks per stream")
+    parser.add_argument("--delay", type=float, default=0.1, help="Seconds between chunks")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    async def slow_stream(message):
+        for i in range(args.chunks):
+            await asyncio.sleep(args.delay)
+            yield f"chunk {i} "
+
+    task_manager = TaskManager(worker_pool=WorkerPool(max_workers=args.streams))
+    task_manager.register_streaming_handler(slow_stream)
+    port = free_port()
+    server = A2AServer(
+        host="127.0.0.1",
+        port=port,
+        agent_card=AgentCard(name="bench", url=f"http://127.0.0.1:{port}", version="0", skills=[]),
+        task_manager=task_manager,
+    )
+    config = uvicorn.Config(server.app, host="127.0.0.1", port=port, log_level="warning")
+    uvicorn_server = uvicorn.Server(config)
+    serve = asyncio.create_task(uvicorn_server.serve())
+    while not uvicorn_server.started:
+        await asyncio.sleep(0.01)
+
+    try:
+        async with A2AClient(url=f"http://127.0.0.1:{port}") as client:
+            single_start = time.perf_counter()
+            await consume(client, "warm-up")
+            single = time.perf_counter() - single_start
+
+            start = time.perf_counter()
+            await asyncio.gather(*(consume(client, f"query {i}") for i in range(args.streams)))
+            total = time.perf_counter() - start
+            connections = client.stats()
+
+        print(f"single stream:       {single:.2f}s")
+        print(f"{args.streams} concurrent streams: {total:.2f}s (sequential would be ~{single * args.streams:.2f}s)")
+        print(f"connections:         {connections}")
+        assert total < single * 2, "streams did not overlap"
+    finally:
+        uvicorn_server.should_exit = True
+        await serve
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Context-size benchmark for SofiaAgent's token budget.
+Runs one long conversation against a stand-in OpenAI-compatible endpoint
+that reports the prompt size it received, once with the configured budget
+and once with an unbounded history. Unbounded, the prompt grows with every
+turn; with the budget it levels off once the history window is full and
+older turns are folded into the rolling summary.
+
+Usage:
+    python script/bench_context_budget.py [--turns 40] [--words 120] [--history-tokens 2000]
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+
+from check_agent_concurrency import free_port, load_sofia_agent
+
+
+def create_llm_app(words: int) -> Starlette:
+    """OpenAI-compatible /chat/completions reporting ~4 characters per prompt token"""
+
+    async def completions(request: Request):
+        body = await request.json()
+        prompt_tokens = math.ceil(sum(len(str(m.get("content") or "")) for m in body["messages"]) / 4)
+        content = " ".join(f"word{i}" for i in range(words))
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        usage = {"prompt_tokens": prompt_tokens, "completion_tokens": words, "total_tokens": prompt_tokens + words}
+        if not body.get("stream"):
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        async def chunks():
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [{"index": 0, "delta": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    app = Starlette()
+    app.add_route("/v1/chat/completions", completions, methods=["POST"])
+    return app
+
+
+def start_llm_server(words: int) -> uvicorn.Server:
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(create_llm_app(words), host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+    return server
+
+
+async def run_conversation(data_dir: str, turns: int, history_tokens: int) -> list:
+    sofia = load_sofia_agent(data_dir, 1)
+    sofia.memory_config.context_history_tokens = history_tokens
+    logging.getLogger().setLevel(logging.WARNING)
+    await sofia.initialize()
+    reports = []
+    try:
+        for i in range(turns):
+            await sofia.invoke(f"Question {i}: tell me more about topic {i}.", sessionId="bench-session")
+            reports.append(sofia.context_budget.last_turn)
+    finally:
+        await sofia.cleanup()
+    return reports
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compare per-turn context size with and without a token budget")
+    parser.add_argument("--turns", type=int, default=40, help="Turns in the conversation")
+    parser.add_argument("--words", type=int, default=120, help="Words per answer")
+    parser.add_argument("--history-tokens", type=int, default=2000, help="History budget for the budgeted run")
+    args = parser.parse_args()
+
+    llm_server = start_llm_server(args.words)
+    try:
+        with tempfile.TemporaryDirectory() as budgeted_dir, tempfile.TemporaryDirectory() as unbounded_dir:
+            budgeted = await run_conversation(budgeted_dir, args.turns, args.history_tokens)
+            unbounded = await run_conversation(unbounded_dir, args.turns, 10 ** 9)
+    finally:
+        llm_server.should_exit = True
+
+    print(f"{'turn':>4} {'budgeted context':>17} {'prompt':>8} {'unbounded context':>18} {'prompt':>8}")
+    for i, (b, u) in enumerate(zip(budgeted, unbounded)):
+        print(f"{i:>4} {b['context_tokens']:>17} {b['input_tokens'] or 0:>8} {u['context_tokens']:>18} {u['input_tokens'] or 0:>8}")
+    print(f"budgeted: {budgeted[-1]}")
+    assert budgeted[-1]["input_tokens"] < unbounded[-1]["input_tokens"], "budget did not bound the prompt"
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
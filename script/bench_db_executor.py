@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Event-loop benchmark for the agent's memory database access.
+Runs N concurrent sessions that each read a user's memories and add one,
+first calling the database directly from async code (as the agent used to)
+and then through DbExecutor. A ticker coroutine measures how late the
+event loop wakes it up, which is how long other requests were stalled.
+
+Usage:
+    python script/bench_db_executor.py [--sessions 50] [--rounds 20] [--memories 200] [--readers 4]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'services', 'agent-service', 'agent', 'src')))
+from agno.memory.v2.db.schema import MemoryRow
+from agno.memory.v2.schema import UserMemory
+from db_executor import DbExecutor, LatencyHistogram, configure_sqlite_engine
+from memory_index import TopicIndexedMemoryDb
+
+
+def memory_row(user_id: str, text: str) -> MemoryRow:
+    memory = UserMemory(memory=text, topics=["bench"], memory_id=str(uuid.uuid4()))
+    return MemoryRow(id=memory.memory_id, user_id=user_id, memory=memory.to_dict())
+
+
+async def ticker(lag: LatencyHistogram, stop: asyncio.Event, interval: float = 0.005) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lag.record(time.perf_counter() - start - interval)
+
+
+async def session(db: TopicIndexedMemoryDb, executor, user_id: str, rounds: int) -> None:
+    for i in range(rounds):
+        row = memory_row(user_id, f"fact {i}")
+        if executor is None:
+            db.read_memories(user_id=user_id)
+            db.upsert_memories([row])
+            await asyncio.sleep(0)
+        else:
+            await executor.read("read_memories", db.read_memories, user_id=user_id)
+            await executor.write("upsert_memories", db.upsert_memories, [row])
+
+
+async def run(db: TopicIndexedMemoryDb, executor, sessions: int, rounds: int) -> None:
+    lag, stop = LatencyHistogram(), asyncio.Event()
+    probe = asyncio.create_task(ticker(lag, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(session(db, executor, f"user-{i}", rounds) for i in range(sessions)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe
+
+    label = "direct" if executor is None else "executor"
+    stats = lag.stats()
+    print(f"{label:8}: {sessions * rounds / elapsed:7.0f} ops/s, "
+          f"loop lag p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms, max {stats['max_ms']:.1f} ms")
+    if executor is not None:
+        for operation, histogram in executor.stats()["latency"].items():
+            print(f"  {operation}: p50 {histogram['p50_ms']} ms, p95 {histogram['p95_ms']} ms, p99 {histogram['p99_ms']} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure event-loop stalls caused by memory database calls")
+    parser.add_argument("--sessions", type=int, default=50, help="Concurrent sessions")
+    parser.add_argument("--rounds", type=int, default=20, help="Read + write rounds per session")
+    parser.add_argument("--memories", type=int, default=200, help="Memories seeded per user")
+    parser.add_argument("--readers", type=int, default=4, help="Reader threads of the executor")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_dir:
+        db = TopicIndexedMemoryDb(table_name="user_memories", db_file=os.path.join(data_dir, "memory.db"))
+        configure_sqlite_engine(db.db_engine)
+        db.upsert_memories(
+            memory_row(f"user-{i}", f"seed {j}") for i in range(args.sessions) for j in range(args.memories)
+        )
+        asyncio.run(run(db, None, args.sessions, args.rounds))
+        executor = DbExecutor(readers=args.readers)
+        asyncio.run(run(db, executor, args.sessions, args.rounds))
+        executor.close()
+
+
+if __name__ == "__main__":
+    main()
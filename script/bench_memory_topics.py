@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Topic lookup benchmark for the agent's memory database.
+Seeds one user with N memories (3 topics each out of --topics), then times
+a topic lookup the old way (load every memory of the user and filter in
+Python) against the indexed lookup of one page, plus the cost of keeping
+the index up to date on add/replace/delete.
+
+Usage:
+    python script/bench_memory_topics.py [--sizes 10000 100000] [--topics 500] [--page 50]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'services', 'agent-service', 'agent', 'src')))
+from agno.memory.v2.memory import Memory
+from agno.memory.v2.schema import UserMemory
+from memory_index import TopicIndexedMemoryDb
+
+USER_ID = "bench-user"
+
+
+def seed(db: TopicIndexedMemoryDb, size: int, topics: list) -> None:
+    """Bulk insert memory rows directly, then build the topic index"""
+    db.create()
+    rows = []
+    for i in range(size):
+        memory = UserMemory(memory=f"Memory number {i}", topics=random.sample(topics, 3), memory_id=str(uuid.uuid4()))
+        rows.append({"id": memory.memory_id, "user_id": USER_ID, "memory": str(memory.to_dict())})
+    with db.Session() as session:
+        session.execute(db.table.insert(), rows)
+        session.commit()
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench(size: int, n_topics: int, page: int, repeat: int) -> None:
+    topics = [f"Topic {i}" for i in range(n_topics)]
+    with tempfile.TemporaryDirectory() as data_dir:
+        db = TopicIndexedMemoryDb(table_name="user_memories", db_file=os.path.join(data_dir, "memory.db"))
+        seed(db, size, topics)
+        start = time.perf_counter()
+        db.rebuild_topic_index()
+        rebuild = time.perf_counter() - start
+
+        memory = Memory(db=db)
+        topic = random.choice(topics)
+
+        def scan():
+            memories = memory.get_user_memories(user_id=USER_ID)
+            return [m for m in memories if topic.lower() in [t.lower() for t in m.topics]]
+
+        matches = len(scan())
+        scan_ms = timed(scan, max(repeat // 10, 1))
+        first_page_ms = timed(lambda: db.memories_by_topic(USER_ID, topic, limit=page), repeat)
+        deep_page_ms = timed(lambda: db.memories_by_topic(USER_ID, topic.upper(), limit=page, offset=matches // 2), repeat)
+        count_ms = timed(lambda: db.count_memories_by_topic(USER_ID, topic), repeat)
+
+        memory_ids = []
+
+        def add():
+            memory_ids.append(memory.add_user_memory(
+                UserMemory(memory="new memory", topics=random.sample(topics, 3)), user_id=USER_ID, refresh_from_db=False,
+            ))
+
+        add_ms = timed(add, repeat)
+        replace_ms = timed(lambda: memory.replace_user_memory(
+            random.choice(memory_ids), UserMemory(memory="replaced", topics=[topic]), user_id=USER_ID, refresh_from_db=False,
+        ), repeat)
+        delete_ms = timed(lambda: memory.delete_user_memory(memory_ids.pop(), user_id=USER_ID, refresh_from_db=False), repeat)
+
+        print(f"{size} memories, {matches} with '{topic}' (index built in {rebuild:.2f}s)")
+        print(f"  scan all + filter:        {scan_ms:9.2f} ms")
+        print(f"  indexed first page ({page}): {first_page_ms:9.2f} ms")
+        print(f"  indexed middle page:      {deep_page_ms:9.2f} ms")
+        print(f"  indexed count:            {count_ms:9.2f} ms")
+        print(f"  add / replace / delete:   {add_ms:.2f} / {replace_ms:.2f} / {delete_ms:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark topic lookups on the memory database")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="Numbers of memories to seed")
+    parser.add_argument("--topics", type=int, default=500, help="Distinct topics")
+    parser.add_argument("--page", type=int, default=50, help="Page size of indexed lookups")
+    parser.add_argument("--repeat", type=int, default=50, help="Repetitions per timing")
+    args = parser.parse_args()
+    random.seed(0)
+    for size in args.sizes:
+        bench(size, args.topics, args.page, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
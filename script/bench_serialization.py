@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for A2A server response serialization.
+Compares the per-event cost of the old model_dump -> json.dumps -> json.loads
+-> json.dumps path with the single-pass serializer used by A2AServer.
+
+Usage:
+    python script/bench_serialization.py [--events 20000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from common.a2a.protocol import (
+    SendTaskStreamingResponse,
+    TaskArtifactUpdateEvent,
+    Artifact,
+    DataPart,
+)
+from common.server.serialization import dump_model_json, dump_model_bytes
+
+
+class DateTimeEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, datetime):
+            return obj.isoformat()
+        return super().default(obj)
+
+
+def legacy_sse(model):
+    """The pre-serialization-layer SSE path: four encode/decode passes"""
+    model_dict = model.model_dump(exclude_none=True)
+    json_str = json.dumps(model_dict, cls=DateTimeEncoder)
+    return json.dumps(json.loads(json_str))
+
+
+def make_event(i):
+    artifact = Artifact(
+        name="result",
+        parts=[DataPart(data={
+            "is_task_complete": False,
+            "require_user_input": False,
+            "content": f"token chunk {i} ",
+        })],
+    )
+    return SendTaskStreamingResponse(
+        id="request-id",
+        result=TaskArtifactUpdateEvent(id="task-id", artifact=artifact),
+    )
+
+
+def bench(name, fn, events):
+    start = time.perf_counter()
+    for event in events:
+        fn(event)
+    elapsed = time.perf_counter() - start
+    per_event_us = elapsed / len(events) * 1e6
+    print(f"{name:<24} {per_event_us:8.2f} us/event")
+    return per_event_us
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark A2A response serialization")
+    parser.add_argument("--events", type=int, default=20000, help="Number of events to serialize")
+    args = parser.parse_args()
+
+    events = [make_event(i) for i in range(args.events)]
+    # Sanity check: both paths produce the same payload
+    assert json.loads(legacy_sse(events[0])) == json.loads(dump_model_json(events[0]))
+
+    legacy = bench("legacy (4 passes)", legacy_sse, events)
+    sse = bench("dump_model_json (SSE)", dump_model_json, events)
+    rpc = bench("dump_model_bytes (RPC)", dump_model_bytes, events)
+    print(f"speedup: SSE {legacy / sse:.1f}x, JSON-RPC {legacy / rpc:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
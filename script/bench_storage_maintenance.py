@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Storage maintenance benchmark.
+Seeds a session database with N sessions spread over users and ages,
+then runs one maintenance pass (retention, archive, incremental vacuum,
+ANALYZE) while simulated live traffic reads and writes sessions through
+the same DbExecutor. Prints what the pass did, the file size before and
+after, and live session latency with and without maintenance running.
+
+Usage:
+    python script/bench_storage_maintenance.py [--sessions 50000] [--users 500] [--retention-days 30] [--per-user 50]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'services', 'agent-service', 'agent', 'src')))
+from agno.storage.session.agent import AgentSession
+from context_budget import SummaryStore
+from db_executor import DbExecutor, LatencyHistogram, configure_sqlite_engine
+from maintenance import StorageMaintenance
+from session_cache import CachedSqliteStorage
+
+TABLE = "agent_sessions"
+
+
+def seed(db_file: str, sessions: int, users: int, max_age_days: int) -> None:
+    """Insert sessions with a few KB of history each, last active up to max_age_days ago"""
+    storage = CachedSqliteStorage(table_name=TABLE, db_file=db_file)
+    configure_sqlite_engine(storage.db_engine)
+    storage.create()
+    SummaryStore(db_file=db_file)
+    now = int(time.time())
+    history = json.dumps({"runs": [{"message": {"content": "x" * 500}, "response": {"content": "y" * 1500}}]})
+    connection = sqlite3.connect(db_file)
+    with connection:
+        connection.executemany(
+            f"INSERT INTO {TABLE} (session_id, user_id, agent_id, memory, session_data, created_at, updated_at) "
+            "VALUES (?, ?, 'bench', ?, '{}', ?, ?)",
+            (
+                (f"s{i}", f"user-{i % users}", history, now - random.randint(0, max_age_days * 86400), None)
+                for i in range(sessions)
+            ),
+        )
+        connection.executemany(
+            "INSERT INTO session_summaries (session_id, summary, last_run_id, tokens, updated_at) VALUES (?, 's', 'r', 1, 0)",
+            ((f"s{i}",) for i in range(0, sessions, 3)),
+        )
+    connection.close()
+
+
+async def live_traffic(storage: CachedSqliteStorage, executor: DbExecutor, sessions: int, stop: asyncio.Event) -> LatencyHistogram:
+    latency = LatencyHistogram()
+    while not stop.is_set():
+        session_id = f"s{random.randrange(sessions)}"
+        start = time.perf_counter()
+        # Skip the session cache, as a cold session would
+        storage.invalidate(session_id)
+        session = await executor.read("read_session", storage.read, session_id)
+        if session is None:
+            session = AgentSession(session_id=session_id, user_id="user-live", memory={"runs": []})
+        await executor.write("upsert_session", CachedSqliteStorage.upsert, storage, session)
+        latency.record(time.perf_counter() - start)
+        await asyncio.sleep(0.005)
+    return latency
+
+
+async def measure(storage, executor, sessions: int, seconds: float, maintenance=None):
+    stop = asyncio.Event()
+    traffic = asyncio.create_task(live_traffic(storage, executor, sessions, stop))
+    report = None
+    if maintenance is not None:
+        report = await maintenance.run_once()
+    else:
+        await asyncio.sleep(seconds)
+    stop.set()
+    return await traffic, report
+
+
+def size_mb(db_file: str) -> float:
+    return sum(os.path.getsize(path) for path in (db_file, db_file + "-wal") if os.path.exists(path)) / 1e6
+
+
+async def bench(args, data_dir: str) -> None:
+    db_file = os.path.join(data_dir, "agent_storage.db")
+    seed(db_file, args.sessions, args.users, args.max_age_days)
+    before = size_mb(db_file)
+
+    executor = DbExecutor(readers=4)
+    storage = CachedSqliteStorage(table_name=TABLE, db_file=db_file)
+    configure_sqlite_engine(storage.db_engine)
+    maintenance = StorageMaintenance(
+        storage_db_file=db_file,
+        storage_table=TABLE,
+        archive_dir=os.path.join(data_dir, "archive"),
+        max_session_age_days=args.retention_days,
+        max_sessions_per_user=args.per_user,
+        batch_size=args.batch_size,
+        max_rows_per_run=args.sessions,
+        executor=executor,
+    )
+
+    baseline, _ = await measure(storage, executor, args.sessions, seconds=3)
+    during, report = await measure(storage, executor, args.sessions, seconds=0, maintenance=maintenance)
+    await maintenance.stop()
+    executor.close()
+
+    print(f"{args.sessions} sessions, {args.users} users: {before:.1f} MB -> {size_mb(db_file):.1f} MB")
+    print(f"  expired by age {report['expired_by_age']}, by per-user count {report['expired_by_count']}, "
+          f"archived {report['archived']}, kept active {report['kept_active']}")
+    print(f"  vacuumed {report['pages_vacuumed']} pages in {report['duration_seconds']:.1f}s")
+    if report["archive_file"]:
+        print(f"  archive {os.path.getsize(report['archive_file']) / 1e6:.1f} MB")
+    for label, histogram in (("live traffic alone", baseline), ("during maintenance", during)):
+        stats = histogram.stats()
+        print(f"  {label:19}: p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms, max {stats['max_ms']:.1f} ms "
+              f"({stats['count']} requests)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark storage maintenance against live session traffic")
+    parser.add_argument("--sessions", type=int, default=50000, help="Sessions to seed")
+    parser.add_argument("--users", type=int, default=500, help="Users the sessions belong to")
+    parser.add_argument("--max-age-days", type=int, default=90, help="Oldest seeded session")
+    parser.add_argument("--retention-days", type=float, default=30, help="Expire sessions older than this")
+    parser.add_argument("--per-user", type=int, default=50, help="Sessions kept per user")
+    parser.add_argument("--batch-size", type=int, default=100, help="Sessions per maintenance transaction")
+    args = parser.parse_args()
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as data_dir:
+        asyncio.run(bench(args, data_dir))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Semantic memory search benchmark for the local vector index.
+Seeds one user with N memories, builds their index with the offline
+hashing embedder, then times a top-k search against the old way (load
+every memory of the user through Agno), reopening the memory-mapped index
+from disk, and the incremental update on add/replace/delete.
+
+Usage:
+    python script/bench_vector_index.py [--sizes 10000 100000] [--dimensions 256] [--limit 5]
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import uuid
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'services', 'agent-service', 'agent', 'src')))
+from agno.memory.v2.memory import Memory
+from agno.memory.v2.schema import UserMemory
+from memory_index import TopicIndexedMemoryDb
+from vector_index import HashingEmbeddingBackend, VectorIndex
+
+USER_ID = "bench-user"
+WORDS = (
+    "coffee tea cat dog paris london music guitar piano running swimming python rust book movie "
+    "sister brother birthday allergy peanut vegetarian project deadline meeting travel japan hiking"
+).split()
+
+
+def sentence() -> str:
+    return "The user " + " ".join(random.sample(WORDS, 6))
+
+
+def seed(db: TopicIndexedMemoryDb, size: int) -> None:
+    db.create()
+    rows = []
+    for _ in range(size):
+        memory = UserMemory(memory=sentence(), topics=random.sample(WORDS, 2), memory_id=str(uuid.uuid4()))
+        rows.append({"id": memory.memory_id, "user_id": USER_ID, "memory": str(memory.to_dict())})
+    with db.Session() as session:
+        session.execute(db.table.insert(), rows)
+        session.commit()
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench(size: int, dimensions: int, limit: int, repeat: int) -> None:
+    with tempfile.TemporaryDirectory() as data_dir:
+        db = TopicIndexedMemoryDb(table_name="user_memories", db_file=os.path.join(data_dir, "memory.db"))
+        seed(db, size)
+        index_dir = os.path.join(data_dir, "vector_index")
+        backend = HashingEmbeddingBackend(dimensions=dimensions)
+        index = VectorIndex(index_dir, backend, memory_db=db)
+        db.add_listener(index)
+
+        start = time.perf_counter()
+        index.rebuild(USER_ID)
+        build = time.perf_counter() - start
+
+        memory = Memory(db=db)
+        queries = [" ".join(random.sample(WORDS, 2)) for _ in range(repeat)]
+        scan_ms = timed(lambda: memory.get_user_memories(user_id=USER_ID), max(repeat // 10, 1))
+        embed_ms = timed(lambda: backend.embed([random.choice(queries)]), repeat)
+        search_ms = timed(lambda: index.search(USER_ID, random.choice(queries), limit), repeat)
+        fetch_ms = timed(lambda: db.memories_by_ids(
+            [memory_id for memory_id, _ in index.search(USER_ID, random.choice(queries), limit)], user_id=USER_ID,
+        ), repeat)
+
+        start = time.perf_counter()
+        reopened = VectorIndex(index_dir, backend, memory_db=db)
+        reopened.search(USER_ID, queries[0], limit)
+        reopen_ms = (time.perf_counter() - start) * 1000
+
+        memory_ids = []
+
+        def add():
+            memory_ids.append(memory.add_user_memory(
+                UserMemory(memory=sentence(), topics=["new"]), user_id=USER_ID, refresh_from_db=False,
+            ))
+
+        add_ms = timed(add, repeat)
+        replace_ms = timed(lambda: memory.replace_user_memory(
+            random.choice(memory_ids), UserMemory(memory=sentence(), topics=["replaced"]), user_id=USER_ID,
+            refresh_from_db=False,
+        ), repeat)
+        delete_ms = timed(lambda: memory.delete_user_memory(memory_ids.pop(), user_id=USER_ID, refresh_from_db=False), repeat)
+        # Listener calls only queue the change; time the background embedding separately
+        start = time.perf_counter()
+        index.join()
+        apply_ms = (time.perf_counter() - start) * 1000
+        index.close()
+        reopened.close()
+
+        print(f"{size} memories, {dimensions} dimensions (index built in {build:.2f}s)")
+        print(f"  load all memories (Agno):  {scan_ms:9.2f} ms")
+        print(f"  embed query:               {embed_ms:9.2f} ms")
+        print(f"  top-{limit} search:              {search_ms:9.2f} ms")
+        print(f"  top-{limit} search + fetch rows: {fetch_ms:9.2f} ms")
+        print(f"  reopen index + search:     {reopen_ms:9.2f} ms")
+        print(f"  add / replace / delete:    {add_ms:.2f} / {replace_ms:.2f} / {delete_ms:.2f} ms")
+        print(f"  queued changes applied in: {apply_ms:9.2f} ms ({3 * repeat} changes)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark semantic search on the memory vector index")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000], help="Numbers of memories to seed")
+    parser.add_argument("--dimensions", type=int, default=256, help="Embedding dimensions")
+    parser.add_argument("--limit", type=int, default=5, help="Results per search")
+    parser.add_argument("--repeat", type=int, default=50, help="Repetitions per timing")
+    args = parser.parse_args()
+    random.seed(0)
+    for size in args.sizes:
+        bench(size, args.dimensions, args.limit, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Concurrency check for SofiaAgent.invoke / SofiaAgent.stream.
+Runs a stand-in OpenAI-compatible chat endpoint (in its own thread) that
+takes --delay seconds per completion, points the agent at it through
+OPENAI_BASE_URL, and fires N requests at once on one event loop. If agent
+runs block the loop the total is close to N * delay; if they overlap it is
+close to a single delay.
+
+Usage:
+    python script/check_agent_concurrency.py [--requests 20] [--delay 0.5]
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import logging
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+AGENT_SRC = os.path.join(ROOT_DIR, "services", "agent-service", "agent", "src")
+AGENT_MAIN = os.path.join(AGENT_SRC, "main.py")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def create_llm_app(delay: float, words: int = 10, received: list = None) -> Starlette:
+    """OpenAI-compatible /chat/completions that answers after a fixed delay, recording requests in received"""
+
+    async def completions(request: Request):
+        body = await request.json()
+        if received is not None:
+            received.append(body)
+        await asyncio.sleep(delay)
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        created = int(time.time())
+        if not body.get("stream"):
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": body["model"],
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "word " * words},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": 10, "completion_tokens": words, "total_tokens": 10 + words},
+            })
+
+        async def chunks():
+            for i in range(words):
+                delta = {"role": "assistant", "content": "word "} if i == 0 else {"content": "word "}
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": created,
+                    "model": body["model"],
+                    "choices": [{"index": 0, "delta": delta, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+    app = Starlette()
+    app.add_route("/v1/chat/completions", completions, methods=["POST"])
+    return app
+
+
+def start_llm_server(delay: float, received: list = None) -> uvicorn.Server:
+    port = free_port()
+    app = create_llm_app(delay, received=received)
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{port}/v1"
+    return server
+
+
+def load_sofia_agent(data_dir: str, n_agents: int):
+    os.environ.setdefault("OPENAI_API_KEY", "not-used")
+    os.environ["AGNO_TELEMETRY"] = "false"
+    os.environ["MEMORY_DB_FILE"] = os.path.join(data_dir, "memory.db")
+    os.environ["STORAGE_DB_FILE"] = os.path.join(data_dir, "agent_storage.db")
+    os.environ.setdefault("AGENT_POOL_SIZE", str(n_agents))
+    sys.path.insert(0, AGENT_SRC)
+    spec = importlib.util.spec_from_file_location("sofia_agent_main", AGENT_MAIN)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    agent = module.SofiaAgent()
+    # The check is about the agent run itself, not the MCP tool servers
+    agent.mcp_server_commands = []
+    return agent
+
+
+async def timed(label: str, n: int, run) -> float:
+    start = time.perf_counter()
+    await run(f"{label} warm-up")
+    single = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run(f"{label} query {i}") for i in range(n)))
+    total = time.perf_counter() - start
+    print(f"{label}: single {single:.2f}s, {n} concurrent {total:.2f}s (sequential would be ~{single * n:.2f}s)")
+    return total / single
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Check that concurrent SofiaAgent runs overlap")
+    parser.add_argument("--requests", type=int, default=20, help="Number of simultaneous requests")
+    parser.add_argument("--delay", type=float, default=0.5, help="Seconds the stand-in LLM takes per call")
+    args = parser.parse_args()
+
+    llm_server = start_llm_server(args.delay)
+    with tempfile.TemporaryDirectory() as data_dir:
+        sofia = load_sofia_agent(data_dir, args.requests)
+        logging.getLogger().setLevel(logging.WARNING)
+        await sofia.initialize()
+
+        async def invoke(query):
+            return await sofia.invoke(query, sessionId=f"session-{query}")
+
+        async def stream(query):
+            return [chunk async for chunk in sofia.stream(query, sessionId=f"session-{query}")]
+
+        try:
+            ratios = [
+                await timed("invoke", args.requests, invoke),
+                await timed("stream", args.requests, stream),
+            ]
+            print(f"agent pool: {sofia.agent_pool.stats()}")
+        finally:
+            await sofia.cleanup()
+            llm_server.should_exit = True
+
+    assert all(ratio < args.requests / 4 for ratio in ratios), "agent runs did not overlap"
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
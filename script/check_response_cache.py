@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Response cache check for SofiaAgent.
+Asks the same first question in two sessions of one user, so the second
+one is answered from the cache, then asks a follow-up in the cached
+session. The follow-up must reach the stand-in model with the cached
+exchange as history, and repeating the first question there must not be
+served from the cache again. Then two users with different memories ask
+the same question: the second must get their own run, while the first
+asking again in a new session is served from the cache. Runs for both
+invoke and stream.
+
+Usage:
+    python script/check_response_cache.py
+"""
+
+import asyncio
+import json
+import logging
+import os
+import tempfile
+
+from check_agent_concurrency import load_sofia_agent, start_llm_server
+
+
+def model_calls(received: list, query: str) -> list:
+    """Agent runs the stand-in model got whose newest user message is query"""
+    calls = []
+    for body in received:
+        # The memory manager sends the user message to the model too
+        if "MemoryManager" in str(body["messages"][0].get("content")):
+            continue
+        user = [m.get("content") for m in body["messages"] if m["role"] == "user"]
+        if user and user[-1] == query:
+            calls.append(body)
+    return calls
+
+
+async def check(label: str, ask, received: list) -> None:
+    question, follow_up = f"{label}: what is the capital of France?", f"{label}: and of Italy?"
+    user_id = f"{label}-user"
+
+    first = await ask(question, f"{label}-a", user_id)
+    await ask(question, f"{label}-b", user_id)
+    assert len(model_calls(received, question)) == 1, "second session was not answered from the cache"
+
+    await ask(follow_up, f"{label}-b", user_id)
+    calls = model_calls(received, follow_up)
+    assert len(calls) == 1, "follow-up was answered from the cache"
+    history = [(m["role"], m.get("content")) for m in calls[0]["messages"]]
+    assert ("user", question) in history, f"cached question missing from the follow-up history: {history}"
+    assert ("assistant", first) in history, f"cached answer missing from the follow-up history: {history}"
+
+    await ask(question, f"{label}-b", user_id)
+    assert len(model_calls(received, question)) == 2, "a later turn was answered from the cache"
+    print(f"{label}: cache hit recorded in the session; follow-up saw it as history")
+
+
+async def check_users(label: str, ask, sofia, received: list) -> None:
+    question = f"{label}: what is my name?"
+    await sofia.add_user_memory("My name is Alice", f"{label}-alice")
+    await sofia.add_user_memory("My name is Bob", f"{label}-bob")
+
+    await ask(question, f"{label}-alice-1", f"{label}-alice")
+    await ask(question, f"{label}-bob-1", f"{label}-bob")
+    calls = model_calls(received, question)
+    assert len(calls) == 2, "another user's answer was served from the cache"
+    assert "Bob" in json.dumps(calls[1]["messages"]), "the second user's run did not get their memories"
+
+    await ask(question, f"{label}-alice-2", f"{label}-alice")
+    assert len(model_calls(received, question)) == 2, "the same user's repeat was not answered from the cache"
+    print(f"{label}: answers are only reused for the user whose memories produced them")
+
+
+async def main():
+    received = []
+    llm_server = start_llm_server(0, received)
+    os.environ["RESPONSE_CACHE_ENABLED"] = "true"
+    with tempfile.TemporaryDirectory() as data_dir:
+        sofia = load_sofia_agent(data_dir, 2)
+        logging.getLogger().setLevel(logging.WARNING)
+        await sofia.initialize()
+
+        async def invoke(query, session_id, user_id):
+            return (await sofia.invoke(query, sessionId=session_id, user_id=user_id))["content"]
+
+        async def stream(query, session_id, user_id):
+            chunks = sofia.stream(query, sessionId=session_id, user_id=user_id)
+            return "".join([chunk["content"] async for chunk in chunks])
+
+        try:
+            await check("invoke", invoke, received)
+            await check("stream", stream, received)
+            await check_users("invoke", invoke, sofia, received)
+            await check_users("stream", stream, sofia, received)
+            print(f"response cache: {sofia.response_cache_stats()}")
+        finally:
+            await sofia.cleanup()
+            llm_server.should_exit = True
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Export or import the agent's memory table as JSON Lines.
+Rows are streamed in batches in both directions, so moving a table with
+millions of memories needs memory for one batch, not for the table. Files
+ending in .gz are compressed. An import upserts by memory id in a single
+transaction and rebuilds the topic index rows of what it writes.
+
+Usage:
+    python script/memory_migrate.py export memories.jsonl.gz [--db tmp/memory.db] [--table user_memories] [--user USER_ID]
+    python script/memory_migrate.py import memories.jsonl.gz [--db tmp/memory.db] [--table user_memories]
+"""
+
+import argparse
+import gzip
+import logging
+import os
+import resource
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'services', 'agent-service', 'agent', 'src')))
+from memory_index import TopicIndexedMemoryDb, read_jsonl, write_jsonl
+
+
+def open_text(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stream memories to or from a JSON Lines file")
+    parser.add_argument("command", choices=["export", "import"])
+    parser.add_argument("file", help="JSON Lines file (.gz for gzip)")
+    parser.add_argument("--db", default=os.getenv("MEMORY_DB_FILE", "tmp/memory.db"), help="SQLite memory database")
+    parser.add_argument("--table", default=os.getenv("MEMORY_TABLE_NAME", "user_memories"), help="Memory table")
+    parser.add_argument("--user", help="Only export this user's memories")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+
+    db = TopicIndexedMemoryDb(table_name=args.table, db_file=args.db)
+    start = time.perf_counter()
+    if args.command == "export":
+        with open_text(args.file, "w") as fp:
+            count = write_jsonl(db.export_memories(user_id=args.user), fp)
+    else:
+        with open_text(args.file, "r") as fp:
+            count = db.import_memories(read_jsonl(fp))
+    elapsed = time.perf_counter() - start
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(f"{args.command}ed {count} memories in {elapsed:.1f}s ({count / elapsed if elapsed else 0:.0f}/s), peak RSS {peak_mb:.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from agno.agent import Agent
+import asyncio
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class AgentPool:
+    """Fixed-size pool of Agno Agent instances with session affinity.
+
+    An Agent keeps the state of its current run on the instance, so each
+    run checks out an instance of its own and checks it back in afterwards.
+    Instances are created lazily by ``factory`` up to ``size``; when all are
+    busy, checkouts wait in FIFO order.
+
+    Turns of the same session run one at a time, in arrival order, and go
+    back to the instance that served the session last when it is free, so
+    the session's state stays warm there. Other sessions take any free
+    instance.
+    """
+
+    def __init__(self, factory: Callable[[], Agent], size: int = 8, max_sessions: int = 10000):
+        self.factory = factory
+        self.size = size
+        self.max_sessions = max_sessions
+        self._agents: List[Agent] = []
+        self._idle: List[Agent] = []
+        self._busy_since: Dict[int, float] = {}
+        # session_id -> agent that served it last (LRU)
+        self._affinity: "OrderedDict[str, Agent]" = OrderedDict()
+        # session_id -> [lock, holders], dropped when nobody holds or waits
+        self._session_locks: Dict[str, list] = {}
+        self._waiters: List[Tuple[asyncio.Future, Optional[str]]] = []
+        self._started_at = time.monotonic()
+        self._busy_seconds = 0.0
+        self.counters = {"checkouts": 0, "affinity_hits": 0, "waited": 0}
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @property
+    def in_use(self) -> int:
+        return len(self._busy_since)
+
+    @asynccontextmanager
+    async def agent(self, session_id: str = None):
+        """Check out an agent for the block, serializing turns of one session"""
+        if session_id is None:
+            agent = await self.checkout()
+            try:
+                yield agent
+            finally:
+                self.checkin(agent)
+            return
+
+        entry = self._session_locks.setdefault(session_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                agent = await self.checkout(session_id)
+                try:
+                    yield agent
+                finally:
+                    self.checkin(agent, session_id)
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._session_locks[session_id]
+
+    async def checkout(self, session_id: str = None) -> Agent:
+        """Take an idle agent, creating one if the pool isn't full, else wait for one"""
+        started = time.monotonic()
+        agent = self._take_idle(session_id)
+        if agent is None and len(self._agents) < self.size:
+            agent = self.factory()
+            self._agents.append(agent)
+            logger.info(f"Created agent instance {len(self._agents)}/{self.size}")
+        if agent is None:
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append((future, session_id))
+            self.counters["waited"] += 1
+            try:
+                agent = await future
+            except asyncio.CancelledError:
+                if future.done() and not future.cancelled():
+                    # Handed an agent just as we were cancelled; pass it on
+                    self._release(future.result())
+                else:
+                    self._waiters.remove((future, session_id))
+                raise
+        self._mark_busy(agent, time.monotonic() - started)
+        return agent
+
+    def checkin(self, agent: Agent, session_id: str = None) -> None:
+        """Return an agent to the pool, remembering it for the session"""
+        self._busy_seconds += time.monotonic() - self._busy_since.pop(id(agent))
+        if session_id is not None:
+            self._affinity[session_id] = agent
+            self._affinity.move_to_end(session_id)
+            while len(self._affinity) > self.max_sessions:
+                self._affinity.popitem(last=False)
+        self._release(agent)
+
+    def stats(self) -> Dict[str, Any]:
+        uptime = time.monotonic() - self._started_at
+        now = time.monotonic()
+        busy_seconds = self._busy_seconds + sum(now - since for since in self._busy_since.values())
+        return {
+            "size": self.size,
+            "created": len(self._agents),
+            "in_use": self.in_use,
+            "waiting": len(self._waiters),
+            "utilization": self.in_use / self.size if self.size else 0.0,
+            "avg_utilization": busy_seconds / (uptime * self.size) if uptime and self.size else 0.0,
+            "avg_wait_seconds": self._wait_total / self.counters["checkouts"] if self.counters["checkouts"] else 0.0,
+            "max_wait_seconds": self._wait_max,
+            **self.counters,
+        }
+
+    def _take_idle(self, session_id: Optional[str]) -> Optional[Agent]:
+        if not self._idle:
+            return None
+        preferred = self._affinity.get(session_id) if session_id is not None else None
+        # Agents are dataclasses, so compare by identity rather than ==
+        for index, agent in enumerate(self._idle):
+            if agent is preferred:
+                self.counters["affinity_hits"] += 1
+                return self._idle.pop(index)
+        return self._idle.pop()
+
+    def _release(self, agent: Agent) -> None:
+        """Hand the agent to a waiter (preferring one with affinity to it) or mark it idle"""
+        self._waiters = [(future, session) for future, session in self._waiters if not future.done()]
+        if not self._waiters:
+            self._idle.append(agent)
+            return
+        index = next(
+            (i for i, (_, session) in enumerate(self._waiters)
+             if session is not None and self._affinity.get(session) is agent),
+            None,
+        )
+        if index is None:
+            index = 0
+        else:
+            self.counters["affinity_hits"] += 1
+        future, _ = self._waiters.pop(index)
+        future.set_result(agent)
+
+    def _mark_busy(self, agent: Agent, wait: float) -> None:
+        self._busy_since[id(agent)] = time.monotonic()
+        self.counters["checkouts"] += 1
+        self._wait_total += wait
+        self._wait_max = max(self._wait_max, wait)
@@ -0,0 +1,373 @@
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from agno.memory.v2.schema import UserMemory
+from agno.models.message import Message
+from agno.storage.session import Session
+from db_executor import configure_sqlite_connection
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCounter:
+    """Count tokens with tiktoken when it is installed, else estimate 4 characters per token"""
+
+    def __init__(self, model: Optional[str] = None):
+        self._encoding = None
+        if tiktoken is not None:
+            try:
+                self._encoding = tiktoken.encoding_for_model(model) if model else tiktoken.get_encoding("cl100k_base")
+            except KeyError:
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                # e.g. the encoding files cannot be downloaded
+                logger.warning(f"tiktoken unavailable, estimating token counts: {e}")
+
+    def count(self, text: Optional[str]) -> int:
+        if not text:
+            return 0
+        if self._encoding is not None:
+            return len(self._encoding.encode(text))
+        return math.ceil(len(text) / 4)
+
+
+@dataclass
+class Turn:
+    """One user query and the agent's answer, taken from a stored run"""
+    run_id: str
+    user: str
+    assistant: str
+    tokens: int = 0
+
+    def to_text(self) -> str:
+        return f"User: {self.user}\nAssistant: {self.assistant}"
+
+
+@dataclass
+class SessionSummary:
+    """Rolling summary of the turns that no longer fit in the history window"""
+    summary: str = ""
+    last_run_id: Optional[str] = None
+    tokens: int = 0
+
+
+@dataclass
+class TurnContext:
+    """What a turn sends besides the query, and its token report"""
+    messages: List[Message] = field(default_factory=list)
+    instructions: Optional[str] = None
+    report: Dict[str, Any] = field(default_factory=dict)
+
+
+def turns_from_session(session: Optional[Session]) -> List[Turn]:
+    """Completed turns of a stored agent session, oldest first"""
+    if session is None or not session.memory:
+        return []
+    turns = []
+    for run in session.memory.get("runs", []):
+        messages = run.get("messages") or []
+        # Messages replayed from history belong to earlier turns
+        user = "\n".join(
+            m["content"] for m in messages
+            if m.get("role") == "user" and not m.get("from_history") and isinstance(m.get("content"), str)
+        )
+        assistant = run.get("content")
+        if not isinstance(assistant, str):
+            assistant = next(
+                (m["content"] for m in reversed(messages)
+                 if m.get("role") == "assistant" and not m.get("from_history") and isinstance(m.get("content"), str)),
+                "",
+            )
+        if user:
+            turns.append(Turn(run_id=run.get("run_id", ""), user=user, assistant=assistant))
+    return turns
+
+
+def fit_text(text: str, max_tokens: int, counter: TokenCounter) -> str:
+    """Drop leading lines until text fits in max_tokens (newest content is kept)"""
+    lines = text.splitlines()
+    while lines and counter.count("\n".join(lines)) > max_tokens:
+        lines.pop(0)
+    return "\n".join(lines)
+
+
+# async (previous summary, turns to fold in, token limit) -> new summary
+Summarizer = Callable[[str, List[Turn], int], Awaitable[str]]
+
+
+class ExtractiveSummarizer:
+    """Summarize by appending shortened turns and keeping the newest that fit.
+
+    Deterministic and offline; used when the model summarizer fails.
+    """
+
+    def __init__(self, counter: TokenCounter, chars_per_turn: int = 200):
+        self.counter = counter
+        self.chars_per_turn = chars_per_turn
+
+    async def __call__(self, summary: str, turns: List[Turn], max_tokens: int) -> str:
+        lines = [summary] if summary else []
+        for turn in turns:
+            lines.append(f"- User asked: {_shorten(turn.user, self.chars_per_turn)} "
+                         f"Answer: {_shorten(turn.assistant, self.chars_per_turn)}")
+        return fit_text("\n".join(lines), max_tokens, self.counter)
+
+
+class ModelSummarizer:
+    """Fold turns into the previous summary with a chat model"""
+
+    PROMPT = (
+        "You maintain a running summary of a conversation between a user and an assistant. "
+        "Update the summary with the new exchanges below. Keep facts, names, decisions and "
+        "open questions; drop small talk. Answer with the updated summary only, in at most "
+        "{max_words} words."
+    )
+
+    def __init__(self, model_factory: Callable[[], Any]):
+        self.model_factory = model_factory
+
+    async def __call__(self, summary: str, turns: List[Turn], max_tokens: int) -> str:
+        exchanges = "\n\n".join(turn.to_text() for turn in turns)
+        model = self.model_factory()
+        response = await model.aresponse(messages=[
+            Message(role="system", content=self.PROMPT.format(max_words=max(int(max_tokens * 0.75), 20))),
+            Message(role="user", content=f"Current summary:\n{summary or '(empty)'}\n\nNew exchanges:\n{exchanges}"),
+        ])
+        return (response.content or "").strip()
+
+
+class SummaryStore:
+    """Session summaries in a SQLite table, with a bounded in-memory cache"""
+
+    def __init__(self, db_file: str = "tmp/agent_storage.db", table_name: str = "session_summaries", max_cached: int = 1000):
+        self.db_file = db_file
+        self.table_name = table_name
+        self.max_cached = max_cached
+
+        db_dir = os.path.dirname(db_file)
+        if db_dir and not os.path.exists(db_dir):
+            os.makedirs(db_dir)
+
+        self._conn = sqlite3.connect(db_file, check_same_thread=False)
+        configure_sqlite_connection(self._conn)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table_name} ("
+            "session_id TEXT PRIMARY KEY, "
+            "summary TEXT NOT NULL, "
+            "last_run_id TEXT, "
+            "tokens INTEGER NOT NULL, "
+            "updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._cache: "OrderedDict[str, SessionSummary]" = OrderedDict()
+        # Called from DbExecutor threads; one connection, so one statement at a time
+        self._lock = threading.Lock()
+
+    def get(self, session_id: str) -> SessionSummary:
+        with self._lock:
+            summary = self._cache.get(session_id)
+            if summary is None:
+                row = self._conn.execute(
+                    f"SELECT summary, last_run_id, tokens FROM {self.table_name} WHERE session_id = ?", (session_id,)
+                ).fetchone()
+                summary = SessionSummary(*row) if row else SessionSummary()
+            self._cache_put(session_id, summary)
+            return summary
+
+    def save(self, session_id: str, summary: SessionSummary) -> None:
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    f"INSERT OR REPLACE INTO {self.table_name} "
+                    "(session_id, summary, last_run_id, tokens, updated_at) VALUES (?, ?, ?, ?, ?)",
+                    (session_id, summary.summary, summary.last_run_id, summary.tokens, time.time()),
+                )
+            self._cache_put(session_id, summary)
+
+    def discard(self, session_ids: Sequence[str]) -> None:
+        """Forget cached summaries of sessions whose rows were deleted"""
+        with self._lock:
+            for session_id in session_ids:
+                self._cache.pop(session_id, None)
+
+    def _cache_put(self, session_id: str, summary: SessionSummary) -> None:
+        self._cache[session_id] = summary
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.max_cached:
+            self._cache.popitem(last=False)
+
+
+class ContextBudget:
+    """Cap the history and memory tokens an agent run sends.
+
+    Each turn gets the newest turns of its session that fit in
+    ``history_tokens``, the most recently updated user memories that fit in
+    ``memory_tokens``, and a rolling summary of everything older, kept
+    under ``summary_tokens``. The summary is updated incrementally: only
+    turns that have just left the history window are folded into it, so
+    its cost does not grow with the length of the conversation. With an
+    ``executor`` (a DbExecutor), summaries are read and saved off the event
+    loop.
+    """
+
+    def __init__(
+        self,
+        store: SummaryStore,
+        summarizer: Summarizer,
+        counter: Optional[TokenCounter] = None,
+        history_tokens: int = 2000,
+        memory_tokens: int = 500,
+        summary_tokens: int = 400,
+        executor: Any = None,
+    ):
+        self.store = store
+        self.executor = executor
+        self.summarizer = summarizer
+        self.counter = counter or TokenCounter()
+        self.fallback_summarizer = ExtractiveSummarizer(self.counter)
+        self.history_tokens = history_tokens
+        self.memory_tokens = memory_tokens
+        self.summary_tokens = summary_tokens
+        self.counters = {"turns": 0, "summary_updates": 0, "summarized_turns": 0, "summarizer_failures": 0}
+        self._context_tokens_total = 0
+        self._context_tokens_max = 0
+        self._input_tokens_total = 0
+        self.last_turn: Dict[str, Any] = {}
+
+    async def prepare(
+        self,
+        session_id: str,
+        session: Optional[Session],
+        memories: Sequence[UserMemory] = (),
+    ) -> TurnContext:
+        """Build the history messages and instructions for the next turn of a session"""
+        turns = turns_from_session(session)
+        for turn in turns:
+            turn.tokens = self.counter.count(turn.to_text())
+
+        # Newest turns first, until the history budget is spent
+        window_start, used = len(turns), 0
+        while window_start > 0 and used + turns[window_start - 1].tokens <= self.history_tokens:
+            window_start -= 1
+            used += turns[window_start].tokens
+        window, evicted = turns[window_start:], turns[:window_start]
+
+        if self.executor is not None:
+            summary = await self.executor.read("get_summary", self.store.get, session_id)
+        else:
+            summary = self.store.get(session_id)
+        unsummarized = _after(evicted, summary.last_run_id)
+        if unsummarized:
+            summary = await self._fold(session_id, summary, unsummarized)
+
+        memory_lines, memory_used = self._select_memories(memories)
+
+        messages = []
+        for turn in window:
+            messages.append(Message(role="user", content=turn.user, from_history=True))
+            messages.append(Message(role="assistant", content=turn.assistant, from_history=True))
+
+        sections = []
+        if summary.summary:
+            sections.append(f"<summary_of_earlier_conversation>\n{summary.summary}\n</summary_of_earlier_conversation>")
+        if memory_lines:
+            sections.append(
+                "<memories_from_previous_interactions>\n" + "\n".join(memory_lines)
+                + "\n</memories_from_previous_interactions>\n"
+                "Prefer information from this conversation over these memories."
+            )
+
+        report = {
+            "session_id": session_id,
+            "turns": len(turns),
+            "history_turns": len(window),
+            "summarized_turns": len(evicted),
+            "history_tokens": used,
+            "summary_tokens": summary.tokens,
+            "memories": len(memory_lines),
+            "memory_tokens": memory_used,
+            "context_tokens": used + summary.tokens + memory_used,
+        }
+        return TurnContext(messages=messages, instructions="\n\n".join(sections) or None, report=report)
+
+    def record(self, context: TurnContext, input_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Record a finished turn; input_tokens is the prompt size reported by the model"""
+        report = dict(context.report, input_tokens=input_tokens)
+        self.counters["turns"] += 1
+        self._context_tokens_total += report["context_tokens"]
+        self._context_tokens_max = max(self._context_tokens_max, report["context_tokens"])
+        self._input_tokens_total += input_tokens or 0
+        self.last_turn = report
+        logger.info(f"Context tokens for session {report['session_id']}: {report}")
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        turns = self.counters["turns"]
+        return {
+            "history_tokens": self.history_tokens,
+            "memory_tokens": self.memory_tokens,
+            "summary_tokens": self.summary_tokens,
+            "avg_context_tokens": self._context_tokens_total / turns if turns else 0.0,
+            "max_context_tokens": self._context_tokens_max,
+            "avg_input_tokens": self._input_tokens_total / turns if turns else 0.0,
+            "last_turn": self.last_turn,
+            **self.counters,
+        }
+
+    async def _fold(self, session_id: str, summary: SessionSummary, turns: List[Turn]) -> SessionSummary:
+        try:
+            text = await self.summarizer(summary.summary, turns, self.summary_tokens)
+        except Exception as e:
+            logger.warning(f"Summarizer failed for session {session_id}, falling back to extractive summary: {e}")
+            self.counters["summarizer_failures"] += 1
+            text = await self.fallback_summarizer(summary.summary, turns, self.summary_tokens)
+        text = fit_text(text, self.summary_tokens, self.counter)
+        updated = SessionSummary(summary=text, last_run_id=turns[-1].run_id, tokens=self.counter.count(text))
+        if self.executor is not None:
+            await self.executor.write("save_summary", self.store.save, session_id, updated)
+        else:
+            self.store.save(session_id, updated)
+        self.counters["summary_updates"] += 1
+        self.counters["summarized_turns"] += len(turns)
+        return updated
+
+    def _select_memories(self, memories: Sequence[UserMemory]) -> tuple:
+        lines, used = [], 0
+        newest_first = sorted(
+            memories, key=lambda m: m.last_updated.timestamp() if m.last_updated else 0, reverse=True
+        )
+        for memory in newest_first:
+            line = f"- {memory.memory}"
+            tokens = self.counter.count(line)
+            if used + tokens > self.memory_tokens:
+                break
+            lines.append(line)
+            used += tokens
+        return lines, used
+
+
+def _after(turns: List[Turn], run_id: Optional[str]) -> List[Turn]:
+    """Turns after the one with run_id (all of them if run_id is None)"""
+    if run_id is None:
+        return turns
+    for i, turn in enumerate(turns):
+        if turn.run_id == run_id:
+            return turns[i + 1:]
+    # The summarized run is no longer stored; whatever is older is covered
+    return []
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3] + "..."
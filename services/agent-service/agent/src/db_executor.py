@@ -0,0 +1,157 @@
+from typing import Any, Callable, Dict, List, Optional
+from concurrent.futures import Future, ThreadPoolExecutor
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import asyncio
+import bisect
+import logging
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the latency buckets, in milliseconds
+LATENCY_BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+def configure_sqlite_connection(connection: sqlite3.Connection, busy_timeout_ms: int = 5000) -> None:
+    """WAL lets readers run alongside the writer; the busy timeout covers writers outside the queue"""
+    # Only takes effect on a new database, and must come before the switch to WAL creates it
+    connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    # Truncate the WAL back to this size after checkpoints instead of keeping its peak size
+    connection.execute("PRAGMA journal_size_limit=67108864")
+    connection.execute(f"PRAGMA busy_timeout={busy_timeout_ms}")
+
+
+def configure_sqlite_engine(engine: Engine, busy_timeout_ms: int = 5000) -> Engine:
+    """Apply configure_sqlite_connection to every connection of an Agno-created SQLAlchemy engine"""
+
+    def on_connect(dbapi_connection, connection_record):
+        configure_sqlite_connection(dbapi_connection, busy_timeout_ms)
+
+    event.listen(engine, "connect", on_connect)
+    # Connections opened before the listener existed are replaced on next checkout
+    engine.dispose()
+    return engine
+
+
+class LatencyHistogram:
+    """Counts of latencies per bucket of LATENCY_BUCKETS_MS, plus sum and max"""
+
+    def __init__(self):
+        self.buckets: List[int] = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        # Samples are recorded from worker threads too
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        ms = seconds * 1000
+        with self._lock:
+            self.buckets[bisect.bisect_left(LATENCY_BUCKETS_MS, ms)] += 1
+            self.count += 1
+            self.total_ms += ms
+            self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding quantile q (at most the max seen), in milliseconds"""
+        if self.count == 0:
+            return None
+        rank, seen = q * self.count, 0
+        for bound, count in zip(LATENCY_BUCKETS_MS, self.buckets):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def stats(self) -> Dict[str, Any]:
+        labels = [f"le_{bound}ms" for bound in LATENCY_BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "avg_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p95_ms": self.percentile(0.95),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max_ms,
+            "buckets": {label: count for label, count in zip(labels, self.buckets) if count},
+        }
+
+
+class DbExecutor:
+    """Runs blocking database calls off the event loop.
+
+    Reads go to a pool of ``readers`` threads and may run concurrently,
+    which WAL mode allows. Writes go to one writer thread, so they are
+    applied one at a time in submission order and never wait on each other
+    for the SQLite write lock. Every call is timed per operation name, from
+    submission to completion (queue wait included), and the time spent
+    queued is tracked per pool, so ``GET /stats`` shows both slow queries
+    and a backed-up writer.
+    """
+
+    def __init__(self, readers: int = 4):
+        self.readers = readers
+        self._read_pool = ThreadPoolExecutor(max_workers=readers, thread_name_prefix="db-read")
+        self._write_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db-write")
+        self.latency: Dict[str, LatencyHistogram] = {}
+        self.queue_wait = {"read": LatencyHistogram(), "write": LatencyHistogram()}
+        self.pending = {"read": 0, "write": 0}
+        self.counters = {"reads": 0, "writes": 0, "errors": 0}
+        self._lock = threading.Lock()
+
+    async def read(self, operation: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on a reader thread and return its result"""
+        return await asyncio.wrap_future(self._submit("read", operation, fn, args, kwargs))
+
+    async def write(self, operation: str, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run fn(*args, **kwargs) on the writer thread, after every write submitted before it"""
+        return await asyncio.wrap_future(self._submit("write", operation, fn, args, kwargs))
+
+    def submit_write(self, operation: str, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """Queue a write without waiting for it, e.g. from synchronous code running on the loop"""
+        return self._submit("write", operation, fn, args, kwargs)
+
+    def close(self) -> None:
+        """Finish queued writes and stop the threads"""
+        self._write_pool.shutdown(wait=True)
+        self._read_pool.shutdown(wait=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "readers": self.readers,
+            "pending_reads": self.pending["read"],
+            "pending_writes": self.pending["write"],
+            **self.counters,
+            "read_queue_wait": self.queue_wait["read"].stats(),
+            "write_queue_wait": self.queue_wait["write"].stats(),
+            "latency": {operation: histogram.stats() for operation, histogram in sorted(self.latency.items())},
+        }
+
+    def _submit(self, kind: str, operation: str, fn: Callable[..., Any], args: tuple, kwargs: dict) -> Future:
+        histogram = self.latency.get(operation)
+        if histogram is None:
+            histogram = self.latency.setdefault(operation, LatencyHistogram())
+        submitted = time.perf_counter()
+        with self._lock:
+            self.pending[kind] += 1
+            self.counters[f"{kind}s"] += 1
+
+        def run():
+            self.queue_wait[kind].record(time.perf_counter() - submitted)
+            try:
+                return fn(*args, **kwargs)
+            except Exception:
+                with self._lock:
+                    self.counters["errors"] += 1
+                raise
+            finally:
+                histogram.record(time.perf_counter() - submitted)
+                with self._lock:
+                    self.pending[kind] -= 1
+
+        pool = self._read_pool if kind == "read" else self._write_pool
+        return pool.submit(run)
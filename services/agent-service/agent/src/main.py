@@ -2,9 +2,12 @@ import logging
 import asyncio
 import os
 from dotenv import load_dotenv
-from typing import Dict, Any, AsyncIterable, List, Union, Iterator, Optional
+from typing import Dict, Any, AsyncIterable, List, Union, Iterator, Optional, Tuple
+from uuid import uuid4
 from pydantic import BaseModel, Field
 import sys
+import dataclasses
+import hashlib
 
 # 添加对Sofia根目录的引用
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../.."))
@@ -12,13 +15,15 @@ sys.path.append(ROOT_DIR)
 
 # Import Agno libraries
 from agno.agent import Agent, RunResponse
+from agno.models.message import Message as ModelMessage
+from agno.storage.session.agent import AgentSession
 from agno.models.openai import OpenAIChat
+from agno.embedder.openai import OpenAIEmbedder
 from agno.tools.mcp import MultiMCPTools
 # Update memory imports to use v2 structure
 from agno.memory.v2.memory import Memory
-from agno.memory.v2.db.sqlite import SqliteMemoryDb
 from agno.memory.v2.schema import UserMemory
-from agno.storage.sqlite import SqliteStorage
+from agno.memory.v2.db.schema import MemoryRow
 # Remove MemoryManager import since we're not using it
 from datetime import datetime
 
@@ -28,8 +33,16 @@ from common.a2a.protocol import (
     AgentSkill,
     Message,
 )
-from common.server import A2AServer, TaskManager
+from common.server import A2AServer, TaskManager, InMemoryTaskStore, SqliteTaskStore, WorkerPool, current_task_params
 from common.mcp_config import MCP_SERVERS
+from agent_pool import AgentPool
+from session_cache import CachedSqliteStorage
+from context_budget import ContextBudget, ModelSummarizer, SummaryStore, TokenCounter, TurnContext
+from response_cache import ResponseCache
+from memory_index import TopicIndexedMemoryDb, utc_now
+from vector_index import AgnoEmbeddingBackend, HashingEmbeddingBackend, VectorIndex
+from db_executor import DbExecutor, configure_sqlite_engine
+from maintenance import StorageMaintenance
 
 # Load environment variables
 load_dotenv()
@@ -73,6 +86,63 @@ class MemoryConfig(BaseModel):
     storage_table_name: str = Field(
         default=os.getenv("STORAGE_TABLE_NAME", "agent_sessions")
     )
+    session_cache_size: int = Field(
+        default=int(os.getenv("SESSION_CACHE_SIZE", "1000"))
+    )
+    session_cache_ttl_seconds: float = Field(
+        default=float(os.getenv("SESSION_CACHE_TTL_SECONDS", "1800"))
+    )
+    context_history_tokens: int = Field(
+        default=int(os.getenv("CONTEXT_HISTORY_TOKENS", "2000"))
+    )
+    context_memory_tokens: int = Field(
+        default=int(os.getenv("CONTEXT_MEMORY_TOKENS", "500"))
+    )
+    context_summary_tokens: int = Field(
+        default=int(os.getenv("CONTEXT_SUMMARY_TOKENS", "400"))
+    )
+    vector_index_dir: str = Field(
+        default=os.getenv("VECTOR_INDEX_DIR", "tmp/vector_index")
+    )
+    memory_embedder: str = Field(
+        default=os.getenv("MEMORY_EMBEDDER", "hashing")
+    )
+    embedding_dimensions: int = Field(
+        default=int(os.getenv("EMBEDDING_DIMENSIONS", "256"))
+    )
+
+class MaintenanceConfig(BaseModel):
+    """Retention, archiving and vacuum of the memory and session databases"""
+    enabled: bool = Field(
+        default=os.getenv("MAINTENANCE_ENABLED", "false").lower() == "true"
+    )
+    interval_seconds: float = Field(
+        default=float(os.getenv("MAINTENANCE_INTERVAL_SECONDS", "3600"))
+    )
+    session_retention_days: Optional[float] = Field(
+        default=float(os.getenv("SESSION_RETENTION_DAYS")) if os.getenv("SESSION_RETENTION_DAYS") else None
+    )
+    sessions_per_user: Optional[int] = Field(
+        default=int(os.getenv("SESSION_RETENTION_PER_USER")) if os.getenv("SESSION_RETENTION_PER_USER") else None
+    )
+    archive_dir: Optional[str] = Field(
+        default=os.getenv("SESSION_ARCHIVE_DIR", "tmp/session_archive") or None
+    )
+    batch_size: int = Field(
+        default=int(os.getenv("MAINTENANCE_BATCH_SIZE", "100"))
+    )
+    batch_pause_seconds: float = Field(
+        default=float(os.getenv("MAINTENANCE_BATCH_PAUSE_SECONDS", "0.05"))
+    )
+    max_rows_per_run: int = Field(
+        default=int(os.getenv("MAINTENANCE_MAX_ROWS_PER_RUN", "50000"))
+    )
+    vacuum_pages: int = Field(
+        default=int(os.getenv("MAINTENANCE_VACUUM_PAGES", "256"))
+    )
+    full_vacuum: bool = Field(
+        default=os.getenv("MAINTENANCE_FULL_VACUUM", "false").lower() == "true"
+    )
 
 class SofiaAgent:
     SYSTEM_INSTRUCTION = (
@@ -92,7 +162,31 @@ class SofiaAgent:
         self.agent = None
         self.mcp_tools = None
         self.memory = None
+        self.memory_db = None
+        self.vector_index = None
+        self.agent_storage = None
+        self.context_budget = None
+        # Constructor arguments shared by every Agent instance
+        self._agent_options: Dict[str, Any] = {}
+        # Concurrent runs each check out their own Agent instance
+        self.agent_pool = AgentPool(
+            self._create_agent,
+            size=int(os.getenv("AGENT_POOL_SIZE", os.getenv("WORKER_POOL_SIZE", "8"))),
+        )
         self.memory_config = MemoryConfig()
+        self.maintenance_config = MaintenanceConfig()
+        self.maintenance = None
+        # Memory and session database calls run on these threads, not the event loop
+        self.db_executor = DbExecutor(readers=int(os.getenv("DB_READER_POOL_SIZE", "4")))
+        # Opt-in cache of answers to first turns
+        self.response_cache = None
+        if os.getenv("RESPONSE_CACHE_ENABLED", "false").lower() == "true":
+            threshold = os.getenv("RESPONSE_CACHE_SIMILARITY")
+            self.response_cache = ResponseCache(
+                max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "1000")),
+                ttl_seconds=float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "600")),
+                similarity_threshold=float(threshold) if threshold else None,
+            )
         
         # Convert MCP_SERVERS to a format usable by MultiMCPTools
         self.mcp_server_commands = self._convert_mcp_servers_to_commands()
@@ -121,44 +215,90 @@ class SofiaAgent:
     async def initialize(self):
         """Initialize the agent with MCP tools"""
         try:
-            # Initialize the model
-            model = OpenAIChat(id=self.model_name, api_key=self.api_key)
-            
             # Ensure the directory for the database files exists
             db_dir = os.path.dirname(self.memory_config.db_file)
             if db_dir and not os.path.exists(db_dir):
                 os.makedirs(db_dir)
                 logger.info(f"Created directory for database files: {db_dir}")
             
-            # Create SQLite memory database
-            memory_db = SqliteMemoryDb(
+            # Create SQLite memory database, with an index of memory topics
+            memory_db = TopicIndexedMemoryDb(
                 table_name=self.memory_config.table_name,
                 db_file=self.memory_config.db_file
             )
+            configure_sqlite_engine(memory_db.db_engine)
+            self.memory_db = memory_db
             logger.info(f"Created SQLite memory database at {self.memory_config.db_file}")
+
+            # Local vector index for semantic search, kept in sync with the memory database
+            self.vector_index = VectorIndex(
+                self.memory_config.vector_index_dir,
+                self._create_embedding_backend(),
+                memory_db=memory_db,
+            )
+            memory_db.add_listener(self.vector_index)
+            logger.info(f"Created memory vector index at {self.memory_config.vector_index_dir}")
             
             # Create the Memory instance with database storage directly (no memory_manager)
             self.memory = Memory(db=memory_db)
             logger.info("Memory component initialized successfully with SQLite persistence")
             
-            # Create agent storage
-            agent_storage = SqliteStorage(
+            # Create agent storage; recent sessions stay cached between turns
+            agent_storage = CachedSqliteStorage(
                 table_name=self.memory_config.storage_table_name,
-                db_file=self.memory_config.storage_db_file
+                db_file=self.memory_config.storage_db_file,
+                max_sessions=self.memory_config.session_cache_size,
+                ttl_seconds=self.memory_config.session_cache_ttl_seconds,
+                executor=self.db_executor,
             )
+            configure_sqlite_engine(agent_storage.db_engine)
+            self.agent_storage = agent_storage
             logger.info(f"Created SQLite agent storage at {self.memory_config.storage_db_file}")
+
+            # History, summary and memories are added per turn within a token budget
+            self.context_budget = ContextBudget(
+                SummaryStore(db_file=self.memory_config.storage_db_file),
+                summarizer=ModelSummarizer(self._create_model),
+                counter=TokenCounter(self.model_name),
+                history_tokens=self.memory_config.context_history_tokens,
+                memory_tokens=self.memory_config.context_memory_tokens,
+                summary_tokens=self.memory_config.context_summary_tokens,
+                executor=self.db_executor,
+            )
+
+            # Background retention and vacuum; started by start_maintenance()
+            if self.maintenance_config.enabled:
+                config = self.maintenance_config
+                self.maintenance = StorageMaintenance(
+                    storage_db_file=self.memory_config.storage_db_file,
+                    storage_table=self.memory_config.storage_table_name,
+                    summary_table=self.context_budget.store.table_name,
+                    memory_db_file=self.memory_config.db_file,
+                    archive_dir=config.archive_dir,
+                    max_session_age_days=config.session_retention_days,
+                    max_sessions_per_user=config.sessions_per_user,
+                    interval_seconds=config.interval_seconds,
+                    batch_size=config.batch_size,
+                    batch_pause_seconds=config.batch_pause_seconds,
+                    max_rows_per_run=config.max_rows_per_run,
+                    vacuum_pages=config.vacuum_pages,
+                    full_vacuum=config.full_vacuum,
+                    executor=self.db_executor,
+                    on_sessions_deleted=self._forget_sessions,
+                )
             
             # If no MCP server commands were found, create a basic agent
             if not self.mcp_server_commands:
                 logger.warning("No MCP servers configured, creating basic agent without tools")
-                self.agent = Agent(
-                    model=model,
+                self._agent_options = dict(
                     description=self.SYSTEM_INSTRUCTION,
                     memory=self.memory,
                     storage=agent_storage,
                     enable_user_memories=True,
                     enable_agentic_memory=True,  # Enable agentic memory management
+                    add_memory_references=False,  # Memories are added by the context budget
                 )
+                self.agent = self._create_agent()
                 return
 
             logger.info(f"MCP_SERVERS: {self.mcp_server_commands}")
@@ -170,8 +310,7 @@ class SofiaAgent:
             logger.info(f"MCP_TOOLS: {self.mcp_tools}")
             
             # Create Agno agent with MCP tools
-            self.agent = Agent(
-                model=model,
+            self._agent_options = dict(
                 description=self.SYSTEM_INSTRUCTION,
                 tools=[self.mcp_tools],
                 show_tool_calls=True,
@@ -179,27 +318,158 @@ class SofiaAgent:
                 storage=agent_storage,
                 enable_user_memories=True,
                 enable_agentic_memory=True,  # Enable agentic memory management
+                add_memory_references=False,  # Memories are added by the context budget
             )
+            self.agent = self._create_agent()
             
             logger.info(f"Sofia Agent initialized with MCP tools from {len(self.mcp_server_commands)} servers and memory")
         except Exception as e:
             logger.error(f"Error initializing agent: {e}")
             # If initialization fails, create a basic agent with no tools
-            model = OpenAIChat(id=self.model_name, api_key=self.api_key)
-            self.agent = Agent(
-                model=model,
-                description=self.SYSTEM_INSTRUCTION
-            )
+            self._agent_options = dict(description=self.SYSTEM_INSTRUCTION)
+            self.agent = self._create_agent()
             logger.info("Sofia Agent initialized with no tools (initialization failed)")
 
+    def _create_model(self) -> OpenAIChat:
+        return OpenAIChat(id=self.model_name, api_key=self.api_key)
+
+    def _create_agent(self) -> Agent:
+        """Create an Agent with its own model client; tools, memory and storage are shared"""
+        return Agent(model=self._create_model(), **self._agent_options)
+
+    def start_maintenance(self) -> None:
+        if self.maintenance:
+            self.maintenance.start()
+            logger.info(f"Storage maintenance scheduled every {self.maintenance.interval_seconds}s")
+
     async def cleanup(self):
         """Clean up MCP tools resources"""
+        if self.maintenance:
+            await self.maintenance.stop()
         if self.mcp_tools:
             try:
                 await self.mcp_tools.__aexit__(None, None, None)
                 logger.info("MCP tools cleaned up")
             except Exception as e:
                 logger.error(f"Error cleaning up MCP tools: {e}")
+        # Let queued session writes land before exiting
+        await asyncio.to_thread(self.db_executor.close)
+        if self.vector_index:
+            await asyncio.to_thread(self.vector_index.close)
+
+    async def _prepare_context(self, agent: Agent, session_id: str, user_id: str) -> Optional[TurnContext]:
+        """Give a checked-out agent the budgeted history, summary and memories of the session"""
+        if self.context_budget is None:
+            return None
+        session = await self.db_executor.read("read_session", self.agent_storage.read, session_id)
+        memories = (
+            await self.db_executor.read("get_user_memories", self.memory.get_user_memories, user_id=user_id)
+            if self.memory else []
+        )
+        context = await self.context_budget.prepare(session_id, session, memories)
+        agent.add_messages = context.messages
+        agent.additional_context = context.instructions
+        return context
+
+    def _record_context(self, agent: Agent, context: Optional[TurnContext]) -> None:
+        if context is None:
+            return
+        metrics = agent.run_response.metrics if agent.run_response and agent.run_response.metrics else {}
+        input_tokens = sum(metrics.get("input_tokens") or []) or None
+        self.context_budget.record(context, input_tokens)
+
+    def _create_embedding_backend(self):
+        dimensions = self.memory_config.embedding_dimensions
+        # OpenAI embeddings are opt-in: they add a paid API call to every memory write and search
+        if self.memory_config.memory_embedder == "openai":
+            return AgnoEmbeddingBackend(OpenAIEmbedder(dimensions=dimensions, api_key=self.api_key))
+        return HashingEmbeddingBackend(dimensions=dimensions)
+
+    async def _cache_context(self, user_id: str) -> str:
+        """Everything besides the query that shapes an answer.
+
+        With memory on, the agent is given the user's memories and may
+        update them, so answers are only reused for the same user holding
+        the same memories.
+        """
+        context = f"{self.model_name}|{','.join(sorted(self.mcp_server_commands or []))}"
+        if self.memory is None:
+            return context
+        memories = await self.db_executor.read("get_user_memories", self.memory.get_user_memories, user_id=user_id)
+        fingerprint = hashlib.sha256(
+            "\n".join(sorted(f"{memory.memory_id}|{memory.last_updated}" for memory in memories)).encode()
+        ).hexdigest()[:16]
+        return f"{context}|{user_id}|{fingerprint}"
+
+    async def _cacheable(self, session_id: str) -> bool:
+        """Only first turns are cached; follow-ups depend on the conversation"""
+        if self.response_cache is None:
+            return False
+        session = (
+            await self.db_executor.read("read_session", self.agent_storage.read, session_id)
+            if self.agent_storage else None
+        )
+        return session is None or not (session.memory or {}).get("runs")
+
+    async def _cache_answer(self, query: str, response: Dict[str, Any], user_id: str) -> None:
+        # Keyed on the memories as the run left them, which is what a repeat of the question will see
+        if response["is_task_complete"]:
+            self.response_cache.put(query, response["content"], await self._cache_context(user_id))
+
+    async def _record_cached_exchange(self, query: str, answer: str, session_id: str, user_id: str) -> None:
+        """Add a question answered from the cache to the session as a run, so the next turn has it as history"""
+        if not self.agent_storage:
+            return
+        session = await self.db_executor.read("read_session", self.agent_storage.read, session_id)
+        if session is None:
+            session = AgentSession(session_id=session_id, agent_id=self.agent.agent_id, user_id=user_id, session_data={})
+        run = RunResponse(
+            content=answer,
+            run_id=str(uuid4()),
+            agent_id=self.agent.agent_id,
+            session_id=session_id,
+            model=self.model_name,
+            messages=[ModelMessage(role="user", content=query), ModelMessage(role="assistant", content=answer)],
+        )
+        memory = dict(session.memory or {})
+        memory["runs"] = [*memory.get("runs", []), run.to_dict()]
+        # Queued on the writer thread; reads see the new session right away
+        self.agent_storage.upsert(dataclasses.replace(session, memory=memory))
+
+    def response_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of the response cache"""
+        return self.response_cache.stats() if self.response_cache else {}
+
+    def vector_index_stats(self) -> Dict[str, Any]:
+        """Search and embedding counters of the memory vector index"""
+        return self.vector_index.stats() if self.vector_index else {}
+
+    def context_budget_stats(self) -> Dict[str, Any]:
+        """Per-turn context token counts"""
+        return self.context_budget.stats() if self.context_budget else {}
+
+    def db_stats(self) -> Dict[str, Any]:
+        """Queue depths and latency histograms of memory and session database calls"""
+        return self.db_executor.stats()
+
+    def session_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of the session cache"""
+        return self.agent_storage.stats() if self.agent_storage else {}
+
+    def maintenance_stats(self) -> Dict[str, Any]:
+        """Retention, archive and vacuum counters of the maintenance job"""
+        return self.maintenance.stats() if self.maintenance else {}
+
+    def _forget_sessions(self, session_ids: List[str]) -> None:
+        # Maintenance deleted these rows; don't serve them from the caches
+        for session_id in session_ids:
+            self.agent_storage.invalidate(session_id)
+        self.context_budget.store.discard(session_ids)
+
+    def _invalidate_session(self, session_id: str) -> None:
+        # A run that failed part-way may have left the cached session ahead of the database
+        if self.agent_storage:
+            self.agent_storage.invalidate(session_id)
 
     async def add_user_memory(self, content: str, user_id: str, topics: List[str] = None) -> Optional[str]:
         """添加用户记忆，可以指定主题"""
@@ -215,7 +485,9 @@ class SofiaAgent:
             )
             
             # Add the memory to the database
-            memory_id = self.memory.add_user_memory(
+            memory_id = await self.db_executor.write(
+                "add_user_memory",
+                self.memory.add_user_memory,
                 memory=memory_obj,
                 user_id=user_id
             )
@@ -232,7 +504,9 @@ class SofiaAgent:
             return False
             
         try:
-            self.memory.delete_user_memory(user_id=user_id, memory_id=memory_id)
+            await self.db_executor.write(
+                "delete_user_memory", self.memory.delete_user_memory, user_id=user_id, memory_id=memory_id
+            )
             logger.info(f"Deleted memory {memory_id} for user {user_id}")
             return True
         except Exception as e:
@@ -253,7 +527,9 @@ class SofiaAgent:
             )
             
             # Replace the existing memory
-            self.memory.replace_user_memory(
+            await self.db_executor.write(
+                "replace_user_memory",
+                self.memory.replace_user_memory,
                 memory_id=memory_id,
                 memory=updated_memory,
                 user_id=user_id
@@ -271,7 +547,7 @@ class SofiaAgent:
             return False
             
         try:
-            self.memory.clear()
+            await self.db_executor.write("clear_memories", self.memory.clear)
             logger.info("Cleared all memories")
             return True
         except Exception as e:
@@ -279,24 +555,98 @@ class SofiaAgent:
             return False
             
     async def clear_user_memories(self, user_id: str) -> bool:
-        """清除指定用户的所有记忆"""
-        if not self.memory:
+        """清除指定用户的所有记忆（单个事务）"""
+        if not self.memory_db:
             logger.warning("Memory component not initialized, cannot clear user memories")
             return False
             
         try:
-            # Get all memories for the user
-            memories = self.memory.get_user_memories(user_id=user_id)
-            
-            # Delete each memory
-            for memory in memories:
-                self.memory.delete_user_memory(user_id=user_id, memory_id=memory.id)
-                
-            logger.info(f"Cleared all memories for user {user_id}")
+            deleted = await self.db_executor.write("delete_user_memories", self.memory_db.delete_user_memories, user_id)
+            self._drop_loaded_memories(user_id)
+            logger.info(f"Cleared all {deleted} memories for user {user_id}")
             return True
         except Exception as e:
             logger.error(f"Error clearing user memories: {e}")
             return False
+
+    async def add_user_memories(self, memories: List[Dict[str, Any]], user_id: str) -> List[str]:
+        """批量添加用户记忆（单个事务），每项为 {"content": ..., "topics": [...]}，返回记忆ID"""
+        if not self.memory_db:
+            logger.warning("Memory component not initialized, skipping memory creation")
+            return []
+
+        try:
+            rows = [self._memory_row(str(uuid4()), item["content"], item.get("topics"), user_id) for item in memories]
+            await self.db_executor.write("upsert_memories", self.memory_db.upsert_memories, rows)
+            self._drop_loaded_memories(user_id)
+            logger.info(f"Added {len(rows)} memories for user {user_id}")
+            return [row.id for row in rows]
+        except Exception as e:
+            logger.error(f"Error adding memories: {e}")
+            return []
+
+    async def replace_user_memories(self, memories: List[Dict[str, Any]], user_id: str) -> int:
+        """批量替换用户记忆（单个事务），每项为 {"memory_id": ..., "content": ..., "topics": [...]}，返回替换数量"""
+        if not self.memory_db:
+            logger.warning("Memory component not initialized, cannot update memories")
+            return 0
+
+        try:
+            rows = [
+                self._memory_row(item["memory_id"], item["content"], item.get("topics"), user_id)
+                for item in memories
+            ]
+            replaced = await self.db_executor.write("replace_memories", self.memory_db.replace_memories, rows)
+            self._drop_loaded_memories(user_id)
+            logger.info(f"Replaced {replaced} memories for user {user_id}")
+            return replaced
+        except Exception as e:
+            logger.error(f"Error replacing memories: {e}")
+            return 0
+
+    async def delete_user_memories(self, user_id: str, memory_ids: List[str]) -> int:
+        """按ID批量删除用户记忆（单个事务），返回删除数量"""
+        if not self.memory_db:
+            logger.warning("Memory component not initialized, cannot delete memories")
+            return 0
+
+        try:
+            deleted = await self.db_executor.write(
+                "delete_memories", self.memory_db.delete_memories, memory_ids, user_id=user_id
+            )
+            self._drop_loaded_memories(user_id)
+            logger.info(f"Deleted {deleted} memories for user {user_id}")
+            return deleted
+        except Exception as e:
+            logger.error(f"Error deleting memories: {e}")
+            return 0
+
+    async def delete_memories_by_topic(self, topic: str, user_id: str) -> int:
+        """删除用户某一主题下的所有记忆（单个事务），返回删除数量"""
+        if not self.memory_db:
+            logger.warning("Memory component not initialized, cannot delete memories")
+            return 0
+
+        try:
+            deleted = await self.db_executor.write(
+                "delete_memories_by_topic", self.memory_db.delete_memories_by_topic, user_id, topic
+            )
+            self._drop_loaded_memories(user_id)
+            logger.info(f"Deleted {deleted} memories with topic '{topic}' for user {user_id}")
+            return deleted
+        except Exception as e:
+            logger.error(f"Error deleting memories by topic: {e}")
+            return 0
+
+    @staticmethod
+    def _memory_row(memory_id: str, content: str, topics: Optional[List[str]], user_id: str) -> MemoryRow:
+        memory = UserMemory(memory=content, topics=topics or [], memory_id=memory_id, last_updated=utc_now())
+        return MemoryRow(id=memory_id, user_id=user_id, memory=memory.to_dict(), last_updated=memory.last_updated)
+
+    def _drop_loaded_memories(self, user_id: str) -> None:
+        # Bulk writes bypass Memory; drop its copy so the next access reloads from the database
+        if self.memory and self.memory.memories:
+            self.memory.memories.pop(user_id, None)
             
     async def create_user_memory(self, content: str, user_id: str) -> Optional[str]:
         """使用Agno Memory创建用户记忆 (调用add_user_memory实现向后兼容)"""
@@ -309,7 +659,7 @@ class SofiaAgent:
             return []
             
         try:
-            memories = self.memory.get_user_memories(user_id)
+            memories = await self.db_executor.read("get_user_memories", self.memory.get_user_memories, user_id)
             logger.info(f"Retrieved {len(memories)} memories for user {user_id}")
             return memories
         except Exception as e:
@@ -323,30 +673,40 @@ class SofiaAgent:
             return []
             
         try:
-            memories = self.memory.search_user_memories(
-                query=query,
-                limit=limit,
-                retrieval_method="semantic",
-                user_id=user_id
-            )
+            if self.vector_index:
+                # Rank by cosine similarity locally, then load just the hits
+                hits = await self.db_executor.read("vector_search", self.vector_index.search, user_id, query, limit)
+                rows = await self.db_executor.read(
+                    "memories_by_ids", self.memory_db.memories_by_ids, [memory_id for memory_id, _ in hits], user_id=user_id
+                )
+                memories = [UserMemory.from_dict(row.memory) for row in rows]
+            else:
+                memories = await self.db_executor.read(
+                    "search_user_memories",
+                    self.memory.search_user_memories,
+                    query=query,
+                    limit=limit,
+                    retrieval_method="semantic",
+                    user_id=user_id
+                )
             logger.info(f"Found {len(memories)} relevant memories for query '{query}'")
             return memories
         except Exception as e:
             logger.error(f"Error searching memories: {e}")
             return []
             
-    async def find_memories_by_topic(self, topic: str, user_id: str) -> List[Dict[str, Any]]:
-        """根据主题查找用户记忆"""
-        if not self.memory:
+    async def find_memories_by_topic(self, topic: str, user_id: str, limit: int = 50, offset: int = 0) -> List[UserMemory]:
+        """根据主题查找用户记忆，按最近更新排序并分页"""
+        if not self.memory_db:
             logger.warning("Memory component not initialized, returning empty memories")
             return []
             
         try:
-            # Get all memories for the user
-            all_memories = self.memory.get_user_memories(user_id=user_id)
-            
-            # Filter memories by topic
-            topic_memories = [m for m in all_memories if topic.lower() in [t.lower() for t in m.topics]]
+            # Look the page up in the topic index instead of loading every memory
+            rows = await self.db_executor.read(
+                "memories_by_topic", self.memory_db.memories_by_topic, user_id=user_id, topic=topic, limit=limit, offset=offset
+            )
+            topic_memories = [UserMemory.from_dict(row.memory) for row in rows]
             
             logger.info(f"Found {len(topic_memories)} memories with topic '{topic}' for user {user_id}")
             return topic_memories
@@ -374,23 +734,39 @@ class SofiaAgent:
                 elif "name" in query.lower():
                     # Find memories about name and delete them
                     memories = await self.search_user_memories("name", user_id)
-                    for memory in memories:
-                        await self.delete_user_memory(user_id, memory.id)
+                    await self.delete_user_memories(user_id, [memory.memory_id for memory in memories])
                     return self._format_response("I've removed memories about your name as requested.")
             
-            # Use agent.run() with memory integration
-            response: RunResponse = self.agent.run(
-                query, 
-                session_id=sessionId, 
-                user_id=user_id
-            )
+            cacheable = await self._cacheable(sessionId)
+            if cacheable:
+                cached = self.response_cache.get(query, await self._cache_context(user_id))
+                if cached is not None:
+                    logger.info(f"SofiaAgent answered query from cache:{query}")
+                    await self._record_cached_exchange(query, cached, sessionId, user_id)
+                    return self._format_response(cached)
+
+            # Run on the async API so the LLM call doesn't block the event loop
+            async with self.agent_pool.agent(sessionId) as agent:
+                context = await self._prepare_context(agent, sessionId, user_id)
+                # Explicitly, as Agno keeps stream=True on an agent once a streamed run used it
+                response: RunResponse = await agent.arun(
+                    query, 
+                    stream=False,
+                    session_id=sessionId, 
+                    user_id=user_id
+                )
+                self._record_context(agent, context)
             
             logger.info(f"SofiaAgent received query:{query}")
             logger.info(f"SofiaAgent response:{response.content if response else 'None'}")
             
-            return self._format_response(response.content if response else "")
+            result = self._format_response(response.content if response else "")
+            if cacheable:
+                await self._cache_answer(query, result, user_id)
+            return result
         except Exception as e:
             logger.error(f"Error in invoke: {e}")
+            self._invalidate_session(sessionId)
             return {
                 "is_task_complete": False,
                 "require_user_input": True,
@@ -415,49 +791,75 @@ class SofiaAgent:
                 elif "name" in query.lower():
                     # Find memories about name and delete them
                     memories = await self.search_user_memories("name", user_id)
-                    for memory in memories:
-                        await self.delete_user_memory(user_id, memory.id)
+                    await self.delete_user_memories(user_id, [memory.memory_id for memory in memories])
                     yield self._format_response("I've removed memories about your name as requested.")
                     return
 
 
             logger.info(f"SofiaAgent stream query:{query}")
-            # Use agent.run(stream=True) to get a streaming response
-            for chunk in self.agent.run(query, stream=True, session_id=sessionId):
-                # if chunk.tools and len(chunk.tools) > 0:
-                #     tool = chunk.tools[-1]
-                #     response_chunk = {
-                #     "is_task_complete": False,
-                #     "require_user_input": False,
-                #     "content": f"Using {tool.get('name', 'unknown')} tool...",
-                # }
-                #     logger.info(f"Tool chunk for session {sessionId}: {response_chunk}")
-                #     yield response_chunk
-                if chunk.content:
-                    response_chunk = {
-                    "is_task_complete": False,
-                    "require_user_input": False,
-                    "content": chunk.content,
+            cacheable = await self._cacheable(sessionId)
+            cached = self.response_cache.get(query, await self._cache_context(user_id)) if cacheable else None
+            if cached is not None:
+                # Replay the cached answer in chunks, like a live run
+                logger.info(f"SofiaAgent streaming answer from cache:{query}")
+                await self._record_cached_exchange(query, cached, sessionId, user_id)
+                for piece in self.response_cache.replay(cached):
+                    yield {
+                        "is_task_complete": False,
+                        "require_user_input": False,
+                        "content": piece,
                     }
-                    logger.info(f"Content chunk for session {sessionId}: {response_chunk}")
+            else:
+                async for response_chunk in self._stream_run(query, sessionId, user_id, cacheable):
                     yield response_chunk
             
             # The final response is already handled in streaming
         except Exception as e:
             logger.error(f"Error in stream: {e}")
+            self._invalidate_session(sessionId)
             yield {
                 "is_task_complete": False,
                 "require_user_input": True,
                 "content": f"An error occurred while processing your request: {str(e)}"
             }
-        # Send completion message instead of making another API call
+        # Send completion message instead of making another API call. Its
+        # content is empty so it doesn't extend the streamed answer artifact
         completion_response = {
             "is_task_complete": True,
             "require_user_input": False,
-            "content": "Task completed",
+            "content": "",
         }
         logger.info(f"Final completion response for session {sessionId}: {completion_response}")
         yield completion_response
+
+    async def _stream_run(self, query: str, sessionId: str, user_id: str, cacheable: bool) -> AsyncIterable[Dict[str, Any]]:
+        """Stream an agent run, caching the full answer when it completes"""
+        answer = []
+        # Stream through the async API so other requests keep being served
+        async with self.agent_pool.agent(sessionId) as agent:
+            context = await self._prepare_context(agent, sessionId, user_id)
+            async for chunk in await agent.arun(query, stream=True, session_id=sessionId, user_id=user_id):
+                # if chunk.tools and len(chunk.tools) > 0:
+                #     tool = chunk.tools[-1]
+                #     response_chunk = {
+                #     "is_task_complete": False,
+                #     "require_user_input": False,
+                #     "content": f"Using {tool.get('name', 'unknown')} tool...",
+                # }
+                #     logger.info(f"Tool chunk for session {sessionId}: {response_chunk}")
+                #     yield response_chunk
+                if chunk.content:
+                    response_chunk = {
+                    "is_task_complete": False,
+                    "require_user_input": False,
+                    "content": chunk.content,
+                    }
+                    logger.debug(f"Content chunk for session {sessionId}: {response_chunk}")
+                    answer.append(chunk.content)
+                    yield response_chunk
+            self._record_context(agent, context)
+        if cacheable:
+            await self._cache_answer(query, self._format_response("".join(answer)), user_id)
         
     def _format_response(self, result: str) -> Dict[str, Any]:
         if not result:
@@ -500,6 +902,15 @@ class SofiaAgent:
 # Create the general-purpose agent
 sofia_agent = SofiaAgent()
 
+def get_session_and_user(message: Message) -> Tuple[str, str]:
+    """Session and user ids for a message, taken from the A2A task being processed"""
+    params = current_task_params.get()
+    # Outside of a task (e.g. a direct call) the message gets a session of its own
+    session_id = params.sessionId if params is not None else f"session_{uuid4().hex}"
+    metadata = {**(message.metadata or {}), **((params.metadata or {}) if params is not None else {})}
+    user_id = metadata.get("user_id") or f"user_{session_id}"
+    return session_id, str(user_id)
+
 async def process_message(message: Message) -> Union[str, Dict[str, Any]]:
     """Process incoming messages using the Agno-based agent"""
     try:
@@ -512,11 +923,8 @@ async def process_message(message: Message) -> Union[str, Dict[str, Any]]:
             if part.type == "text":
                 text_content += part.text
 
-        # Generate a session ID based on message
-        session_id = f"session_{hash(text_content)}"
-        
-        # Extract user ID if available, otherwise create one
-        user_id = message.user_id if hasattr(message, 'user_id') and message.user_id else f"user_{session_id}"
+        # Continue the conversation of the task's session
+        session_id, user_id = get_session_and_user(message)
         
         # Use the agent to process the request
         response = await sofia_agent.invoke(text_content, session_id, user_id)
@@ -545,14 +953,11 @@ async def stream_message(message: Message) -> AsyncIterable[Union[str, Dict[str,
 
         logger.info(f"Streaming response for message: {text_content}")
 
-        # Generate a session ID based on message
-        session_id = f"session_{hash(text_content)}"
-        
-        # Extract user ID if available, otherwise create one
-        # user_id = message.user_id if hasattr(message, 'user_id') and message.user_id else f"user_{session_id}"
+        # Continue the conversation of the task's session
+        session_id, user_id = get_session_and_user(message)
         
         # Use the agent to stream responses for the request
-        async for response in sofia_agent.stream(text_content, session_id):
+        async for response in sofia_agent.stream(text_content, session_id, user_id):
             yield response
 
     except Exception as e:
@@ -565,8 +970,30 @@ async def main():
         # Initialize agent with MCP tools
         await sofia_agent.initialize()
         
-        # Create task manager
-        task_manager = TaskManager()
+        # Create task manager with a durable or bounded in-memory task store
+        if os.getenv("TASK_STORE_BACKEND", "memory") == "sqlite":
+            task_store = SqliteTaskStore(
+                db_file=os.getenv("TASK_STORE_DB_FILE", "tmp/tasks.db"),
+                max_cached=int(os.getenv("TASK_STORE_MAX_TASKS", "10000")),
+            )
+        else:
+            task_store = InMemoryTaskStore(
+                max_tasks=int(os.getenv("TASK_STORE_MAX_TASKS", "10000")),
+                max_bytes=int(os.getenv("TASK_STORE_MAX_BYTES", str(256 * 1024 * 1024))),
+                ttl_seconds=float(os.getenv("TASK_STORE_TTL_SECONDS", "3600")),
+            )
+        # Bound concurrent agent runs and queue the rest by priority
+        worker_pool = WorkerPool(
+            max_workers=int(os.getenv("WORKER_POOL_SIZE", "8")),
+            max_queue_size=int(os.getenv("WORKER_QUEUE_SIZE", "100")),
+        )
+        handler_timeout = os.getenv("TASK_HANDLER_TIMEOUT")
+        task_manager = TaskManager(
+            task_store=task_store,
+            worker_pool=worker_pool,
+            concurrent_handlers=os.getenv("TASK_HANDLERS_CONCURRENT", "false").lower() == "true",
+            handler_timeout=float(handler_timeout) if handler_timeout else None,
+        )
         
         # Register message handler
         task_manager.register_handler(process_message)
@@ -580,7 +1007,17 @@ async def main():
             port=int(os.getenv("A2A_SERVER_PORT", "8000")),
             agent_card=agent_card,
             task_manager=task_manager,
+            stream_coalesce_window=float(os.getenv("STREAM_COALESCE_WINDOW", "0.05")),
+            stream_coalesce_max_chars=int(os.getenv("STREAM_COALESCE_MAX_CHARS", "2048")),
         )
+        server.register_stats("agent_pool", sofia_agent.agent_pool.stats)
+        server.register_stats("session_cache", sofia_agent.session_cache_stats)
+        server.register_stats("context_budget", sofia_agent.context_budget_stats)
+        server.register_stats("response_cache", sofia_agent.response_cache_stats)
+        server.register_stats("vector_index", sofia_agent.vector_index_stats)
+        server.register_stats("db", sofia_agent.db_stats)
+        server.register_stats("maintenance", sofia_agent.maintenance_stats)
+        sofia_agent.start_maintenance()
         
         logger.info(f"Starting SOFIA General Agent on port {os.getenv('A2A_SERVER_PORT', '8000')}")
         # Use the async start method instead of the blocking one
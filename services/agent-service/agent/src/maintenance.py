@@ -0,0 +1,344 @@
+from typing import Any, Callable, Dict, IO, List, Optional, Tuple
+from datetime import datetime
+import asyncio
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import time
+
+from db_executor import configure_sqlite_connection
+
+logger = logging.getLogger(__name__)
+
+# Last time a session was written; Agno leaves updated_at NULL until the first update
+_LAST_ACTIVE = "COALESCE(updated_at, created_at)"
+
+
+class StorageMaintenance:
+    """Background retention, archiving, vacuum and ANALYZE for the agent's SQLite files.
+
+    Each run:
+
+    1. Expires sessions not written for ``max_session_age_days``, and all
+       but the newest ``max_sessions_per_user`` sessions of each user. The
+       rows are appended to a gzip JSON Lines file in ``archive_dir`` (if
+       set) and deleted together with their context summaries.
+    2. Returns free pages to the file system with ``PRAGMA
+       incremental_vacuum``. A database not created in incremental mode is
+       only converted (one full VACUUM) when ``full_vacuum`` is set, as
+       that blocks writers for as long as it takes.
+    3. Refreshes the query planner statistics with a bounded ANALYZE.
+
+    Work is split into short transactions of at most ``batch_size`` rows or
+    ``vacuum_pages`` pages, run on the executor's writer thread so live
+    writes queue between them rather than behind a whole run. Between
+    batches the job sleeps ``batch_pause_seconds``, and it waits while more
+    than ``max_pending_writes`` live writes are queued. A run expires at
+    most ``max_rows_per_run`` sessions; the rest wait for the next run.
+    A session written again after it was picked is kept.
+    """
+
+    def __init__(
+        self,
+        storage_db_file: str,
+        storage_table: str = "agent_sessions",
+        summary_table: Optional[str] = "session_summaries",
+        memory_db_file: Optional[str] = None,
+        archive_dir: Optional[str] = None,
+        max_session_age_days: Optional[float] = None,
+        max_sessions_per_user: Optional[int] = None,
+        interval_seconds: float = 3600,
+        batch_size: int = 100,
+        batch_pause_seconds: float = 0.05,
+        max_rows_per_run: int = 50000,
+        vacuum_pages: int = 256,
+        full_vacuum: bool = False,
+        max_pending_writes: int = 8,
+        executor: Any = None,
+        on_sessions_deleted: Optional[Callable[[List[str]], None]] = None,
+    ):
+        self.storage_db_file = storage_db_file
+        self.storage_table = storage_table
+        self.summary_table = summary_table
+        self.memory_db_file = memory_db_file
+        self.archive_dir = archive_dir
+        self.max_session_age_days = max_session_age_days
+        self.max_sessions_per_user = max_sessions_per_user
+        self.interval_seconds = interval_seconds
+        self.batch_size = batch_size
+        self.batch_pause_seconds = batch_pause_seconds
+        self.max_rows_per_run = max_rows_per_run
+        self.vacuum_pages = vacuum_pages
+        self.full_vacuum = full_vacuum
+        self.max_pending_writes = max_pending_writes
+        self.executor = executor
+        self.on_sessions_deleted = on_sessions_deleted
+
+        self._connections: Dict[str, sqlite3.Connection] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._running = asyncio.Lock()
+        self.counters = {
+            "runs": 0,
+            "failed_runs": 0,
+            "expired_by_age": 0,
+            "expired_by_count": 0,
+            "archived": 0,
+            "kept_active": 0,
+            "pages_vacuumed": 0,
+            "full_vacuums": 0,
+            "analyzed": 0,
+            "deferrals": 0,
+        }
+        self.last_run: Dict[str, Any] = {}
+
+    def start(self) -> None:
+        """Run every ``interval_seconds`` in the background, starting one interval from now"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for connection in self._connections.values():
+            connection.close()
+        self._connections.clear()
+
+    async def run_once(self) -> Dict[str, Any]:
+        """One retention, vacuum and ANALYZE pass; returns what it did"""
+        async with self._running:
+            started = time.time()
+            report: Dict[str, Any] = {"started_at": datetime.fromtimestamp(started).isoformat()}
+            report.update(await self._expire_sessions())
+            report["pages_vacuumed"] = 0
+            report["analyzed"] = []
+            for db_file in self._db_files():
+                report["pages_vacuumed"] += await self._vacuum(db_file)
+                await self._write(self._analyze, db_file)
+                report["analyzed"].append(db_file)
+            report["duration_seconds"] = time.time() - started
+            self.counters["runs"] += 1
+            self.last_run = report
+            logger.info(f"Storage maintenance: {report}")
+            return report
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "max_session_age_days": self.max_session_age_days,
+            "max_sessions_per_user": self.max_sessions_per_user,
+            "last_run": self.last_run,
+            **self.counters,
+        }
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.counters["failed_runs"] += 1
+                logger.error(f"Storage maintenance failed: {e}")
+
+    # Retention
+
+    async def _expire_sessions(self) -> Dict[str, Any]:
+        report = {"expired_by_age": 0, "expired_by_count": 0, "archived": 0, "kept_active": 0, "archive_file": None}
+        if self.max_session_age_days is None and self.max_sessions_per_user is None:
+            return report
+        if not await self._read(self._table_exists, self.storage_db_file, self.storage_table):
+            return report
+
+        await self._write(self._ensure_indexes)
+        candidates = await self._read(self._select_expired)
+        if not candidates:
+            return report
+
+        archive = None
+        if self.archive_dir:
+            os.makedirs(self.archive_dir, exist_ok=True)
+            report["archive_file"] = os.path.join(
+                self.archive_dir, f"{self.storage_table}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.jsonl.gz"
+            )
+            archive = gzip.open(report["archive_file"], "at", encoding="utf-8")
+        try:
+            for start in range(0, len(candidates), self.batch_size):
+                await self._yield_to_live_writes()
+                batch = candidates[start:start + self.batch_size]
+                deleted, archived = await self._write(self._expire_batch, batch, archive)
+                for session_id, _, reason in batch:
+                    if session_id in deleted:
+                        report[f"expired_by_{reason}"] += 1
+                report["archived"] += archived
+                report["kept_active"] += len(batch) - len(deleted)
+                if deleted and self.on_sessions_deleted is not None:
+                    self.on_sessions_deleted(sorted(deleted))
+        finally:
+            if archive is not None:
+                await asyncio.to_thread(archive.close)
+        for key in ("expired_by_age", "expired_by_count", "archived", "kept_active"):
+            self.counters[key] += report[key]
+        return report
+
+    def _ensure_indexes(self) -> None:
+        connection = self._connection(self.storage_db_file)
+        with connection:
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_{self.storage_table}_last_active "
+                f"ON {self.storage_table} ({_LAST_ACTIVE})"
+            )
+            connection.execute(
+                f"CREATE INDEX IF NOT EXISTS ix_{self.storage_table}_user_last_active "
+                f"ON {self.storage_table} (user_id, {_LAST_ACTIVE})"
+            )
+
+    def _select_expired(self) -> List[Tuple[str, int, str]]:
+        """(session_id, last active, reason) of sessions past retention, oldest first"""
+        connection = self._connection(self.storage_db_file)
+        picked: Dict[str, Tuple[str, int, str]] = {}
+        if self.max_session_age_days is not None:
+            cutoff = int(time.time() - self.max_session_age_days * 86400)
+            rows = connection.execute(
+                f"SELECT session_id, {_LAST_ACTIVE} FROM {self.storage_table} "
+                f"WHERE {_LAST_ACTIVE} < ? ORDER BY {_LAST_ACTIVE} LIMIT ?",
+                (cutoff, self.max_rows_per_run),
+            )
+            for session_id, last_active in rows:
+                picked[session_id] = (session_id, last_active, "age")
+        if self.max_sessions_per_user is not None and len(picked) < self.max_rows_per_run:
+            rows = connection.execute(
+                f"SELECT session_id, last_active FROM ("
+                f"SELECT session_id, {_LAST_ACTIVE} AS last_active, ROW_NUMBER() OVER ("
+                f"PARTITION BY user_id ORDER BY {_LAST_ACTIVE} DESC, session_id DESC) AS position "
+                f"FROM {self.storage_table} WHERE user_id IS NOT NULL"
+                f") WHERE position > ? ORDER BY last_active",
+                (self.max_sessions_per_user,),
+            )
+            for session_id, last_active in rows:
+                if len(picked) >= self.max_rows_per_run:
+                    break
+                picked.setdefault(session_id, (session_id, last_active, "count"))
+        return sorted(picked.values(), key=lambda candidate: candidate[1] or 0)
+
+    def _expire_batch(self, batch: List[Tuple[str, int, str]], archive: Optional[IO[str]]) -> Tuple[set, int]:
+        """Archive and delete the batch's sessions that weren't written since they were picked"""
+        connection = self._connection(self.storage_db_file)
+        picked_at = {session_id: last_active for session_id, last_active, _ in batch}
+        placeholders = ",".join("?" * len(batch))
+        with connection:
+            # Hold the write lock from the check to the delete, so no writer can slip in between
+            connection.execute("BEGIN IMMEDIATE")
+            cursor = connection.execute(
+                f"SELECT *, {_LAST_ACTIVE} AS _last_active FROM {self.storage_table} "
+                f"WHERE session_id IN ({placeholders})",
+                list(picked_at),
+            )
+            columns = [column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor]
+            expired = [row for row in rows if row.pop("_last_active") == picked_at[row["session_id"]]]
+            if not expired:
+                return set(), 0
+            if archive is not None:
+                for row in expired:
+                    archive.write(json.dumps(row, ensure_ascii=False) + "\n")
+                archive.flush()
+            ids = [row["session_id"] for row in expired]
+            placeholders = ",".join("?" * len(ids))
+            connection.execute(f"DELETE FROM {self.storage_table} WHERE session_id IN ({placeholders})", ids)
+            if self.summary_table and self._table_exists(self.storage_db_file, self.summary_table):
+                connection.execute(f"DELETE FROM {self.summary_table} WHERE session_id IN ({placeholders})", ids)
+        return set(ids), (len(expired) if archive is not None else 0)
+
+    # Vacuum and statistics
+
+    async def _vacuum(self, db_file: str) -> int:
+        mode = await self._read(self._pragma, db_file, "auto_vacuum")
+        if mode != 2:
+            if not self.full_vacuum:
+                logger.info(f"{db_file} is not in incremental auto_vacuum mode; set full_vacuum to convert it")
+                return 0
+            await self._yield_to_live_writes()
+            await self._write(self._convert_to_incremental, db_file)
+            self.counters["full_vacuums"] += 1
+            return 0
+
+        vacuumed = 0
+        free = await self._read(self._pragma, db_file, "freelist_count")
+        while free:
+            await self._yield_to_live_writes()
+            await self._write(self._incremental_vacuum, db_file, self.vacuum_pages)
+            remaining = await self._read(self._pragma, db_file, "freelist_count")
+            if remaining >= free:
+                # Live writes are reusing free pages as fast as they are released
+                break
+            vacuumed += free - remaining
+            free = remaining
+        self.counters["pages_vacuumed"] += vacuumed
+        return vacuumed
+
+    def _convert_to_incremental(self, db_file: str) -> None:
+        connection = self._connection(db_file)
+        connection.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        connection.execute("VACUUM")
+        logger.info(f"Converted {db_file} to incremental auto_vacuum")
+
+    def _incremental_vacuum(self, db_file: str, pages: int) -> None:
+        # execute() would only step the pragma once, freeing a single page; executescript runs it to completion
+        self._connection(db_file).executescript(f"PRAGMA incremental_vacuum({int(pages)});")
+
+    def _analyze(self, db_file: str) -> None:
+        connection = self._connection(db_file)
+        # Sample at most this many rows per index, so ANALYZE stays short on big tables
+        connection.execute("PRAGMA analysis_limit=1000")
+        connection.execute("ANALYZE")
+        connection.commit()
+        self.counters["analyzed"] += 1
+
+    # Helpers
+
+    def _db_files(self) -> List[str]:
+        files = [self.storage_db_file]
+        if self.memory_db_file and os.path.abspath(self.memory_db_file) != os.path.abspath(self.storage_db_file):
+            files.append(self.memory_db_file)
+        return [db_file for db_file in files if os.path.exists(db_file)]
+
+    def _connection(self, db_file: str) -> sqlite3.Connection:
+        connection = self._connections.get(db_file)
+        if connection is None:
+            # Used by one maintenance step at a time, from whichever executor thread runs it
+            connection = sqlite3.connect(db_file, check_same_thread=False)
+            configure_sqlite_connection(connection)
+            self._connections[db_file] = connection
+        return connection
+
+    def _pragma(self, db_file: str, name: str) -> Any:
+        return self._connection(db_file).execute(f"PRAGMA {name}").fetchone()[0]
+
+    def _table_exists(self, db_file: str, table: str) -> bool:
+        return self._connection(db_file).execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone() is not None
+
+    async def _yield_to_live_writes(self) -> None:
+        await asyncio.sleep(self.batch_pause_seconds)
+        while self.executor is not None and self.executor.pending["write"] > self.max_pending_writes:
+            self.counters["deferrals"] += 1
+            await asyncio.sleep(self.batch_pause_seconds or 0.05)
+
+    async def _read(self, fn: Callable[..., Any], *args) -> Any:
+        if self.executor is None:
+            return await asyncio.to_thread(fn, *args)
+        return await self.executor.read(f"maintenance_{fn.__name__.lstrip('_')}", fn, *args)
+
+    async def _write(self, fn: Callable[..., Any], *args) -> Any:
+        if self.executor is None:
+            return await asyncio.to_thread(fn, *args)
+        return await self.executor.write(f"maintenance_{fn.__name__.lstrip('_')}", fn, *args)
@@ -0,0 +1,437 @@
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+from datetime import datetime, timezone
+from itertools import islice
+from agno.memory.v2.db.schema import MemoryRow
+from agno.memory.v2.db.sqlite import SqliteMemoryDb
+from sqlalchemy import Column, DateTime, Index, String, Table, bindparam, delete, func, insert, inspect, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.exc import SQLAlchemyError
+import ast
+import json
+import logging
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_topic(topic: str) -> str:
+    """Case- and whitespace-insensitive form of a topic"""
+    return " ".join(unicodedata.normalize("NFKC", topic).casefold().split())
+
+
+def parse_memory(value: str) -> Dict[str, Any]:
+    # Agno stores memories as str(dict); literal_eval reads that without eval()
+    return ast.literal_eval(value)
+
+
+class TopicIndexedMemoryDb(SqliteMemoryDb):
+    """SqliteMemoryDb with a normalized topic index.
+
+    Every (memory, topic) pair is a row of ``<table_name>_topics``, written
+    in the same transaction as the memory itself, so the index never drifts
+    from the memories on add, replace or delete. Topic lookups are range
+    scans on (user_id, topic, updated_at) that only decode the memories of
+    the requested page. An existing memory table is indexed the first time
+    the topic table is created.
+
+    The bulk methods (upsert_memories, replace_memories, delete_memories,
+    delete_user_memories, delete_memories_by_topic, import_memories) each
+    run as a single transaction, and consume their input in batches of
+    ``batch_size`` rows so arbitrarily long iterables stay out of memory.
+
+    Listeners registered with add_listener() hear about every change once
+    it has committed: ``memories_changed(user_id, upserted_rows,
+    deleted_ids)``, or ``memories_reset(user_id)`` when a user's memories
+    (all users' if None) changed wholesale, e.g. on clear or import.
+    """
+
+    batch_size = 1000
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.topic_table: Table = self.get_topic_table()
+        self.listeners: List[Any] = []
+        self._ensure_topic_index()
+
+    def get_topic_table(self) -> Table:
+        name = f"{self.table_name}_topics"
+        return Table(
+            name,
+            self.metadata,
+            Column("user_id", String, primary_key=True),
+            Column("topic", String, primary_key=True),
+            Column("memory_id", String, primary_key=True),
+            Column("updated_at", DateTime),
+            Index(f"ix_{name}_page", "user_id", "topic", "updated_at", "memory_id"),
+            Index(f"ix_{name}_memory_id", "memory_id"),
+            extend_existing=True,
+        )
+
+    def create(self) -> None:
+        super().create()
+        self.topic_table.create(self.db_engine, checkfirst=True)
+
+    def upsert_memory(self, memory: MemoryRow, create_and_retry: bool = True) -> None:
+        try:
+            now = utc_now()
+            with self.Session() as session:
+                existing = session.execute(select(self.table.c.id).where(self.table.c.id == memory.id)).first()
+                if existing:
+                    stmt = (
+                        self.table.update()
+                        .where(self.table.c.id == memory.id)
+                        .values(user_id=memory.user_id, memory=str(memory.memory), updated_at=now)
+                    )
+                else:
+                    stmt = self.table.insert().values(
+                        id=memory.id, user_id=memory.user_id, memory=str(memory.memory), updated_at=now
+                    )
+                session.execute(stmt)
+                self._index_topics(session, [memory], updated_at=now)
+                session.commit()
+            self._notify_changed(upserted=[memory])
+        except SQLAlchemyError as e:
+            logger.error(f"Exception upserting into table: {e}")
+            if not self.table_exists():
+                self.create()
+                if create_and_retry:
+                    return self.upsert_memory(memory, create_and_retry=False)
+            else:
+                raise
+
+    def delete_memory(self, memory_id: str) -> None:
+        with self.Session() as session:
+            owner = session.execute(select(self.table.c.user_id).where(self.table.c.id == memory_id)).scalar()
+            session.execute(delete(self.topic_table).where(self.topic_table.c.memory_id == memory_id))
+            session.execute(delete(self.table).where(self.table.c.id == memory_id))
+            session.commit()
+        if owner is not None:
+            self._notify_changed(deleted=[(owner, memory_id)])
+
+    def clear(self) -> bool:
+        with self.Session() as session:
+            if self.table_exists():
+                session.execute(delete(self.topic_table))
+                session.execute(delete(self.table))
+                session.commit()
+        self._notify("memories_reset", None)
+        return True
+
+    def drop_table(self) -> None:
+        self.topic_table.drop(self.db_engine, checkfirst=True)
+        super().drop_table()
+        self._notify("memories_reset", None)
+
+    def add_listener(self, listener: Any) -> None:
+        self.listeners.append(listener)
+
+    def upsert_memories(self, memories: Iterable[MemoryRow]) -> int:
+        """Insert or update many memories in one transaction; returns the number written"""
+        self.create()
+        written = []
+        now = utc_now()
+        with self.Session() as session:
+            for batch in _batches(memories, self.batch_size):
+                stmt = sqlite_insert(self.table)
+                session.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[self.table.c.id],
+                        set_={"user_id": stmt.excluded.user_id, "memory": stmt.excluded.memory,
+                              "updated_at": stmt.excluded.updated_at},
+                    ),
+                    [{"id": m.id, "user_id": m.user_id, "memory": str(m.memory), "updated_at": now} for m in batch],
+                )
+                self._index_topics(session, batch, updated_at=now)
+                written.extend(batch)
+            session.commit()
+        self._notify_changed(upserted=written)
+        return len(written)
+
+    def replace_memories(self, memories: Iterable[MemoryRow]) -> int:
+        """Update many existing memories of their users in one transaction; returns the number replaced.
+
+        Memories that don't exist, or belong to another user, are skipped.
+        """
+        replaced = []
+        stmt = (
+            self.table.update()
+            .where(self.table.c.id == bindparam("memory_id"), self.table.c.user_id == bindparam("owner_id"))
+            .values(memory=bindparam("memory"), updated_at=bindparam("now"))
+        )
+        now = utc_now()
+        with self.Session() as session:
+            for batch in _batches(memories, self.batch_size):
+                owned = {
+                    (row.id, row.user_id) for row in session.execute(
+                        select(self.table.c.id, self.table.c.user_id).where(self.table.c.id.in_([m.id for m in batch]))
+                    )
+                }
+                batch = [m for m in batch if (m.id, m.user_id) in owned]
+                if not batch:
+                    continue
+                session.execute(
+                    stmt,
+                    [{"memory_id": m.id, "owner_id": m.user_id, "memory": str(m.memory), "now": now} for m in batch],
+                )
+                self._index_topics(session, batch, updated_at=now)
+                replaced.extend(batch)
+            session.commit()
+        self._notify_changed(upserted=replaced)
+        return len(replaced)
+
+    def delete_memories(self, memory_ids: Iterable[str], user_id: Optional[str] = None) -> int:
+        """Delete memories by id (only the user's, if user_id is given) in one transaction"""
+        deleted = []
+        with self.Session() as session:
+            for batch in _batches(memory_ids, self.batch_size):
+                condition = self.table.c.id.in_(batch)
+                if user_id is not None:
+                    condition = condition & (self.table.c.user_id == user_id)
+                rows = [(row.user_id, row.id) for row in session.execute(
+                    select(self.table.c.user_id, self.table.c.id).where(condition)
+                )]
+                ids = [memory_id for _, memory_id in rows]
+                session.execute(delete(self.topic_table).where(self.topic_table.c.memory_id.in_(ids)))
+                session.execute(delete(self.table).where(self.table.c.id.in_(ids)))
+                deleted.extend(rows)
+            session.commit()
+        self._notify_changed(deleted=deleted)
+        return len(deleted)
+
+    def delete_user_memories(self, user_id: str) -> int:
+        """Delete every memory of a user in one transaction"""
+        with self.Session() as session:
+            session.execute(delete(self.topic_table).where(self.topic_table.c.user_id == user_id))
+            deleted = session.execute(delete(self.table).where(self.table.c.user_id == user_id)).rowcount
+            session.commit()
+        self._notify("memories_reset", user_id)
+        return deleted
+
+    def delete_memories_by_topic(self, user_id: str, topic: str) -> int:
+        """Delete the user's memories with a topic in one transaction"""
+        with_topic = select(self.topic_table.c.memory_id).where(
+            self.topic_table.c.user_id == user_id, self.topic_table.c.topic == normalize_topic(topic)
+        )
+        with self.Session() as session:
+            ids = [row.memory_id for row in session.execute(with_topic)]
+            deleted = session.execute(delete(self.table).where(self.table.c.id.in_(with_topic))).rowcount
+            # Drop every topic row of the deleted memories, not just the matched one
+            session.execute(delete(self.topic_table).where(
+                self.topic_table.c.user_id == user_id,
+                self.topic_table.c.memory_id.not_in(select(self.table.c.id).where(self.table.c.user_id == user_id)),
+            ))
+            session.commit()
+        self._notify_changed(deleted=[(user_id, memory_id) for memory_id in ids])
+        return deleted
+
+    def export_memories(self, user_id: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+        """Stream memories (of one user, or all) as plain dicts, oldest first"""
+        stmt = select(self.table).order_by(self.table.c.created_at, self.table.c.id)
+        if user_id is not None:
+            stmt = stmt.where(self.table.c.user_id == user_id)
+        with self.Session() as session:
+            for row in session.execute(stmt).yield_per(self.batch_size):
+                yield {
+                    "id": row.id,
+                    "user_id": row.user_id,
+                    "memory": parse_memory(row.memory),
+                    "created_at": row.created_at.isoformat() if row.created_at else None,
+                    "updated_at": row.updated_at.isoformat() if row.updated_at else None,
+                }
+
+    def import_memories(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Upsert exported records in one transaction, keeping their timestamps"""
+        self.create()
+        imported = 0
+        users = set()
+        with self.Session() as session:
+            for batch in _batches(records, self.batch_size):
+                rows = [
+                    {
+                        "id": r["id"],
+                        "user_id": r["user_id"],
+                        "memory": str(r["memory"]),
+                        "created_at": _parse_time(r.get("created_at")) or utc_now(),
+                        "updated_at": _parse_time(r.get("updated_at")) or utc_now(),
+                    }
+                    for r in batch
+                ]
+                stmt = sqlite_insert(self.table)
+                session.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=[self.table.c.id],
+                        set_={column: stmt.excluded[column] for column in ("user_id", "memory", "created_at", "updated_at")},
+                    ),
+                    rows,
+                )
+                self._index_topics(session, [
+                    MemoryRow(id=r["id"], user_id=r["user_id"], memory=r["memory"], last_updated=row["updated_at"])
+                    for r, row in zip(batch, rows)
+                ])
+                imported += len(rows)
+                users.update(r["user_id"] for r in batch)
+            session.commit()
+        for user_id in users:
+            self._notify("memories_reset", user_id)
+        return imported
+
+    def memories_by_topic(self, user_id: str, topic: str, limit: int = 50, offset: int = 0) -> List[MemoryRow]:
+        """A page of the user's memories with the topic, most recently updated first"""
+        stmt = (
+            select(self.table)
+            .join(self.topic_table, self.topic_table.c.memory_id == self.table.c.id)
+            .where(self.topic_table.c.user_id == user_id, self.topic_table.c.topic == normalize_topic(topic))
+            .order_by(self.topic_table.c.updated_at.desc(), self.topic_table.c.memory_id.desc())
+            .limit(limit)
+            .offset(offset)
+        )
+        with self.Session() as session:
+            return [
+                MemoryRow(
+                    id=row.id,
+                    user_id=row.user_id,
+                    memory=parse_memory(row.memory),
+                    last_updated=row.updated_at or row.created_at,
+                )
+                for row in session.execute(stmt)
+            ]
+
+    def count_memories_by_topic(self, user_id: str, topic: str) -> int:
+        stmt = select(func.count()).select_from(self.topic_table).where(
+            self.topic_table.c.user_id == user_id, self.topic_table.c.topic == normalize_topic(topic)
+        )
+        with self.Session() as session:
+            return session.execute(stmt).scalar_one()
+
+    def memories_by_ids(self, memory_ids: List[str], user_id: Optional[str] = None) -> List[MemoryRow]:
+        """Memories with the given ids (only the user's, if user_id is given), in the order of memory_ids"""
+        if not memory_ids:
+            return []
+        # Filtering on user_id in SQL would make SQLite scan the user's rows instead of probing ids
+        stmt = select(self.table).where(self.table.c.id.in_(memory_ids))
+        with self.Session() as session:
+            rows = {
+                row.id: MemoryRow(
+                    id=row.id,
+                    user_id=row.user_id,
+                    memory=parse_memory(row.memory),
+                    last_updated=row.updated_at or row.created_at,
+                )
+                for row in session.execute(stmt)
+                if user_id is None or row.user_id == user_id
+            }
+        return [rows[memory_id] for memory_id in memory_ids if memory_id in rows]
+
+    def rebuild_topic_index(self, batch_size: int = 1000) -> int:
+        """Re-index the topics of every stored memory; returns the number of memories indexed"""
+        indexed = 0
+        with self.Session() as session:
+            session.execute(delete(self.topic_table))
+            rows = session.execute(
+                select(self.table.c.id, self.table.c.user_id, self.table.c.memory,
+                       self.table.c.created_at, self.table.c.updated_at)
+            ).yield_per(batch_size)
+            batch = []
+            for row in rows:
+                batch.append(MemoryRow(
+                    id=row.id, user_id=row.user_id, memory=parse_memory(row.memory),
+                    last_updated=row.updated_at or row.created_at,
+                ))
+                if len(batch) >= batch_size:
+                    self._index_topics(session, batch, replace=False)
+                    indexed += len(batch)
+                    batch = []
+            if batch:
+                self._index_topics(session, batch, replace=False)
+                indexed += len(batch)
+            session.commit()
+        logger.info(f"Indexed topics of {indexed} memories in {self.topic_table.name}")
+        return indexed
+
+    def _notify(self, method: str, *args) -> None:
+        for listener in self.listeners:
+            try:
+                getattr(listener, method)(*args)
+            except Exception as e:
+                logger.error(f"Memory listener {type(listener).__name__}.{method} failed: {e}")
+
+    def _notify_changed(
+        self, upserted: Iterable[MemoryRow] = (), deleted: Iterable[Tuple[str, str]] = ()
+    ) -> None:
+        """Report upserted rows and deleted (user_id, memory_id) pairs, grouped by user"""
+        if not self.listeners:
+            return
+        changes: Dict[str, Tuple[List[MemoryRow], List[str]]] = {}
+        for row in upserted:
+            changes.setdefault(row.user_id, ([], []))[0].append(row)
+        for user_id, memory_id in deleted:
+            changes.setdefault(user_id, ([], []))[1].append(memory_id)
+        for user_id, (rows, memory_ids) in changes.items():
+            self._notify("memories_changed", user_id, rows, memory_ids)
+
+    def _index_topics(
+        self, session, memories: Iterable[MemoryRow], replace: bool = True, updated_at: Optional[datetime] = None
+    ) -> None:
+        """Index topics at updated_at, the UTC time the rows were written, or the rows' own stored time"""
+        memories = list(memories)
+        if replace:
+            session.execute(
+                delete(self.topic_table).where(self.topic_table.c.memory_id.in_([m.id for m in memories]))
+            )
+        rows = [
+            {
+                "user_id": m.user_id,
+                "topic": topic,
+                "memory_id": m.id,
+                "updated_at": updated_at or m.last_updated or utc_now(),
+            }
+            for m in memories
+            for topic in {normalize_topic(t) for t in (m.memory.get("topics") or []) if t and t.strip()}
+        ]
+        if rows:
+            session.execute(insert(self.topic_table), rows)
+
+    def _ensure_topic_index(self) -> None:
+        tables = inspect(self.db_engine)
+        if tables.has_table(self.topic_table.name):
+            return
+        self.topic_table.create(self.db_engine, checkfirst=True)
+        if tables.has_table(self.table_name):
+            self.rebuild_topic_index()
+
+
+def write_jsonl(records: Iterable[Dict[str, Any]], fp: IO[str]) -> int:
+    """Write records one JSON object per line; returns the number written"""
+    count = 0
+    for record in records:
+        fp.write(json.dumps(record, ensure_ascii=False) + "\n")
+        count += 1
+    return count
+
+
+def read_jsonl(fp: IO[str]) -> Iterator[Dict[str, Any]]:
+    """Read records written by write_jsonl, one line at a time"""
+    for line in fp:
+        if line.strip():
+            yield json.loads(line)
+
+
+def _batches(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+def utc_now() -> datetime:
+    """Naive UTC, like SQLite's CURRENT_TIMESTAMP, so every write path orders the same way"""
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value)
+    return parsed.astimezone(timezone.utc).replace(tzinfo=None) if parsed.tzinfo else parsed
@@ -0,0 +1,164 @@
+from typing import Any, Dict, Iterator, Optional, Set
+from collections import OrderedDict
+from dataclasses import dataclass
+import logging
+import re
+import time
+import unicodedata
+
+logger = logging.getLogger(__name__)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def normalize_query(query: str) -> str:
+    """Case-, punctuation- and whitespace-insensitive form of a query"""
+    text = unicodedata.normalize("NFKC", query).casefold()
+    return " ".join(_PUNCTUATION.sub(" ", text).split())
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def similarity(a: Set[str], b: Set[str]) -> float:
+    """Jaccard similarity of two trigram sets"""
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+@dataclass
+class CachedResponse:
+    query: str
+    context: str
+    content: str
+    grams: Set[str]
+    expires_at: float
+
+
+class ResponseCache:
+    """TTL/LRU cache of final answers keyed on the normalized query.
+
+    The key also includes a caller-supplied context string (model, tools)
+    so a configuration change never serves stale answers. Answers that
+    depend on who asked must carry the user in it too, or they are served
+    to everyone. With ``similarity_threshold`` set, a
+    miss falls back to the most similar cached query of the same context
+    whose trigram Jaccard similarity reaches the threshold. Candidates are
+    found through a word index, so a lookup only compares queries that
+    share at least one word.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        ttl_seconds: float = 600,
+        similarity_threshold: Optional[float] = None,
+        chunk_chars: int = 40,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.chunk_chars = chunk_chars
+        # (context, normalized query) -> entry, least recently used first
+        self._entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        # (context, word) -> keys of entries containing the word
+        self._words: Dict[tuple, Set[tuple]] = {}
+        self.counters = {"hits": 0, "near_hits": 0, "misses": 0, "stores": 0, "expired": 0, "evicted": 0}
+
+    def get(self, query: str, context: str = "") -> Optional[str]:
+        """Cached answer for query, or None"""
+        normalized = normalize_query(query)
+        key = (context, normalized)
+        entry = self._entries.get(key)
+        if entry is not None and self._expired(key, entry):
+            entry = None
+        if entry is not None:
+            self.counters["hits"] += 1
+        elif self.similarity_threshold is not None:
+            entry = self._nearest(normalized, context)
+            if entry is not None:
+                key = (context, entry.query)
+                self.counters["near_hits"] += 1
+        if entry is None:
+            self.counters["misses"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry.content
+
+    def put(self, query: str, content: str, context: str = "") -> None:
+        normalized = normalize_query(query)
+        if not normalized or not content:
+            return
+        key = (context, normalized)
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = CachedResponse(
+            query=normalized,
+            context=context,
+            content=content,
+            grams=trigrams(normalized),
+            expires_at=time.monotonic() + self.ttl_seconds,
+        )
+        for word in set(normalized.split()):
+            self._words.setdefault((context, word), set()).add(key)
+        self.counters["stores"] += 1
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.counters["evicted"] += 1
+
+    def replay(self, content: str) -> Iterator[str]:
+        """Split a cached answer into stream chunks, breaking after whitespace"""
+        start = 0
+        while start < len(content):
+            end = min(start + self.chunk_chars, len(content))
+            if end < len(content):
+                space = content.rfind(" ", start, end)
+                if space > start:
+                    end = space + 1
+            yield content[start:end]
+            start = end
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["near_hits"] + self.counters["misses"]
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_ratio": (self.counters["hits"] + self.counters["near_hits"]) / lookups if lookups else 0.0,
+            **self.counters,
+        }
+
+    def _nearest(self, normalized: str, context: str) -> Optional[CachedResponse]:
+        candidates: Set[tuple] = set()
+        for word in set(normalized.split()):
+            candidates |= self._words.get((context, word), set())
+        grams = trigrams(normalized)
+        best, best_score = None, self.similarity_threshold
+        for key in list(candidates):
+            entry = self._entries.get(key)
+            if entry is None or self._expired(key, entry):
+                continue
+            score = similarity(grams, entry.grams)
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    def _expired(self, key: tuple, entry: CachedResponse) -> bool:
+        if entry.expires_at > time.monotonic():
+            return False
+        self._remove(key)
+        self.counters["expired"] += 1
+        return True
+
+    def _remove(self, key: tuple) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for word in set(entry.query.split()):
+            keys = self._words.get((entry.context, word))
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._words[(entry.context, word)]
@@ -0,0 +1,154 @@
+from typing import Any, Dict, Optional
+from collections import OrderedDict
+from agno.storage.session import Session
+from agno.storage.sqlite import SqliteStorage
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CachedSqliteStorage(SqliteStorage):
+    """SqliteStorage that keeps recently used sessions in memory.
+
+    An Agno agent reads its session from storage at the start of every run
+    and writes it back at the end. Sessions written by this process are
+    cached (up to ``max_sessions``, dropped after ``ttl_seconds`` unused), so
+    the next turn of a conversation starts without a SQLite round trip and
+    JSON decode of its history. The cache assumes this process is the only
+    writer of the table.
+
+    Without an ``executor`` writes go to SQLite immediately. With one (a
+    DbExecutor), upsert() caches the session and queues the write on the
+    executor's writer thread, so the synchronous upsert an Agno run makes
+    at its end no longer blocks the event loop. Until a queued write lands,
+    reads are answered from the pending session. A queued write is skipped
+    if a later upsert superseded it or the session was invalidated or
+    deleted in the meantime.
+    """
+
+    def __init__(
+        self,
+        *args,
+        max_sessions: int = 1000,
+        ttl_seconds: Optional[float] = 1800,
+        executor: Any = None,
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.executor = executor
+        # session_id -> (session, last used), least recently used first
+        self._cache: "OrderedDict[str, tuple]" = OrderedDict()
+        # session_id -> latest session whose write is still queued
+        self._pending: Dict[str, Session] = {}
+        # Reads also run on the executor's reader threads
+        self._lock = threading.RLock()
+        self.counters = {
+            "hits": 0, "misses": 0, "invalidations": 0, "queued_writes": 0, "cancelled_writes": 0, "write_failures": 0,
+        }
+
+    def read(self, session_id: str, user_id: Optional[str] = None) -> Optional[Session]:
+        with self._lock:
+            entry = self._cache.get(session_id)
+            if entry is not None:
+                session, last_used = entry
+                expired = self.ttl_seconds is not None and time.monotonic() - last_used > self.ttl_seconds
+                if not expired and (user_id is None or session.user_id == user_id):
+                    self._cache[session_id] = (session, time.monotonic())
+                    self._cache.move_to_end(session_id)
+                    self.counters["hits"] += 1
+                    return session
+                if expired:
+                    del self._cache[session_id]
+            pending = self._pending.get(session_id)
+            if pending is not None and (user_id is None or pending.user_id == user_id):
+                self.counters["hits"] += 1
+                return pending
+            self.counters["misses"] += 1
+
+        session = super().read(session_id, user_id)
+        if session is not None:
+            with self._lock:
+                # An upsert made while this read was running is newer than the row read
+                entry = self._cache.get(session_id)
+                if entry is None:
+                    self._remember(session)
+                elif user_id is None or entry[0].user_id == user_id:
+                    return entry[0]
+        return session
+
+    def upsert(self, session: Session, create_and_retry: bool = True) -> Optional[Session]:
+        if self.executor is None:
+            # The write reads the row back through read(), which re-caches it
+            with self._lock:
+                self._cache.pop(session.session_id, None)
+            return super().upsert(session, create_and_retry)
+
+        with self._lock:
+            self._pending[session.session_id] = session
+            self._remember(session)
+            self.counters["queued_writes"] += 1
+        self.executor.submit_write("upsert_session", self._write, session, create_and_retry)
+        return session
+
+    def delete_session(self, session_id: Optional[str] = None):
+        self.invalidate(session_id)
+        if self.executor is None:
+            super().delete_session(session_id)
+            return
+        # Behind any write of the session already running, so it can't bring the row back
+        self.executor.submit_write("delete_session", super().delete_session, session_id).result()
+
+    def drop(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self._pending.clear()
+        super().drop()
+
+    def invalidate(self, session_id: Optional[str]) -> None:
+        """Forget a cached session and cancel its queued write, e.g. after a run failed part-way through"""
+        with self._lock:
+            cached = self._cache.pop(session_id, None)
+            pending = self._pending.pop(session_id, None)
+            if cached is not None or pending is not None:
+                self.counters["invalidations"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": len(self._cache),
+            "max_sessions": self.max_sessions,
+            "pending_writes": len(self._pending),
+            **self.counters,
+        }
+
+    def _write(self, session: Session, create_and_retry: bool) -> None:
+        with self._lock:
+            if self._pending.get(session.session_id) is not session:
+                # Superseded by a later upsert queued behind this one, or invalidated
+                self.counters["cancelled_writes"] += 1
+                return
+        try:
+            written = super().upsert(session, create_and_retry)
+        except Exception as e:
+            written = None
+            logger.error(f"Error writing session {session.session_id}: {e}")
+        with self._lock:
+            if self._pending.get(session.session_id) is session:
+                del self._pending[session.session_id]
+            elif session.session_id not in self._pending:
+                # Invalidated while this write ran; a read meanwhile may have cached the older row
+                self._cache.pop(session.session_id, None)
+            if written is None:
+                # Let the next read see what the database actually holds
+                self.counters["write_failures"] += 1
+                self._cache.pop(session.session_id, None)
+
+    def _remember(self, session: Session) -> None:
+        with self._lock:
+            self._cache[session.session_id] = (session, time.monotonic())
+            self._cache.move_to_end(session.session_id)
+            while len(self._cache) > self.max_sessions:
+                self._cache.popitem(last=False)
@@ -0,0 +1,456 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from collections import OrderedDict
+from agno.embedder.base import Embedder
+from agno.memory.v2.db.schema import MemoryRow
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import shutil
+import threading
+import zlib
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_WORD = re.compile(r"\w+")
+
+
+def memory_text(memory: Dict[str, Any]) -> str:
+    """The text of a stored memory dict that gets embedded"""
+    return " ".join([memory.get("memory") or "", *(memory.get("topics") or [])])
+
+
+class EmbeddingBackend:
+    """Turns texts into vectors of ``dimensions`` floats.
+
+    ``name`` identifies the backend and its settings; an index built with
+    another backend is discarded and rebuilt.
+    """
+
+    name = "base"
+    dimensions = 0
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        raise NotImplementedError
+
+
+class HashingEmbeddingBackend(EmbeddingBackend):
+    """Deterministic offline embeddings from hashed words and character trigrams.
+
+    Needs no model or network, so it suits tests and air-gapped setups;
+    similarity is lexical rather than semantic.
+    """
+
+    def __init__(self, dimensions: int = 256):
+        self.dimensions = dimensions
+        self.name = f"hashing-{dimensions}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in _features(text):
+                h = zlib.crc32(feature.encode())
+                vectors[row, h % self.dimensions] += 1.0 if h & 0x80000000 else -1.0
+        return vectors
+
+
+class AgnoEmbeddingBackend(EmbeddingBackend):
+    """Any Agno embedder, e.g. OpenAIEmbedder(dimensions=256)"""
+
+    def __init__(self, embedder: Embedder):
+        self.embedder = embedder
+        self.dimensions = embedder.dimensions
+        self.name = f"{type(embedder).__name__}-{getattr(embedder, 'id', '')}-{embedder.dimensions}"
+
+    def embed(self, texts: Sequence[str]) -> np.ndarray:
+        return np.array([self.embedder.get_embedding(text) for text in texts], dtype=np.float32).reshape(
+            len(texts), self.dimensions
+        )
+
+
+class UserVectorIndex:
+    """Unit-length float32 vectors of one user's memories in memory-mapped files.
+
+    ``vectors.f32`` holds a (capacity, dimensions) matrix and ``ids.bin``
+    the memory id of each row; the first ``count`` rows are live. Updates
+    overwrite a row in place, appends grow the files by doubling, and
+    deletes move the last row into the freed slot, so every change touches
+    O(1) rows. ``meta.json`` is rewritten after the rows it describes.
+    """
+
+    ID_BYTES = 64
+
+    def __init__(self, path: str, dimensions: int, backend: str):
+        self.path = path
+        self.dimensions = dimensions
+        self.backend = backend
+        self.count = 0
+        self.capacity = 0
+        self._vectors: Optional[np.memmap] = None
+        self._ids: Optional[np.memmap] = None
+        # memory id -> row, built on the first update so searches start right away
+        self._rows: Optional[Dict[str, int]] = None
+        os.makedirs(path, exist_ok=True)
+
+        meta = self._read_meta()
+        if meta and meta.get("dimensions") == dimensions and meta.get("backend") == backend:
+            self.count, self.capacity = meta["count"], meta["capacity"]
+            self._open()
+            self.fresh = False
+        else:
+            self.fresh = True
+
+    def upsert(self, memory_ids: Sequence[str], vectors: np.ndarray) -> None:
+        vectors = _normalize(vectors)
+        rows = self._row_map()
+        new = [memory_id for memory_id in dict.fromkeys(memory_ids) if memory_id not in rows]
+        self._reserve(self.count + len(new))
+        for memory_id, vector in zip(memory_ids, vectors):
+            row = rows.get(memory_id)
+            if row is None:
+                row = self.count
+                self.count += 1
+                rows[memory_id] = row
+                self._ids[row] = memory_id.encode()[:self.ID_BYTES]
+            self._vectors[row] = vector
+        self._commit()
+
+    def delete(self, memory_ids: Iterable[str]) -> None:
+        changed = False
+        rows = self._row_map()
+        for memory_id in memory_ids:
+            row = rows.pop(memory_id, None)
+            if row is None:
+                continue
+            last = self.count - 1
+            if row != last:
+                moved = self._ids[last].decode()
+                self._vectors[row] = self._vectors[last]
+                self._ids[row] = self._ids[last]
+                rows[moved] = row
+            self.count = last
+            changed = True
+        if changed:
+            self._commit()
+
+    def search(self, query: np.ndarray, limit: int) -> List[Tuple[str, float]]:
+        """Top memory ids by cosine similarity to the query vector"""
+        if self.count == 0 or limit <= 0:
+            return []
+        query = _normalize(query.reshape(1, -1))[0]
+        scores = self._vectors[:self.count] @ query
+        limit = min(limit, self.count)
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [(self._ids[row].decode(), float(scores[row])) for row in top]
+
+    def close(self) -> None:
+        self._vectors = None
+        self._ids = None
+
+    def _row_map(self) -> Dict[str, int]:
+        if self._rows is None:
+            self._rows = {self._ids[row].decode(): row for row in range(self.count)} if self.count else {}
+        return self._rows
+
+    def _reserve(self, rows: int) -> None:
+        if rows <= self.capacity:
+            return
+        capacity = max(64, self.capacity * 2, rows)
+        self.close()
+        for name, row_bytes in (("vectors.f32", self.dimensions * 4), ("ids.bin", self.ID_BYTES)):
+            with open(os.path.join(self.path, name), "ab") as fp:
+                fp.truncate(capacity * row_bytes)
+        self.capacity = capacity
+        self._open()
+
+    def _open(self) -> None:
+        if self.capacity == 0:
+            return
+        self._vectors = np.memmap(
+            os.path.join(self.path, "vectors.f32"), dtype=np.float32, mode="r+", shape=(self.capacity, self.dimensions)
+        )
+        self._ids = np.memmap(
+            os.path.join(self.path, "ids.bin"), dtype=f"S{self.ID_BYTES}", mode="r+", shape=(self.capacity,)
+        )
+
+    def _commit(self) -> None:
+        if self._vectors is not None:
+            self._vectors.flush()
+            self._ids.flush()
+        meta = {"dimensions": self.dimensions, "backend": self.backend, "count": self.count, "capacity": self.capacity}
+        tmp = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp, "w") as fp:
+            json.dump(meta, fp)
+        os.replace(tmp, os.path.join(self.path, "meta.json"))
+        self.fresh = False
+
+    def _read_meta(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.path, "meta.json")) as fp:
+                return json.load(fp)
+        except (OSError, ValueError):
+            return None
+
+
+class VectorIndex:
+    """Per-user vector indexes of memories, for local semantic search.
+
+    Registered as a listener of TopicIndexedMemoryDb, it embeds memories
+    as they are added or replaced and drops them on delete. Listener calls
+    only queue the change: they come from the event loop and the database
+    writer thread, and embedding may be a network call, so a background
+    thread embeds and applies changes in order. Searches can therefore
+    miss a change for a moment. A user whose index is missing (first use,
+    backend change, bulk import) or whose update failed is indexed from
+    the memory database on their next search. At most ``max_open`` user
+    indexes stay mapped at a time.
+
+    Each user's index has its own lock. A rebuild exports and embeds into
+    a new directory without holding it, and takes it only to swap the new
+    index in, so one user's rebuild never stalls another user's searches
+    or the updates queued behind it.
+    """
+
+    def __init__(self, directory: str, backend: EmbeddingBackend, memory_db: Any = None, max_open: int = 64):
+        self.directory = directory
+        self.backend = backend
+        self.memory_db = memory_db
+        self.max_open = max_open
+        self._open: "OrderedDict[str, UserVectorIndex]" = OrderedDict()
+        # Guards _open, the lock tables, _rebuilding and counters. Never held
+        # while embedding, and never taken before a user lock
+        self._lock = threading.Lock()
+        # user_id -> lock held while that user's index is searched, updated or swapped
+        self._user_locks: Dict[str, threading.Lock] = {}
+        # user_id -> lock letting one rebuild of that user run at a time
+        self._build_locks: Dict[str, threading.Lock] = {}
+        # user_id -> changes that arrived during the user's rebuild, replayed onto the new index
+        self._rebuilding: Dict[str, List[tuple]] = {}
+        self.counters = {"searches": 0, "embedded": 0, "deleted": 0, "rebuilds": 0, "failed_updates": 0}
+        os.makedirs(directory, exist_ok=True)
+        # (method, args) of listener calls, applied in order by the worker; None stops it
+        self._changes: "queue.Queue[Optional[Tuple[str, tuple]]]" = queue.Queue()
+        self._worker = threading.Thread(target=self._apply_changes, name="vector-index", daemon=True)
+        self._worker.start()
+
+    def search(self, user_id: str, query: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """(memory_id, score) pairs of the user's memories most similar to the query"""
+        query_vector = self.backend.embed([query])[0]
+        self._count("searches")
+        with self._user_lock(user_id):
+            index = self._index(user_id)
+            if not index.fresh:
+                return index.search(query_vector, limit)
+        self._build(user_id, force=False)
+        with self._user_lock(user_id):
+            return self._index(user_id).search(query_vector, limit)
+
+    def memories_changed(self, user_id: str, upserted: List[MemoryRow], deleted: List[str]) -> None:
+        self._changes.put(("changed", (user_id, list(upserted), list(deleted))))
+
+    def memories_reset(self, user_id: Optional[str]) -> None:
+        self._changes.put(("reset", (user_id,)))
+
+    def join(self) -> None:
+        """Wait until every queued change has been applied"""
+        self._changes.join()
+
+    def close(self) -> None:
+        """Apply queued changes, stop the worker and unmap the indexes"""
+        if self._worker.is_alive():
+            self._changes.put(None)
+            self._worker.join()
+        with self._lock:
+            for index in self._open.values():
+                index.close()
+            self._open.clear()
+
+    def rebuild(self, user_id: str) -> int:
+        """Re-embed all of a user's memories from the memory database"""
+        return self._build(user_id, force=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "backend": self.backend.name,
+            "open_indexes": len(self._open),
+            "rebuilding": len(self._rebuilding),
+            "pending_changes": self._changes.qsize(),
+            **self.counters,
+        }
+
+    def _apply_changes(self) -> None:
+        while True:
+            change = self._changes.get()
+            try:
+                if change is None:
+                    return
+                method, args = change
+                try:
+                    getattr(self, f"_{method}")(*args)
+                except Exception as e:
+                    user_id = args[0]
+                    logger.error(f"Vector index update for user {user_id} failed: {e}")
+                    self._count("failed_updates")
+                    # Drop the stale index; the next search rebuilds it from the database
+                    self._reset(user_id)
+            finally:
+                self._changes.task_done()
+
+    def _changed(self, user_id: str, upserted: List[MemoryRow], deleted: List[str]) -> None:
+        ids = [row.id for row in upserted]
+        vectors = self.backend.embed([memory_text(row.memory) for row in upserted]) if upserted else None
+        if self._defer(user_id, ("changed", ids, vectors, deleted)):
+            return
+        with self._user_lock(user_id):
+            index = self._index(user_id)
+            if index.fresh:
+                # Not built yet; the first search indexes everything at once
+                return
+            self._apply(index, ids, vectors, deleted)
+
+    def _reset(self, user_id: Optional[str]) -> None:
+        if user_id is None:
+            # Rare (the whole memory table was cleared), so the shared lock is
+            # held throughout to keep indexes from being opened meanwhile
+            with self._lock:
+                self._open.clear()
+                for changes in self._rebuilding.values():
+                    changes.append(("reset",))
+                for name in os.listdir(self.directory):
+                    if not name.endswith(".building"):
+                        shutil.rmtree(os.path.join(self.directory, name), ignore_errors=True)
+            return
+        if self._defer(user_id, ("reset",)):
+            return
+        with self._user_lock(user_id):
+            self._drop(user_id)
+
+    def _build(self, user_id: str, force: bool) -> int:
+        """Index the user's memories into ``<path>.building`` and swap it in.
+
+        Without ``force`` this is a no-op once the index exists, e.g. when
+        a concurrent search built it first.
+        """
+        with self._build_lock(user_id):
+            if not force:
+                with self._user_lock(user_id):
+                    if not self._index(user_id).fresh:
+                        return 0
+            with self._lock:
+                self._rebuilding[user_id] = []
+            path = self._path(user_id)
+            building = path + ".building"
+            try:
+                shutil.rmtree(building, ignore_errors=True)
+                index = UserVectorIndex(building, self.backend.dimensions, self.backend.name)
+                indexed = 0
+                if self.memory_db is not None:
+                    batch: List[Dict[str, Any]] = []
+                    for record in self.memory_db.export_memories(user_id=user_id):
+                        batch.append(record)
+                        if len(batch) >= 256:
+                            indexed += self._add(index, batch)
+                            batch = []
+                    if batch:
+                        indexed += self._add(index, batch)
+                index._commit()
+                index.close()
+                with self._user_lock(user_id):
+                    self._drop(user_id)
+                    os.replace(building, path)
+                    with self._lock:
+                        changes = self._rebuilding.pop(user_id)
+                    index = self._index(user_id)
+                    for change in changes:
+                        if change[0] == "reset":
+                            self._drop(user_id)
+                            index = self._index(user_id)
+                        elif not index.fresh:
+                            self._apply(index, *change[1:])
+            except BaseException:
+                # Changes that came in meanwhile are lost, so the old index is stale too
+                with self._lock:
+                    self._rebuilding.pop(user_id, None)
+                shutil.rmtree(building, ignore_errors=True)
+                with self._user_lock(user_id):
+                    self._drop(user_id)
+                raise
+            self._count("rebuilds")
+            logger.info(f"Indexed {indexed} memories of user {user_id}")
+            return indexed
+
+    def _defer(self, user_id: str, change: tuple) -> bool:
+        """Record a change for the rebuild of the user in progress, if any"""
+        with self._lock:
+            changes = self._rebuilding.get(user_id)
+            if changes is None:
+                return False
+            changes.append(change)
+            return True
+
+    def _apply(self, index: UserVectorIndex, ids: List[str], vectors: Optional[np.ndarray], deleted: List[str]) -> None:
+        if ids:
+            index.upsert(ids, vectors)
+            self._count("embedded", len(ids))
+        if deleted:
+            index.delete(deleted)
+            self._count("deleted", len(deleted))
+
+    def _add(self, index: UserVectorIndex, records: List[Dict[str, Any]]) -> int:
+        index.upsert([r["id"] for r in records], self.backend.embed([memory_text(r["memory"]) for r in records]))
+        self._count("embedded", len(records))
+        return len(records)
+
+    def _drop(self, user_id: str) -> None:
+        """Forget and delete the user's index; the caller holds the user's lock"""
+        with self._lock:
+            self._open.pop(user_id, None)
+        shutil.rmtree(self._path(user_id), ignore_errors=True)
+
+    def _index(self, user_id: str) -> UserVectorIndex:
+        """The user's open index, opened if needed; the caller holds the user's lock"""
+        with self._lock:
+            index = self._open.get(user_id)
+            if index is None:
+                index = UserVectorIndex(self._path(user_id), self.backend.dimensions, self.backend.name)
+                self._open[user_id] = index
+                while len(self._open) > self.max_open:
+                    # Not closed: a search of that user may still be reading it
+                    self._open.popitem(last=False)
+            self._open.move_to_end(user_id)
+            return index
+
+    def _user_lock(self, user_id: str) -> threading.Lock:
+        with self._lock:
+            return self._user_locks.setdefault(user_id, threading.Lock())
+
+    def _build_lock(self, user_id: str) -> threading.Lock:
+        with self._lock:
+            return self._build_locks.setdefault(user_id, threading.Lock())
+
+    def _count(self, counter: str, n: int = 1) -> None:
+        with self._lock:
+            self.counters[counter] += n
+
+    def _path(self, user_id: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(user_id.encode()).hexdigest()[:32])
+
+
+def _features(text: str) -> List[str]:
+    features = []
+    for word in _WORD.findall(text.casefold()):
+        features.append(word)
+        padded = f"<{word}>"
+        features.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return features
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
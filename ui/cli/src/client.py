@@ -51,13 +51,16 @@ if args.verbose:
 # Create A2A client
 client = A2AClient(url="http://localhost:8000")
 
+# 同一进程内的所有查询属于同一个会话，代理据此延续对话上下文
+session_id = uuid.uuid4().hex
+
 async def send_query(query: str) -> Dict[str, Any]:
     """Send a query to the agent server and get a response."""
     try:
         # 生成一个唯一的字符串ID而不是使用None
         request_id = str(uuid.uuid4())
         logger.info(f"Sending query with ID: {request_id}")
-        response = await client.send_task(query, id=request_id)
+        response = await client.send_task(query, id=request_id, session_id=session_id)
         return response.model_dump()
     except Exception as e:
         logger.error(f"Error sending request: {e}")
@@ -71,7 +74,7 @@ async def send_streaming_query(query: str):
         request_id = str(uuid.uuid4())
         logger.info(f"Sending streaming query with request ID: {request_id}")
         # 使用async for来正确处理异步生成器，传递id参数
-        async for chunk in client.send_task_streaming(query, id=request_id):
+        async for chunk in client.send_task_streaming(query, id=request_id, session_id=session_id):
             logger.debug(f"Received chunk: {chunk}")
             yield chunk.model_dump()
     except Exception as e: